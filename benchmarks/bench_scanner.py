@@ -0,0 +1,126 @@
+"""Benchmark do scanner único de valores/itens contra as buscas por padrão anteriores.
+
+Uso:
+    python benchmarks/bench_scanner.py [--mb 4] [--repeticoes 3]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from utils.file_utils import extract_items_from_text, extract_values_from_text, extrair_valores_e_itens
+
+
+def valores_por_padrao(text):
+    """Implementação anterior: um re.findall por padrão de valor"""
+    patterns = [
+        r'R\$\s*([\d\.]+,\d{2})',
+        r'(\d{1,3}(?:\.\d{3})*,\d{2})',
+        r'TOTAL[:\s]*([\d\.]+,\d{2})',
+        r'VALOR[:\s]*([\d\.]+,\d{2})'
+    ]
+    values = []
+    for pattern in patterns:
+        values.extend(re.findall(pattern, text, re.IGNORECASE))
+    return values
+
+
+def itens_por_padrao(text):
+    """Implementação anterior: um re.findall por padrão de item"""
+    patterns = [
+        r'UE-\d+[A-Z]?\s*-[^-\n]+',
+        r'SPLIT\s+\d+[.,]?\d*\s*BTU[/H]*',
+        r'CASSETE\s+\d+[.,]?\d*\s*BTU[/H]*',
+        r'HI\s*WALL\s+\d+[.,]?\d*\s*BTU[/H]*',
+        r'DUTO\s+\d+[.,]?\d*\s*BTU[/H]*',
+        r'Suite\s*\d+',
+        r'Casal',
+        r'Ginastica',
+        r'Home',
+        r'Jantar/Copa',
+        r'Escritório',
+        r'Cozinha',
+        r'Gourmet',
+        r'FXEQ\d+AVE',
+        r'FXFQ\d+AVM',
+        r'FXSQ\d+PAVE',
+        r'FXAQ\d+AVM',
+        r'Exaustor',
+    ]
+    items = []
+    for pattern in patterns:
+        items.extend(re.findall(pattern, text, re.IGNORECASE))
+    return list(set(items))
+
+
+def gerar_texto(tamanho_mb, densidade=1.0, seed=42):
+    """Gera um texto de proposta sintético com aproximadamente tamanho_mb megabytes.
+
+    densidade é a fração de linhas de itens com valores; as demais são texto corrido.
+    """
+    rnd = random.Random(seed)
+    ambientes = ["Suite 1", "Suite 2", "Casal", "Home", "Gourmet", "Cozinha", "Escritório", "Jantar/Copa"]
+    modelos = ["FXEQ25AVE", "FXFQ32AVM", "FXSQ40PAVE", "FXAQ20AVM", "SPLIT 12000 BTU/H", "CASSETE 24000 BTU/H"]
+    palavras = (
+        "fornecimento instalação de equipamentos conforme especificação técnica garantia prazo "
+        "entrega condições pagamento obra projeto tubulação frigorígena dreno elétrica"
+    ).split()
+    linhas = []
+    tamanho = 0
+    i = 0
+    while tamanho < tamanho_mb * 1024 * 1024:
+        i += 1
+        if rnd.random() < densidade:
+            unitario = rnd.uniform(100, 50000)
+            quantidade = rnd.randint(1, 20)
+            linha = (
+                f"UE-{i % 99:02d}A - {rnd.choice(modelos)} {rnd.choice(ambientes)} "
+                f"{quantidade} UN R$ {unitario:,.2f} TOTAL {unitario * quantidade:,.2f}"
+            ).replace(",", "X").replace(".", ",").replace("X", ".")
+        else:
+            linha = " ".join(rnd.choice(palavras) for _ in range(12))
+        linhas.append(linha)
+        tamanho += len(linha) + 1
+    return "\n".join(linhas)
+
+
+def medir(funcao, texto, repeticoes):
+    """Retorna o melhor tempo (s) entre as repetições"""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(texto)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=float, default=4.0, help="tamanho do texto sintético em MB")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    for nome, densidade in (("denso", 1.0), ("proposta típica", 0.125)):
+        texto = gerar_texto(args.mb, densidade)
+        assert valores_por_padrao(texto) == extract_values_from_text(texto)
+        assert sorted(itens_por_padrao(texto)) == sorted(extract_items_from_text(texto))
+
+        anterior = medir(lambda t: (valores_por_padrao(t), itens_por_padrao(t)), texto, args.repeticoes)
+        scanner = medir(extrair_valores_e_itens, texto, args.repeticoes)
+        valores_anterior = medir(valores_por_padrao, texto, args.repeticoes)
+        valores_scanner = medir(extract_values_from_text, texto, args.repeticoes)
+        linhas = texto.split("\n")[:20000]
+        linhas_anterior = medir(lambda ls: [valores_por_padrao(linha) for linha in ls], linhas, args.repeticoes)
+        linhas_scanner = medir(lambda ls: [extract_values_from_text(linha) for linha in ls], linhas, args.repeticoes)
+
+        print(f"Texto {nome}: {len(texto) / 1024 / 1024:.1f} MB")
+        print(f"  valores + itens    por padrão: {anterior:.3f}s | scanner único: {scanner:.3f}s | {anterior / scanner:.1f}x")
+        print(f"  somente valores    por padrão: {valores_anterior:.3f}s | scanner único: {valores_scanner:.3f}s | {valores_anterior / valores_scanner:.1f}x")
+        print(f"  valores por linha  por padrão: {linhas_anterior:.3f}s | scanner único: {linhas_scanner:.3f}s | {linhas_anterior / linhas_scanner:.1f}x")
+
+if __name__ == "__main__":
+    main()
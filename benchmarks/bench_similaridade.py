@@ -0,0 +1,99 @@
+"""Micro-benchmark da similaridade com corte (similaridade_limitada) contra o SequenceMatcher (difflib).
+
+Os pares são descrições e modelos do mapa x propostas, como na equalização e em comparar_propostas:
+de uma pasta de BID real (--bid) ou de um BID sintético. Mede o tempo por par com e sem corte e a
+fração de pares descartada pelos limites de tamanho/histograma.
+
+Uso:
+    python benchmarks/bench_similaridade.py [--bid pasta_do_bid] [--pares 5000] [--corte 0.7] [--repeticoes 3]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from gerador_bid import gerar_bid
+from utils.file_utils import abrir_arquivo_local, extract_to_dataframes
+from utils.similaridade import limite_superior, similaridade_limitada
+
+
+def textos_mapa_propostas(args):
+    """Descrições e modelos (em minúsculas) do mapa e das propostas"""
+    if args.bid:
+        arquivos = [
+            abrir_arquivo_local(caminho) for caminho in sorted(Path(args.bid).iterdir())
+            if caminho.suffix.lower() in {".pdf", ".xlsx", ".xls"}
+        ]
+    else:
+        arquivos = gerar_bid(args.itens, 3, args.ruido, "pdf", args.seed)
+    data = extract_to_dataframes(arquivos, usar_cache=False)
+    mapa_df = data["dataframes"]["mapa_df"]
+    propostas_dfs = [df for df in data["dataframes"]["propostas_dfs"] if df is not None]
+    mapa, propostas = [], []
+    for coluna in ("Item", "Modelo_Produto"):
+        mapa.extend(str(valor).lower() for valor in mapa_df[coluna])
+        propostas.extend(str(valor).lower() for df in propostas_dfs for valor in df[coluna])
+    return mapa, propostas
+
+
+def medir(funcao, pares, repeticoes):
+    """Mediana do tempo (s) para avaliar todos os pares e os resultados da última execução"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultados = [funcao(a, b) for a, b in pares]
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark de similaridade_limitada contra difflib.")
+    parser.add_argument("--bid", help="Pasta com o mapa e as propostas de um BID real")
+    parser.add_argument("--itens", type=int, default=120, help="Itens do BID sintético (sem --bid)")
+    parser.add_argument("--ruido", type=float, default=0.3)
+    parser.add_argument("--pares", type=int, default=5000)
+    parser.add_argument("--corte", type=float, default=0.7)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    mapa, propostas = textos_mapa_propostas(args)
+    rng = random.Random(args.seed)
+    pares = [(rng.choice(propostas), rng.choice(mapa)) for _ in range(args.pares)]
+    tamanhos = [len(a) + len(b) for a, b in pares]
+    print(f"{len(pares)} pares, tamanho total por par: mediana {statistics.median(tamanhos):.0f}, máximo {max(tamanhos)}")
+
+    corte = args.corte
+    medicoes = [
+        ("difflib ratio()", lambda a, b: SequenceMatcher(None, a, b).ratio()),
+        (f"difflib com limites (corte {corte})", lambda a, b: (
+            0.0 if limite_superior(a, b, corte) < corte else SequenceMatcher(None, a, b).ratio()
+        )),
+        ("similaridade_limitada sem corte", lambda a, b: similaridade_limitada(a, b)),
+        (f"similaridade_limitada (corte {corte})", lambda a, b: similaridade_limitada(a, b, corte)),
+    ]
+    resultados = {}
+    base = None
+    for nome, funcao in medicoes:
+        segundos, resultados[nome] = medir(funcao, pares, args.repeticoes)
+        base = base or segundos
+        print(f"  {nome:40} {segundos / len(pares) * 1e6:8.1f} µs/par  {base / segundos:5.2f}x")
+
+    descartados = sum(limite_superior(a, b, corte) < corte for a, b in pares)
+    acima_difflib = [r > corte for r in resultados["difflib ratio()"]]
+    acima_limitada = [r > corte for r in resultados["similaridade_limitada sem corte"]]
+    print(f"Pares descartados pelos limites: {descartados / len(pares):.1%}")
+    print(
+        f"Pares acima de {corte}: difflib {sum(acima_difflib)}, similaridade_limitada {sum(acima_limitada)} "
+        f"(decisões diferentes: {sum(a != b for a, b in zip(acima_difflib, acima_limitada))})"
+    )
+
+
+if __name__ == "__main__":
+    main()
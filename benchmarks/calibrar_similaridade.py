@@ -0,0 +1,89 @@
+"""Calibração do motor de similaridade por trigramas contra o SequenceMatcher (difflib).
+
+Compara descrições e modelos do mapa com os das propostas de BIDs sintéticos (todos os pares,
+como textos da equalização e, sem espaços, como os de comparar_propostas). Para cada limiar de
+ratio do difflib, procura o cosseno de trigramas que melhor separa os mesmos pares (maior Jaccard
+entre os conjuntos de pares acima dos dois limiares) e imprime a curva de calibração para
+CALIBRACAO_COSSENO/CALIBRACAO_RATIO em src/utils/similaridade.py.
+
+Uso:
+    python benchmarks/calibrar_similaridade.py [--bids 3] [--itens 120] [--ruido 0.3]
+"""
+import argparse
+import re
+import sys
+from difflib import SequenceMatcher
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from gerador_bid import gerar_bid
+from utils.file_utils import extract_to_dataframes
+from utils.similaridade import VetoresTrigramas
+
+LIMIARES_RATIO = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95]
+
+
+def textos_do_bid(args, seed):
+    """Pares de listas (mapa, propostas) de descrições e modelos de um BID sintético"""
+    pares = []
+    for formato in ("excel", "pdf"):
+        data = extract_to_dataframes(gerar_bid(args.itens, 3, args.ruido, formato, seed), usar_cache=False)
+        mapa_df = data["dataframes"]["mapa_df"]
+        propostas_dfs = [df for df in data["dataframes"]["propostas_dfs"] if df is not None]
+        for coluna in ("Item", "Modelo_Produto"):
+            mapa = [str(valor).lower() for valor in mapa_df[coluna]]
+            propostas = [str(valor).lower() for df in propostas_dfs for valor in df[coluna]]
+            pares.append((mapa, propostas))
+            pares.append(([re.sub(r"\s+", "", t) for t in mapa], [re.sub(r"\s+", "", t) for t in propostas]))
+    return pares
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibra o cosseno de trigramas na escala do difflib.")
+    parser.add_argument("--bids", type=int, default=3)
+    parser.add_argument("--itens", type=int, default=120)
+    parser.add_argument("--ruido", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    ratios, cossenos = [], []
+    for n in range(args.bids):
+        for mapa, propostas in textos_do_bid(args, args.seed + n):
+            # Textos repetidos só contam uma vez por par distinto
+            mapa, propostas = sorted(set(mapa)), sorted(set(propostas))
+            matriz = VetoresTrigramas(mapa).produto(VetoresTrigramas(propostas), 0, len(propostas))
+            for i, texto_proposta in enumerate(propostas):
+                for j, texto_mapa in enumerate(mapa):
+                    ratios.append(SequenceMatcher(None, texto_proposta, texto_mapa).ratio())
+                    cossenos.append(matriz[i, j])
+    ratios, cossenos = np.array(ratios), np.minimum(np.array(cossenos), 1.0)
+    print(f"{len(ratios)} pares")
+
+    candidatos = np.unique(np.round(cossenos, 3))
+    pontos = []
+    for limiar in LIMIARES_RATIO:
+        acima = ratios > limiar
+        melhor = max(
+            candidatos,
+            key=lambda c: np.sum(acima & (cossenos > c)) / max(np.sum(acima | (cossenos > c)), 1)
+        )
+        jaccard = np.sum(acima & (cossenos > melhor)) / max(np.sum(acima | (cossenos > melhor)), 1)
+        pontos.append((float(melhor), limiar))
+        print(f"  ratio > {limiar:.2f}  <->  cosseno > {melhor:.3f}  (Jaccard {jaccard:.3f})")
+
+    # Curva monótona: cada ponto precisa de cosseno maior que o anterior
+    curva = [(0.0, 0.0)]
+    for cosseno, ratio in pontos:
+        if cosseno > curva[-1][0]:
+            curva.append((cosseno, ratio))
+    curva.append((1.0, 1.0))
+    print("CALIBRACAO_COSSENO =", [round(c, 3) for c, _ in curva])
+    print("CALIBRACAO_RATIO =", [r for _, r in curva])
+
+
+if __name__ == "__main__":
+    main()
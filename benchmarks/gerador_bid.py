@@ -0,0 +1,197 @@
+"""Gerador de BIDs sintéticos (mapa de concorrência + propostas) para benchmarks.
+
+Os arquivos seguem o formato das propostas reais de climatização: linhas de item com código UE,
+modelo, ambiente, quantidade, unidade e valores em R$. As propostas derivam do mapa com ruído
+configurável (erros de digitação, itens omitidos, variação de preço, ordem trocada).
+
+Uso (grava BIDs em disco, uma pasta por BID, no formato esperado por src/cli.py):
+    python benchmarks/gerador_bid.py destino --bids 10 --itens 200 --fornecedores 4 --ruido 0.2
+"""
+import argparse
+import io
+import random
+import sys
+from pathlib import Path
+
+import xlsxwriter
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from utils.file_utils import ArquivoEmMemoria
+
+AMBIENTES = ["Suite 1", "Suite 2", "Suite 3", "Casal", "Home", "Gourmet", "Cozinha", "Escritório", "Jantar/Copa", "Ginastica"]
+MODELOS = [
+    ("FXEQ25AVE", "EVAPORADORA HI WALL 9000 BTU/H"),
+    ("FXFQ32AVM", "CASSETE 12000 BTU/H"),
+    ("FXSQ40PAVE", "DUTO 18000 BTU/H"),
+    ("FXAQ20AVM", "HI WALL 7000 BTU/H"),
+    ("SPLIT 12000", "SPLIT 12000 BTU/H"),
+    ("CASSETE 24000", "CASSETE 24000 BTU/H"),
+    ("SPLIT 30000", "SPLIT 30000 BTU/H"),
+]
+UNIDADES = ["UN", "UN", "UN", "PC", "KG", "ML"]
+CLAUSULAS = [
+    "Prazo de entrega conforme cronograma da obra.",
+    "Garantia de 12 meses contra defeitos de fabricação.",
+    "Condições de pagamento: 30/60/90 dias.",
+    "Instalação de tubulação frigorígena, dreno e alimentação elétrica inclusas.",
+    "Validade da proposta: 15 dias.",
+]
+LINHAS_POR_PAGINA = 45
+
+
+def formatar_moeda(valor):
+    """Formata um número no padrão brasileiro (1.234,56)"""
+    return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def gerar_itens_mapa(n_itens, rng):
+    """Gera os itens do mapa de concorrência"""
+    itens = []
+    for i in range(n_itens):
+        modelo, descricao = rng.choice(MODELOS)
+        itens.append({
+            "codigo": f"UE-{i + 1:03d}{rng.choice('ABC')}",
+            "descricao": f"{descricao} {rng.choice(AMBIENTES)}",
+            "modelo": modelo,
+            "quantidade": rng.randint(1, 20),
+            "unidade": rng.choice(UNIDADES),
+            "unitario": round(rng.uniform(150, 40000), 2),
+        })
+    return itens
+
+
+def _erro_digitacao(texto, rng):
+    """Troca, remove ou duplica um caractere do texto"""
+    if len(texto) < 4:
+        return texto
+    pos = rng.randrange(1, len(texto) - 1)
+    operacao = rng.randrange(3)
+    if operacao == 0:
+        return texto[:pos - 1] + texto[pos] + texto[pos - 1] + texto[pos + 1:]
+    if operacao == 1:
+        return texto[:pos] + texto[pos + 1:]
+    return texto[:pos] + texto[pos] + texto[pos:]
+
+
+def gerar_itens_proposta(itens_mapa, ruido, rng):
+    """Deriva os itens de uma proposta a partir do mapa, aplicando ruído entre 0 e 1"""
+    itens = []
+    for item in itens_mapa:
+        if rng.random() < ruido / 2:
+            continue  # item não cotado
+        item = dict(item)
+        if rng.random() < ruido:
+            item["descricao"] = _erro_digitacao(item["descricao"], rng)
+        if rng.random() < ruido / 4:
+            item["quantidade"] += rng.choice([-1, 1])
+        variacao = 0.1 + 0.3 * ruido
+        item["unitario"] = round(item["unitario"] * rng.uniform(1 - variacao, 1 + variacao), 2)
+        itens.append(item)
+    # Parte dos itens fora da ordem do mapa
+    for _ in range(int(len(itens) * ruido / 2)):
+        a, b = rng.randrange(len(itens)), rng.randrange(len(itens))
+        itens[a], itens[b] = itens[b], itens[a]
+    return itens
+
+
+def linha_item(item):
+    """Linha de texto de um item, como aparece nas propostas em PDF"""
+    total = item["unitario"] * item["quantidade"]
+    return (
+        f"{item['codigo']} - {item['descricao']} {item['modelo']} QTD {item['quantidade']} {item['unidade']} "
+        f"R$ {formatar_moeda(item['unitario'])} TOTAL {formatar_moeda(total)}"
+    )
+
+
+def gerar_pdf(titulo, itens, rng, fracao_texto=0.1):
+    """Gera um PDF (bytes) com o cabeçalho e uma linha por item, intercalando cláusulas de texto"""
+    linhas = [titulo, f"Proposta {rng.randint(1000, 9999)}", ""]
+    for item in itens:
+        linhas.append(linha_item(item))
+        if rng.random() < fracao_texto:
+            linhas.append(rng.choice(CLAUSULAS))
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    pdf.setFont("Helvetica", 7)
+    for inicio in range(0, len(linhas), LINHAS_POR_PAGINA):
+        for n, linha in enumerate(linhas[inicio:inicio + LINHAS_POR_PAGINA]):
+            pdf.drawString(30, 800 - n * 17, linha)
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def gerar_excel(itens):
+    """Gera uma planilha (bytes) com uma linha por item e valores formatados em R$"""
+    buffer = io.BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {"in_memory": True})
+    planilha = workbook.add_worksheet("Proposta")
+    cabecalho = ["Código", "Descrição", "Modelo", "Qtd", "Un", "Valor Unitário", "Valor Total"]
+    for col, titulo in enumerate(cabecalho):
+        planilha.write(0, col, titulo)
+    for lin, item in enumerate(itens, start=1):
+        planilha.write(lin, 0, item["codigo"])
+        planilha.write(lin, 1, item["descricao"])
+        planilha.write(lin, 2, item["modelo"])
+        planilha.write(lin, 3, item["quantidade"])
+        planilha.write(lin, 4, item["unidade"])
+        planilha.write(lin, 5, f"R$ {formatar_moeda(item['unitario'])}")
+        planilha.write(lin, 6, f"R$ {formatar_moeda(item['unitario'] * item['quantidade'])}")
+    workbook.close()
+    return buffer.getvalue()
+
+
+def gerar_bid(n_itens=100, n_fornecedores=3, ruido=0.1, formato="pdf", seed=42):
+    """Gera os arquivos de um BID sintético (mapa + uma proposta por fornecedor).
+
+    formato: "pdf", "excel" ou "misto" (mapa em Excel e propostas alternando PDF/Excel).
+    Retorna uma lista de ArquivoEmMemoria, pronta para extract_to_dataframes.
+    """
+    rng = random.Random(seed)
+    itens_mapa = gerar_itens_mapa(n_itens, rng)
+    formato_mapa = "excel" if formato == "misto" else formato
+
+    arquivos = [_gerar_arquivo("MAPA DE CONCORRENCIA", itens_mapa, formato_mapa, rng)]
+    for k in range(n_fornecedores):
+        itens = gerar_itens_proposta(itens_mapa, ruido, rng)
+        formato_proposta = formato if formato != "misto" else ("pdf" if k % 2 == 0 else "excel")
+        arquivos.append(_gerar_arquivo(f"FORNECEDOR {k + 1:02d} - proposta", itens, formato_proposta, rng))
+    return arquivos
+
+
+def _gerar_arquivo(nome, itens, formato, rng):
+    if formato == "excel":
+        return ArquivoEmMemoria(gerar_excel(itens), f"{nome}.xlsx")
+    return ArquivoEmMemoria(gerar_pdf(nome.upper(), itens, rng), f"{nome}.pdf")
+
+
+def salvar_bid(diretorio, arquivos):
+    """Grava os arquivos de um BID em uma pasta"""
+    diretorio = Path(diretorio)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    for arquivo in arquivos:
+        (diretorio / arquivo.name).write_bytes(arquivo.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera pastas de BIDs sintéticos.")
+    parser.add_argument("destino", help="Diretório onde as pastas dos BIDs serão criadas")
+    parser.add_argument("--bids", type=int, default=1)
+    parser.add_argument("--itens", type=int, default=100)
+    parser.add_argument("--fornecedores", type=int, default=3)
+    parser.add_argument("--ruido", type=float, default=0.1, help="Nível de ruído das propostas, entre 0 e 1")
+    parser.add_argument("--formato", choices=["pdf", "excel", "misto"], default="pdf")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for n in range(args.bids):
+        arquivos = gerar_bid(args.itens, args.fornecedores, args.ruido, args.formato, args.seed + n)
+        salvar_bid(Path(args.destino) / f"bid_{n + 1:04d}", arquivos)
+    print(f"{args.bids} BIDs gerados em {args.destino}")
+
+
+if __name__ == "__main__":
+    main()
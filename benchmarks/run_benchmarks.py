@@ -0,0 +1,161 @@
+"""Suíte de benchmarks do pipeline de análise de BID sobre BIDs sintéticos.
+
+Mede extract_to_dataframes, comparar_dataframes_estruturados, comparar_propostas e a geração de
+relatórios para cada formato de arquivo e grava o resultado em JSON (com o commit), para comparar
+execuções entre commits.
+
+Uso:
+    python benchmarks/run_benchmarks.py [--itens 100] [--fornecedores 3] [--ruido 0.1]
+        [--formatos pdf excel] [--repeticoes 3] [--saida benchmarks/resultados]
+        [--comparar resultado_anterior.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(RAIZ / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from gerador_bid import gerar_bid
+from utils.file_utils import comparar_dataframes_estruturados, comparar_propostas, extract_to_dataframes
+
+
+def info_commit():
+    """Commit atual do repositório e se há alterações não commitadas"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        alterado = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=RAIZ, capture_output=True, text=True
+        ).stdout.strip())
+        return commit, alterado
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido", False
+
+
+def medir(funcao, repeticoes):
+    """Executa a função repeticoes vezes; retorna (estatísticas dos tempos em s, último resultado)"""
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    estatisticas = {
+        "min": min(tempos),
+        "mediana": statistics.median(tempos),
+        "media": statistics.fmean(tempos),
+        "amostras": tempos,
+    }
+    return estatisticas, resultado
+
+
+def benchmark_formato(formato, args):
+    """Mede as etapas do pipeline para um BID sintético no formato dado"""
+    arquivos = gerar_bid(args.itens, args.fornecedores, args.ruido, formato, args.seed)
+    etapas = {}
+
+    etapas["extract_to_dataframes"], data = medir(
+        lambda: extract_to_dataframes(arquivos, usar_cache=False), args.repeticoes
+    )
+    mapa_df = data["dataframes"]["mapa_df"]
+    propostas_dfs = data["dataframes"]["propostas_dfs"]
+    etapas["comparar_dataframes_estruturados"], equalizacao = medir(
+        lambda: comparar_dataframes_estruturados(mapa_df, propostas_dfs, data), args.repeticoes
+    )
+    etapas["comparar_propostas"], comparacao = medir(
+        lambda: comparar_propostas(data["mapa_concorrencia"], data["propostas"]), args.repeticoes
+    )
+
+    # Relatórios: dependem de plotly/reportlab/streamlit, que podem não estar instalados no ambiente de medição
+    try:
+        from utils.report_generator import BIDReportGenerator, exportar_comparativo_excel
+    except ImportError as e:
+        print(f"  relatórios não medidos: {e}")
+    else:
+        if isinstance(comparacao, dict):
+            gerador = BIDReportGenerator()
+            dados = gerador.extract_data_from_comparison(comparacao, equalizacao)
+            etapas["generate_excel_report"], _ = medir(lambda: gerador.generate_excel_report(dados, {}), args.repeticoes)
+            etapas["generate_pdf_report"], _ = medir(lambda: gerador.generate_pdf_report(dados, {}), args.repeticoes)
+            df_painel = pd.DataFrame(comparacao["painel"])
+            etapas["exportar_comparativo_excel"], _ = medir(lambda: exportar_comparativo_excel(df_painel), args.repeticoes)
+
+    linhas = {
+        "mapa": len(mapa_df) if mapa_df is not None else 0,
+        "propostas": [len(df) if df is not None else 0 for df in propostas_dfs],
+        "bytes_entrada": sum(arquivo.size for arquivo in arquivos),
+    }
+    return {"etapas": etapas, "volume": linhas}
+
+
+def comparar_com(anterior, atual):
+    """Imprime a razão entre os tempos (mediana) de uma execução anterior e da atual"""
+    print(f"\nComparação com {anterior.get('commit', '?')[:8]} (razão > 1: execução atual mais rápida)")
+    for formato, resultado in atual["formatos"].items():
+        etapas_anteriores = anterior.get("formatos", {}).get(formato, {}).get("etapas", {})
+        for etapa, tempos in resultado["etapas"].items():
+            if etapa in etapas_anteriores:
+                razao = etapas_anteriores[etapa]["mediana"] / tempos["mediana"]
+                print(f"  {formato:6} {etapa:34} {etapas_anteriores[etapa]['mediana']:8.3f}s -> {tempos['mediana']:8.3f}s  {razao:5.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline de análise de BID.")
+    parser.add_argument("--itens", type=int, default=100, help="Itens no mapa de concorrência")
+    parser.add_argument("--fornecedores", type=int, default=3, help="Número de propostas")
+    parser.add_argument("--ruido", type=float, default=0.1, help="Ruído das propostas em relação ao mapa (0 a 1)")
+    parser.add_argument("--formatos", nargs="+", choices=["pdf", "excel", "misto"], default=["pdf", "excel"])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--saida", default=str(RAIZ / "benchmarks" / "resultados"), help="Diretório dos resultados JSON")
+    parser.add_argument("--comparar", help="Resultado JSON anterior para comparação")
+    args = parser.parse_args()
+
+    commit, alterado = info_commit()
+    resultado = {
+        "commit": commit,
+        "alteracoes_nao_commitadas": alterado,
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parametros": {
+            "itens": args.itens,
+            "fornecedores": args.fornecedores,
+            "ruido": args.ruido,
+            "repeticoes": args.repeticoes,
+            "seed": args.seed,
+        },
+        "formatos": {},
+    }
+
+    for formato in args.formatos:
+        print(f"Formato {formato}:")
+        resultado["formatos"][formato] = benchmark_formato(formato, args)
+        for etapa, tempos in resultado["formatos"][formato]["etapas"].items():
+            print(f"  {etapa:34} mediana {tempos['mediana']:8.3f}s | mín {tempos['min']:8.3f}s")
+
+    saida = Path(args.saida)
+    saida.mkdir(parents=True, exist_ok=True)
+    arquivo = saida / f"{datetime.now():%Y%m%d-%H%M%S}-{commit[:8]}.json"
+    arquivo.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nResultado gravado em {arquivo}")
+
+    if args.comparar:
+        comparar_com(json.loads(Path(args.comparar).read_text(encoding="utf-8")), resultado)
+
+
+if __name__ == "__main__":
+    main()
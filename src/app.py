@@ -1,5 +1,6 @@
 import io
 import streamlit as st
+from contextlib import contextmanager
 from pathlib import Path
 
 # Inicializar variáveis de sessão no topo
@@ -17,9 +18,174 @@ except ImportError:
     FPDF = None
 import streamlit as st
 from pathlib import Path
-from utils.file_utils import extract_structured_data, analyze_with_openai_structured, comparar_propostas
-from utils.report_generator import BIDReportGenerator
+from utils.file_utils import extract_structured_data, analyze_with_openai_structured, comparar_propostas, converter_moeda_br, calcular_hash_arquivo
+from utils.report_generator import BIDReportGenerator, exportar_comparativo_excel, exportar_comparativo_pdf
+from utils.profiling import RASTREAR_MEMORIA, execucao_monitorada, medir_etapa, metricas_prometheus
 import pandas as pd
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Número de execuções mantidas no painel de diagnóstico
+MAX_DIAGNOSTICOS = 10
+
+@contextmanager
+def monitorar(nome):
+    """Mede as etapas executadas no bloco e guarda o registro no painel de diagnóstico (se algo foi calculado)"""
+    # Pico de memória só quando ativado no painel de diagnóstico (ou por BID_PERFIL_MEMORIA=1)
+    with execucao_monitorada(nome, rastrear_memoria=st.session_state.get("medir_memoria", RASTREAR_MEMORIA)) as registro:
+        yield registro
+    if registro.etapas or registro.contadores:
+        diagnosticos = st.session_state.setdefault("diagnosticos", [])
+        diagnosticos.append(registro)
+        del diagnosticos[:-MAX_DIAGNOSTICOS]
+
+# Memoização entre reruns: cada clique em expander/aba reexecuta o script inteiro, então extração,
+# comparação e equalização são indexadas pelo hash do conteúdo dos arquivos e só rodam uma vez.
+# Parâmetros com "_" não entram na chave do st.cache_data; a chave é sempre chave_arquivos.
+def chave_dos_arquivos(files):
+    """Chave estável do conjunto de arquivos enviados: (nome, hash do conteúdo) de cada arquivo"""
+    hashes = st.session_state.setdefault("hashes_arquivos", {})
+    chave = []
+    for file in files:
+        file_id = getattr(file, "file_id", None) or (file.name, file.size)
+        if file_id not in hashes:
+            hashes[file_id] = calcular_hash_arquivo(file)
+        chave.append((file.name, hashes[file_id]))
+    return tuple(chave)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def extrair_dados_memo(chave_arquivos, _files):
+    """Extração estruturada memoizada pelo conteúdo dos arquivos"""
+    return extract_structured_data(_files)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def comparar_propostas_memo(chave_arquivos, _mapa, _propostas):
+    """Comparação das propostas com o mapa, memoizada pela extração de origem"""
+    with medir_etapa("comparacao_propostas"):
+        return comparar_propostas(_mapa, _propostas)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def analisar_equalizacao_memo(chave_arquivos, _data):
+    """Análise de equalização memoizada pela extração de origem"""
+    return analyze_with_openai_structured(_data)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def montar_relatorio_comparativo(chave_arquivos, _comparacao):
+    """Monta a tabela comparativa, o ranking de fornecedores e o DataFrame de exportação"""
+    tabela_comparativa = []
+    for item in _comparacao['resultado']:
+        fornecedores = item.get("fornecedores", {})
+        # Valores do item por fornecedor como números ("-" vira NaN)
+        valores_fornecedores = converter_moeda_br(pd.Series(
+            {f: d.get("valor", 0) for f, d in fornecedores.items()}, dtype=object
+        ))
+        pior_preco = valores_fornecedores.idxmax() if valores_fornecedores.notna().any() else ""
+        for fornecedor, dados in fornecedores.items():
+            linha = {
+                "Item": item.get("item", ""),
+                "Qtd.": item.get("quantidade", ""),
+                "Fabricante": dados.get("fabricante", fornecedor),
+                "Modelo": dados.get("modelo_produto", dados.get("modelo", "")),
+                "Fornecedor": fornecedor,
+                "Valor Uni (R$)": dados.get("valor", ""),
+                "Especificação": dados.get("especificacao", ""),
+                "Melhor Preço": item.get("melhor_preco", ""),
+                "Pior Preço": pior_preco,
+                "Diferença": item.get("diferenca_valores", ""),
+                "Sugestão": item.get("recomendacao", "")
+            }
+            tabela_comparativa.append(linha)
+    df_comparativo = pd.DataFrame(tabela_comparativa)
+
+    # Resumo final: ranking dos fornecedores pelo valor total
+    ranking = {}
+    for item in _comparacao['resultado']:
+        for f, d in item['fornecedores'].items():
+            if isinstance(d['valor'], (int, float)):
+                ranking[f] = ranking.get(f, 0) + d['valor']
+    ranking_ord = sorted(ranking.items(), key=lambda x: x[1])
+
+    # Monta DataFrame do resultado
+    df_result = pd.DataFrame([
+        {
+            'Item': item.get('item',''),
+            **{f: item['fornecedores'][f]['valor'] for f in item['fornecedores']},
+            'Melhor Fornecedor': item.get('melhor_preco',''),
+            'Pior Fornecedor': (
+                max(
+                    [f for f in item['fornecedores'] if isinstance(item['fornecedores'][f]['valor'], (int, float))],
+                    key=lambda f: item['fornecedores'][f]['valor']
+                ) if any(isinstance(item['fornecedores'][f]['valor'], (int, float)) for f in item['fornecedores']) else ''
+            ),
+            'Diferença': item.get('diferenca_valores','')
+        }
+        for item in _comparacao['resultado']
+    ])
+    return df_comparativo, ranking_ord, df_result
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def gerar_exportacao_memo(chave_arquivos, formato, _df_result):
+    """Gera o arquivo de exportação ("excel" ou "pdf") uma única vez por comparação"""
+    with medir_etapa("exportacao", formato):
+        if formato == "excel":
+            return exportar_comparativo_excel(_df_result)
+        return exportar_comparativo_pdf(_df_result)
+
+def solicitar_exportacao(chave_arquivos, formato):
+    """Callback dos botões de exportação: marca o formato como solicitado para esta comparação"""
+    st.session_state.setdefault("exportacoes_solicitadas", set()).add((chave_arquivos, formato))
+
+def exibir_diagnosticos():
+    """Painel recolhível com tempo, CPU e pico de memória das etapas das últimas execuções"""
+    diagnosticos = st.session_state.get("diagnosticos", [])
+    if not diagnosticos:
+        return
+    with st.expander("🩺 Diagnóstico de desempenho", expanded=False):
+        st.checkbox(
+            "Medir o pico de memória nas próximas execuções (tracemalloc; deixa a análise mais lenta)",
+            value=RASTREAR_MEMORIA,
+            key="medir_memoria",
+        )
+        for registro in reversed(diagnosticos):
+            st.markdown(f"**{registro.nome}** — {registro.inicio:%d/%m/%Y %H:%M:%S} — {registro.segundos:.2f}s")
+            df_etapas = pd.DataFrame(registro.etapas)
+            df_etapas["pico_memoria_mb"] = pd.to_numeric(df_etapas["pico_memoria_bytes"]) / (1024 * 1024)
+            st.dataframe(
+                df_etapas[["etapa", "arquivo", "segundos", "cpu_segundos", "pico_memoria_mb"]],
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "etapa": "Etapa",
+                    "arquivo": "Arquivo",
+                    "segundos": st.column_config.NumberColumn("Tempo (s)", format="%.3f"),
+                    "cpu_segundos": st.column_config.NumberColumn("CPU (s)", format="%.3f"),
+                    "pico_memoria_mb": st.column_config.NumberColumn("Pico de memória (MB)", format="%.1f"),
+                }
+            )
+            if not registro.memoria_medida:
+                st.caption("Pico de memória não medido nesta execução (desativado ou outra execução simultânea).")
+            if registro.contadores:
+                st.caption(", ".join(f"{nome}: {valor:g}" for nome, valor in registro.contadores.items()))
+            taxas = registro.taxas_acerto()
+            if taxas:
+                st.caption("Taxas de acerto: " + ", ".join(f"{nome}: {taxa:.0%}" for nome, taxa in taxas.items()))
+        col_json, col_prometheus = st.columns(2)
+        with col_json:
+            st.download_button(
+                "⬇️ Diagnóstico (JSON)",
+                data=json.dumps([registro.to_dict() for registro in diagnosticos], ensure_ascii=False, indent=2),
+                file_name="diagnostico_bid.json",
+                mime="application/json",
+            )
+        with col_prometheus:
+            st.download_button(
+                "⬇️ Métricas (Prometheus)",
+                data=metricas_prometheus(),
+                file_name="metricas_bid.prom",
+                mime="text/plain",
+            )
 
 def exibir_tabelas_estruturadas():
     """Exibe tabelas estruturadas separadas para mapa e propostas"""
@@ -43,6 +209,7 @@ def exibir_tabelas_estruturadas():
                 "Nome_Proposta": "Nome da Proposta",
                 "Numero_Proposta": "Nº Proposta",
                 "Empresa_Participante": "Empresa",
+                "Aba_Planilha": "Aba",
                 "Modelo_Produto": "Modelo",
                 "Item": "Descrição do Item",
                 "Quantidade": st.column_config.NumberColumn("Qtd.", format="%.0f"),
@@ -82,6 +249,7 @@ def exibir_tabelas_estruturadas():
                         "Nome_Proposta": "Nome da Proposta",
                         "Numero_Proposta": "Nº Proposta",
                         "Empresa_Participante": "Empresa",
+                        "Aba_Planilha": "Aba",
                         "Modelo_Produto": "Modelo",
                         "Item": "Descrição do Item",
                         "Quantidade": st.column_config.NumberColumn("Qtd.", format="%.0f"),
@@ -117,6 +285,7 @@ def exibir_tabelas_estruturadas():
                                 "Nome_Proposta": "Nome da Proposta",
                                 "Numero_Proposta": "Nº Proposta",
                                 "Empresa_Participante": "Empresa",
+                                "Aba_Planilha": "Aba",
                                 "Modelo_Produto": "Modelo",
                                 "Item": "Descrição do Item",
                                 "Quantidade": st.column_config.NumberColumn("Qtd.", format="%.0f"),
@@ -329,8 +498,11 @@ if uploaded_files:
 
     if st.button("🔍 Solicitar Extração dos Dados", type="primary"):
         with st.spinner("🔄 Extraindo dados dos documentos..."):
-            result = extract_structured_data(uploaded_files)
+            chave_arquivos = chave_dos_arquivos(uploaded_files)
+            with monitorar("extracao"):
+                result = extrair_dados_memo(chave_arquivos, uploaded_files)
             st.session_state.analysis_result = result
+            st.session_state.chave_extracao = chave_arquivos
 
 
     # Exibe sempre que houver resultado de extração
@@ -352,103 +524,62 @@ if uploaded_files:
         if not mapa or not mapa.get("itens"):
             st.warning("Por favor, insira o mapa de concorrência para realizar a análise comparativa.")
         else:
-            comparacao = comparar_propostas(mapa, propostas)
+            chave_extracao = st.session_state.get("chave_extracao")
+            with monitorar("comparacao"):
+                comparacao = comparar_propostas_memo(chave_extracao, mapa, propostas)
             if isinstance(comparacao, dict):
                 st.success("✅ Relatório comparativo gerado!")
                 st.markdown("### 📊 Relatório Técnico Comparativo")
-                # Monta DataFrame para o relatório técnico comparativo
-                import pandas as pd
-                tabela_comparativa = []
-                for item, mix_item in zip(comparacao['resultado'], comparacao['mix_melhor_preco']):
-                    fornecedores = item.get("fornecedores", {})
-                    for fornecedor, dados in fornecedores.items():
-                        linha = {
-                            "Item": item.get("item", ""),
-                            "Qtd.": item.get("quantidade", ""),
-                            "Fabricante": dados.get("fabricante", fornecedor),
-                            "Modelo": dados.get("modelo_produto", dados.get("modelo", "")),
-                            "Fornecedor": fornecedor,
-                            "Valor Uni (R$)": dados.get("valor", ""),
-                            "Especificação": dados.get("especificacao", ""),
-                            "Melhor Preço": item.get("melhor_preco", ""),
-                            "Pior Preço": (
-                                max(
-                                    [f for f in fornecedores if isinstance(fornecedores[f].get("valor",0), (int, float)) or str(fornecedores[f].get("valor",0)).replace(',','').replace('.','').isdigit()],
-                                    key=lambda x: float(str(fornecedores[x].get("valor",0)).replace('.','').replace(',','.')) if str(fornecedores[x].get("valor",0)).replace(',','').replace('.','').isdigit() else 0
-                                ) if [f for f in fornecedores if isinstance(fornecedores[f].get("valor",0), (int, float)) or str(fornecedores[f].get("valor",0)).replace(',','').replace('.','').isdigit()] else ""
-                            ) if fornecedores else "",
-                            "Diferença": item.get("diferenca_valores", ""),
-                            "Sugestão": item.get("recomendacao", "")
-                        }
-                        tabela_comparativa.append(linha)
-                df_comparativo = pd.DataFrame(tabela_comparativa)
+                df_comparativo, ranking_ord, df_result = montar_relatorio_comparativo(chave_extracao, comparacao)
                 st.dataframe(df_comparativo, use_container_width=True)
                 # Removido Mix de Melhor Preço por Item
-                # Resumo final: ranking dos fornecedores pelo valor total
                 st.markdown("#### 🏅 Ranking dos Fornecedores pelo Valor Total")
-                ranking = {}
-                for item in comparacao['resultado']:
-                    for f, d in item['fornecedores'].items():
-                        if isinstance(d['valor'], (int, float)):
-                            ranking[f] = ranking.get(f, 0) + d['valor']
-                ranking_ord = sorted(ranking.items(), key=lambda x: x[1])
                 st.table([{ 'Fornecedor': f, 'Valor Total': v } for f, v in ranking_ord])
                 # Removido Condições de Pagamento e Descontos
 
                 # Botões de exportação Excel e PDF
                 st.markdown("---")
                 st.markdown("### Exportar Relatório")
-                import pandas as pd
-                from io import BytesIO
-                import base64
-                # Monta DataFrame do resultado
-                df_result = pd.DataFrame([
-                    {
-                        'Item': item.get('item',''),
-                        **{f: item['fornecedores'][f]['valor'] for f in item['fornecedores']},
-                        'Melhor Fornecedor': item.get('melhor_preco',''),
-                        'Pior Fornecedor': (
-                            max(
-                                [f for f in item['fornecedores'] if isinstance(item['fornecedores'][f]['valor'], (int, float))],
-                                key=lambda f: item['fornecedores'][f]['valor']
-                            ) if any(isinstance(item['fornecedores'][f]['valor'], (int, float)) for f in item['fornecedores']) else ''
-                        ),
-                        'Diferença': item.get('diferenca_valores','')
-                    }
-                    for item in comparacao['resultado']
-                ])
-                # Exportar Excel
-                output_excel = BytesIO()
-                df_result.to_excel(output_excel, index=False)
-                output_excel.seek(0)
-                b64_excel = base64.b64encode(output_excel.read()).decode()
-                href_excel = f'<a href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64_excel}" download="relatorio_comparativo.xlsx">📥 Baixar Excel</a>'
-                st.markdown(href_excel, unsafe_allow_html=True)
-                # Exportar PDF (simples, via HTML)
-                try:
-                    from fpdf import FPDF
-                    pdf = FPDF()
-                    pdf.add_page()
-                    pdf.set_font("Arial", size=12)
-                    pdf.cell(200, 10, txt="Relatório Comparativo de Propostas", ln=True, align='C')
-                    pdf.ln(10)
-                    # Cabeçalho
-                    colunas = df_result.columns.tolist()
-                    for col in colunas:
-                        pdf.cell(40, 10, col, border=1)
-                    pdf.ln()
-                    # Dados
-                    for i, row in df_result.iterrows():
-                        for col in colunas:
-                            valor = str(row[col])
-                            pdf.cell(40, 10, valor, border=1)
-                        pdf.ln()
-                    pdf_bytes = pdf.output(dest='S').encode('latin1')
-                    b64_pdf = base64.b64encode(pdf_bytes).decode()
-                    href_pdf = f'<a href="data:application/pdf;base64,{b64_pdf}" download="relatorio_comparativo.pdf">📥 Baixar PDF</a>'
-                    st.markdown(href_pdf, unsafe_allow_html=True)
-                except Exception as e:
-                    st.info("PDF não disponível: instale a biblioteca fpdf (pip install fpdf) para exportar.")
+                # Os arquivos só são gerados quando solicitados e ficam em cache para esta comparação
+                exportacoes = st.session_state.get("exportacoes_solicitadas", set())
+                col_excel, col_pdf = st.columns(2)
+                with col_excel:
+                    if (chave_extracao, "excel") in exportacoes:
+                        with monitorar("exportacao"):
+                            excel_bytes = gerar_exportacao_memo(chave_extracao, "excel", df_result)
+                        st.download_button(
+                            "📥 Baixar Excel",
+                            data=excel_bytes,
+                            file_name="relatorio_comparativo.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        )
+                    else:
+                        st.button("📊 Gerar Excel", on_click=solicitar_exportacao, args=(chave_extracao, "excel"))
+                with col_pdf:
+                    if (chave_extracao, "pdf") in exportacoes:
+                        pdf_bytes = erro_pdf = None
+                        try:
+                            with monitorar("exportacao"):
+                                pdf_bytes = gerar_exportacao_memo(chave_extracao, "pdf", df_result)
+                        except ImportError:
+                            pass
+                        except Exception as e:
+                            logger.exception("Erro ao gerar o PDF do relatório comparativo")
+                            erro_pdf = e
+                        if pdf_bytes:
+                            st.download_button(
+                                "📥 Baixar PDF",
+                                data=pdf_bytes,
+                                file_name="relatorio_comparativo.pdf",
+                                mime="application/pdf",
+                            )
+                        elif erro_pdf is not None:
+                            st.error(f"Erro ao gerar o PDF: {erro_pdf}")
+                        else:
+                            # Sem a biblioteca fpdf o exportador devolve None
+                            st.info("PDF não disponível: instale a biblioteca fpdf (pip install fpdf) para exportar.")
+                    else:
+                        st.button("📄 Gerar PDF", on_click=solicitar_exportacao, args=(chave_extracao, "pdf"))
             else:
                 st.error(comparacao[0].get('mensagem', 'Erro na análise comparativa.'))
     if "analysis_result_ia" in st.session_state:
@@ -457,7 +588,10 @@ if uploaded_files:
         # Botão para realizar análise de equalização
         if st.button("🎯 Analisar Equalização"):
             with st.spinner("⚙️ Realizando análise de equalização..."):
-                result_ia = analyze_with_openai_structured(st.session_state.analysis_result)
+                with monitorar("equalizacao"):
+                    result_ia = analisar_equalizacao_memo(
+                        st.session_state.get("chave_extracao"), st.session_state.analysis_result
+                    )
                 st.session_state.analise_ia_result = result_ia
 
         # Exibe resultado da análise de equalização
@@ -479,6 +613,8 @@ if st.session_state.get('analysis_completed', False) or st.session_state.get('an
         if st.button("📄 Gerar Relatório PDF"):
             st.info("Funcionalidade de relatório PDF será implementada em breve.")
 
+exibir_diagnosticos()
+
 # Rodapé
 st.markdown("---")
 st.markdown("""
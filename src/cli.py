@@ -0,0 +1,222 @@
+"""Processamento em lote de BIDs sem a interface Streamlit.
+
+Cada subpasta do diretório de entrada é um BID (mapa de concorrência + propostas em PDF/Excel).
+Para cada BID são gravados em <saida>/<bid>/ a comparação, o mix de melhor preço, a equalização
+e os relatórios Excel/PDF do BIDReportGenerator. BIDs já concluídos (com os mesmos arquivos de
+entrada) são pulados, então uma execução interrompida pode ser retomada.
+
+Uso:
+    python src/cli.py <diretorio_bids> --saida <diretorio_saida> [--workers N] [--forcar]
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from utils import file_utils
+from utils.extraction_cache import calcular_hash_bytes
+from utils.file_utils import (
+    abrir_arquivo_local,
+    analyze_with_openai_structured,
+    comparar_propostas,
+    extract_structured_data,
+)
+from utils.profiling import execucao_monitorada, medir_etapa
+
+logger = logging.getLogger("bid_cli")
+
+EXTENSOES_ACEITAS = {".pdf", ".xlsx", ".xls"}
+# Arquivo gravado por último na pasta de saída de cada BID: marca o BID como concluído
+MARCADOR_CONCLUIDO = ".concluido"
+
+
+def listar_bids(diretorio_entrada):
+    """Retorna as pastas de BID (subpastas com ao menos um PDF/Excel), em ordem alfabética"""
+    bids = []
+    for pasta in sorted(Path(diretorio_entrada).iterdir()):
+        if pasta.is_dir() and arquivos_do_bid(pasta):
+            bids.append(pasta)
+    return bids
+
+
+def arquivos_do_bid(pasta):
+    """Arquivos de mapa e propostas de uma pasta de BID"""
+    return sorted(p for p in pasta.iterdir() if p.is_file() and p.suffix.lower() in EXTENSOES_ACEITAS)
+
+
+def assinatura_entrada(pasta):
+    """Identifica o estado dos arquivos de entrada do BID (nome, tamanho e data de modificação) e do extrator"""
+    partes = []
+    for caminho in arquivos_do_bid(pasta):
+        info = caminho.stat()
+        partes.append(f"{caminho.name}|{info.st_size}|{info.st_mtime_ns}")
+    return calcular_hash_bytes(file_utils.EXTRACTOR_VERSION, file_utils.VOCABULARIO.assinatura, *partes)
+
+
+def bid_concluido(pasta, diretorio_saida):
+    """Verifica se o BID já foi processado com os arquivos de entrada atuais"""
+    marcador = Path(diretorio_saida) / pasta.name / MARCADOR_CONCLUIDO
+    try:
+        return marcador.read_text(encoding="utf-8").strip() == assinatura_entrada(pasta)
+    except OSError:
+        return False
+
+
+def _json_padrao(obj):
+    """Converte DataFrames e tipos numpy/pandas para estruturas serializáveis em JSON"""
+    if isinstance(obj, pd.DataFrame):
+        return json.loads(obj.to_json(orient="records", force_ascii=False))
+    if isinstance(obj, pd.Series):
+        return json.loads(obj.to_json(force_ascii=False))
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)
+
+
+def _limpar_nan(obj):
+    """Troca NaN/infinito por None para gerar JSON válido"""
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    if isinstance(obj, dict):
+        return {chave: _limpar_nan(valor) for chave, valor in obj.items()}
+    if isinstance(obj, list):
+        return [_limpar_nan(valor) for valor in obj]
+    return obj
+
+
+def salvar_json(caminho, dados):
+    """Grava dados em JSON (UTF-8, indentado)"""
+    dados = _limpar_nan(json.loads(json.dumps(dados, default=_json_padrao)))
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+
+
+def processar_bid(pasta, diretorio_saida):
+    """Extrai, compara, equaliza e gera os relatórios de um BID. Retorna (nome, segundos)"""
+    # Importado aqui: o módulo de relatórios carrega plotly/reportlab, desnecessários no processo principal
+    from utils.report_generator import BIDReportGenerator
+
+    inicio = time.perf_counter()
+    pasta = Path(pasta)
+    assinatura = assinatura_entrada(pasta)
+    saida = Path(diretorio_saida) / pasta.name
+    # Refaz a pasta de saída do zero: arquivos parciais de uma execução interrompida são descartados
+    if saida.exists():
+        shutil.rmtree(saida)
+    saida.mkdir(parents=True)
+
+    with execucao_monitorada(pasta.name) as registro:
+        arquivos = [abrir_arquivo_local(caminho) for caminho in arquivos_do_bid(pasta)]
+        data = extract_structured_data(arquivos)
+
+        with medir_etapa("comparacao_propostas"):
+            comparacao = comparar_propostas(data.get("mapa_concorrencia"), data.get("propostas", []))
+        if not isinstance(comparacao, dict):
+            raise ValueError(comparacao[0].get("mensagem", "Erro na análise comparativa."))
+        equalizacao = analyze_with_openai_structured(data)
+        if equalizacao.get("erro"):
+            raise ValueError(equalizacao.get("mensagem", "Erro na equalização."))
+
+        salvar_json(saida / "comparacao.json", {"resultado": comparacao["resultado"], "painel": comparacao["painel"]})
+        salvar_json(saida / "mix_melhor_preco.json", {
+            "comparacao": comparacao["mix_melhor_preco"],
+            "equalizacao": equalizacao.get("mix_melhor_preco", {})
+        })
+        salvar_json(saida / "equalizacao.json", {
+            "resumo_equalizacao": equalizacao.get("resumo_equalizacao", {}),
+            # dataframe_original repete a proposta extraída e as correspondências de cada proposta
+            # estão na tabela única: só a versão equalizada vai para o disco
+            "propostas_analisadas": [
+                {chave: valor for chave, valor in proposta.items() if chave not in ("dataframe_original", "correspondencias")}
+                for proposta in equalizacao.get("propostas_analisadas", [])
+            ],
+            "correspondencias": equalizacao.get("correspondencias", []),
+            "comparacao_lado_a_lado": equalizacao.get("comparacao_lado_a_lado", [])
+        })
+
+        with medir_etapa("exportacao"):
+            gerador = BIDReportGenerator()
+            dados_relatorio = gerador.extract_data_from_comparison(comparacao, equalizacao)
+            excel = gerador.generate_excel_report(dados_relatorio, {})
+            if excel is not None:
+                (saida / "relatorio_bid.xlsx").write_bytes(excel.getvalue())
+            pdf = gerador.generate_pdf_report(dados_relatorio, {})
+            if pdf is not None:
+                (saida / "relatorio_bid.pdf").write_bytes(pdf.getvalue())
+
+    (saida / "diagnosticos.json").write_text(registro.to_json(), encoding="utf-8")
+    (saida / MARCADOR_CONCLUIDO).write_text(assinatura, encoding="utf-8")
+    return pasta.name, time.perf_counter() - inicio
+
+
+def _inicializar_worker():
+    """Cada processo trata um BID inteiro: a extração de PDF, a leitura das abas e a equalização dentro dele são seriais"""
+    file_utils.PDF_WORKERS = 1
+    file_utils.EXCEL_WORKERS = 1
+    file_utils.EQUALIZACAO_WORKERS = 1
+
+
+def processar_lote(diretorio_entrada, diretorio_saida, workers=None, forcar=False):
+    """Processa todos os BIDs pendentes em um pool de processos. Retorna o número de falhas"""
+    bids = listar_bids(diretorio_entrada)
+    pendentes = [pasta for pasta in bids if forcar or not bid_concluido(pasta, diretorio_saida)]
+    logger.info(f"{len(bids)} BIDs encontrados, {len(bids) - len(pendentes)} já concluídos, {len(pendentes)} a processar")
+    if not pendentes:
+        return 0
+
+    workers = min(workers or os.cpu_count() or 1, len(pendentes))
+    inicio = time.perf_counter()
+    concluidos = 0
+    falhas = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker) as executor:
+        futuros = {executor.submit(processar_bid, pasta, diretorio_saida): pasta for pasta in pendentes}
+        for futuro in as_completed(futuros):
+            pasta = futuros[futuro]
+            try:
+                _, segundos = futuro.result()
+                concluidos += 1
+                status = f"ok em {segundos:.1f}s"
+            except Exception as e:
+                falhas += 1
+                status = f"ERRO: {e}"
+                logger.error(f"Erro ao processar BID {pasta.name}: {e}")
+            decorrido = time.perf_counter() - inicio
+            logger.info(
+                f"[{concluidos + falhas}/{len(pendentes)}] {pasta.name}: {status} "
+                f"({concluidos / decorrido * 60:.1f} BIDs/min)"
+            )
+
+    decorrido = time.perf_counter() - inicio
+    logger.info(
+        f"Lote finalizado: {concluidos} concluídos, {falhas} com erro em {decorrido:.1f}s "
+        f"({concluidos / decorrido * 60:.1f} BIDs/min)"
+    )
+    return falhas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Processa em lote pastas de BID (mapa + propostas) sem a interface.")
+    parser.add_argument("entrada", help="Diretório com uma subpasta por BID")
+    parser.add_argument("--saida", required=True, help="Diretório onde os resultados de cada BID são gravados")
+    parser.add_argument("--workers", type=int, default=None, help="Processos em paralelo (padrão: nº de CPUs)")
+    parser.add_argument("--forcar", action="store_true", help="Reprocessa também os BIDs já concluídos")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    falhas = processar_lote(args.entrada, args.saida, args.workers, args.forcar)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
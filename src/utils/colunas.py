@@ -0,0 +1,222 @@
+import re
+import unicodedata
+
+import pandas as pd
+
+# Papéis de coluna reconhecidos nas planilhas de mapa/proposta
+PAPEIS = ["item", "modelo", "quantidade", "unidade", "custo_unitario", "custo_total"]
+
+# Sinônimos de cabeçalho (já normalizados: minúsculas, sem acento e pontuação) e o peso de cada um
+SINONIMOS_CABECALHO = [
+    ("custo_unitario", r"\b(valor|vlr|vl|preco|custo|pr)\s*(unit|unitario|unit r|un)\b", 3),
+    ("custo_unitario", r"\b(p\s*unit|unitario)\b", 2),
+    ("custo_total", r"\b(valor|vlr|vl|preco|custo)\s*(total|tot|global)\b", 3),
+    ("custo_total", r"^(sub)?total\b", 2),
+    ("quantidade", r"^(qtd|qtde|qde|qt|quant|quantidade|quantid)\b", 3),
+    ("unidade", r"^(un|und|unid|unidade|um|u m|medida)$", 3),
+    ("item", r"\b(descricao|especificacao|discriminacao|descritivo)\b", 3),
+    ("item", r"^(produto|material|servico|equipamento|item)s?\b", 1),
+    ("modelo", r"\b(modelo|referencia|ref|cod fabricante|codigo fabricante)\b", 3),
+]
+_SINONIMOS_COMPILADOS = [(papel, re.compile(padrao), peso) for papel, padrao, peso in SINONIMOS_CABECALHO]
+
+# Valores monetários ("R$ 1.234,56", "1234,56") e números em texto
+_MOEDA = re.compile(r"R\$|\d,\d{2}\b")
+_NUMERO_TEXTO = re.compile(r"^\s*(R\$)?\s*-?[\d.]*\d(,\d+)?\s*$")
+# Linhas do topo da planilha examinadas em busca do cabeçalho real
+LINHAS_BUSCA_CABECALHO = 20
+# Comprimento máximo de uma célula de cabeçalho (descrições de produto são mais longas)
+COMPRIMENTO_MAXIMO_CABECALHO = 50
+# Peso mínimo de ao menos um sinônimo da linha de cabeçalho ("Equipamento", "Un" sozinhos não bastam)
+PESO_SINONIMO_FORTE = 3
+
+
+def normalizar_cabecalho(texto):
+    """Normaliza um cabeçalho: minúsculas, sem acentos e sem pontuação"""
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).lower()
+    return re.sub(r"[^a-z0-9]+", " ", texto).strip()
+
+
+def papel_do_cabecalho(cabecalho):
+    """Retorna (papel, peso) do sinônimo de maior peso que casa com o cabeçalho, ou (None, 0)"""
+    normalizado = normalizar_cabecalho(cabecalho)
+    melhor = (None, 0)
+    for papel, padrao, peso in _SINONIMOS_COMPILADOS:
+        if peso > melhor[1] and padrao.search(normalizado):
+            melhor = (papel, peso)
+    return melhor
+
+
+def estatisticas_coluna(valores):
+    """Estatísticas de tipo de uma amostra de valores não nulos de uma coluna"""
+    total = len(valores)
+    if total == 0:
+        return None
+    numericos = inteiros = moeda = texto = codigos_curtos = 0
+    comprimento = 0
+    for valor in valores:
+        if isinstance(valor, bool):
+            continue
+        if isinstance(valor, (int, float)):
+            numericos += 1
+            if float(valor).is_integer():
+                inteiros += 1
+            else:
+                moeda += 1
+            continue
+        valor = str(valor).strip()
+        comprimento += len(valor)
+        if _NUMERO_TEXTO.match(valor):
+            numericos += 1
+            if _MOEDA.search(valor):
+                moeda += 1
+            elif valor.replace(".", "").isdigit():
+                inteiros += 1
+        elif _MOEDA.search(valor):
+            moeda += 1
+        elif any(c.isalpha() for c in valor):
+            texto += 1
+            if len(valor) <= 4:
+                codigos_curtos += 1
+    return {
+        "numerico": numericos / total,
+        "inteiro": inteiros / total,
+        "moeda": moeda / total,
+        "texto": texto / total,
+        "codigo_curto": codigos_curtos / total,
+        "comprimento_medio": comprimento / total,
+    }
+
+
+def _compativel(papel, estatisticas):
+    """Confere se os valores da coluna são coerentes com o papel sugerido pelo cabeçalho"""
+    if estatisticas is None:
+        return True
+    if papel in ("quantidade", "custo_unitario", "custo_total"):
+        return estatisticas["numerico"] + estatisticas["moeda"] >= 0.5
+    if papel == "item":
+        return estatisticas["texto"] >= 0.5
+    return True
+
+
+def _valor_numerico(valor):
+    """Confere se a célula é um número, uma quantidade ou um valor monetário (conteúdo de linha de dados)"""
+    if isinstance(valor, bool):
+        return False
+    if isinstance(valor, (int, float)):
+        return True
+    texto = str(valor).strip()
+    return bool(_NUMERO_TEXTO.match(texto)) or (bool(_MOEDA.search(texto)) and any(c.isdigit() for c in texto))
+
+
+def _linha_com_valores(valores):
+    """Confere se alguma célula da linha tem número ou valor monetário"""
+    return any(pd.notna(valor) and _valor_numerico(valor) for valor in valores)
+
+
+def _parece_cabecalho(valores):
+    """Confere se a linha é um cabeçalho: células curtas e não numéricas, ao menos dois sinônimos
+    reconhecidos e ao menos um deles forte"""
+    preenchidos = [valor for valor in valores if pd.notna(valor) and str(valor).strip()]
+    if not preenchidos or _linha_com_valores(preenchidos):
+        return False
+    if any(len(str(valor).strip()) > COMPRIMENTO_MAXIMO_CABECALHO for valor in preenchidos):
+        return False
+    pesos = [papel_do_cabecalho(valor)[1] for valor in preenchidos]
+    return sum(1 for peso in pesos if peso) >= 2 and max(pesos) >= PESO_SINONIMO_FORTE
+
+
+def _linha_de_cabecalho(df):
+    """Posição da primeira linha do topo que parece um cabeçalho (ou None)"""
+    for posicao in range(min(LINHAS_BUSCA_CABECALHO, len(df))):
+        if _parece_cabecalho(df.iloc[posicao]):
+            return posicao
+    return None
+
+
+def _reposicionar_cabecalho(df):
+    """Quando o cabeçalho lido não é o real (colunas "Unnamed", título no topo), usa a linha de cabeçalho encontrada.
+
+    Linhas acima do cabeçalho encontrado só são descartadas se não tiverem números nem valores
+    monetários (títulos, dados do fornecedor); caso contrário, a planilha é de dados sem cabeçalho.
+    """
+    colunas_sem_nome = sum(1 for coluna in df.columns if str(coluna).startswith("Unnamed"))
+    reconhecidos = sum(1 for coluna in df.columns if papel_do_cabecalho(coluna)[0])
+    if reconhecidos >= 2 or (colunas_sem_nome * 2 < len(df.columns) and reconhecidos):
+        return df
+    posicao = _linha_de_cabecalho(df)
+    if posicao is None:
+        return df
+    colunas_nomeadas = [coluna for coluna in df.columns if not str(coluna).startswith("Unnamed")]
+    if _linha_com_valores(colunas_nomeadas) or any(_linha_com_valores(df.iloc[p]) for p in range(posicao)):
+        return df
+    cabecalho = [
+        str(valor).strip() if pd.notna(valor) else f"Unnamed: {j}"
+        for j, valor in enumerate(df.iloc[posicao])
+    ]
+    df = df.iloc[posicao + 1:].reset_index(drop=True)
+    df.columns = cabecalho
+    return df
+
+
+def detectar_papeis_colunas(df, amostra=200):
+    """Detecta o papel de cada coluna da planilha (item, quantidade, unidade, custos, modelo).
+
+    Usa os nomes de cabeçalho (sinônimos como "Qtd", "Descrição", "Valor Unit.") validados por
+    estatísticas de tipo de uma amostra das linhas; papéis sem cabeçalho reconhecido são inferidos
+    só pelas estatísticas. Se o cabeçalho real não estiver na primeira linha, ele é procurado no topo.
+    Retorna (df, papeis), onde df pode ter o cabeçalho reposicionado e papeis mapeia papel -> coluna.
+    """
+    df = _reposicionar_cabecalho(df)
+    colunas = list(df.columns)
+    estatisticas = {}
+    for posicao, coluna in enumerate(colunas):
+        serie = df.iloc[:, posicao]
+        estatisticas[posicao] = estatisticas_coluna(serie[serie.notna()].head(amostra).tolist())
+
+    # 1) Cabeçalhos reconhecidos: para cada papel, a coluna de maior peso (a mais à esquerda no empate)
+    papeis = {}
+    pesos = {}
+    usadas = set()
+    for posicao, coluna in enumerate(colunas):
+        papel, peso = papel_do_cabecalho(coluna)
+        if papel and peso > pesos.get(papel, 0) and _compativel(papel, estatisticas[posicao]):
+            if papel in papeis:
+                usadas.discard(papeis[papel])
+            papeis[papel] = posicao
+            pesos[papel] = peso
+            usadas.add(posicao)
+
+    # 2) Papéis restantes inferidos pelo conteúdo das colunas sem cabeçalho reconhecido
+    livres = [
+        p for p in range(len(colunas))
+        if p not in usadas and estatisticas[p] is not None and not papel_do_cabecalho(colunas[p])[0]
+    ]
+    monetarias = [p for p in livres if estatisticas[p]["moeda"] >= 0.5]
+    if "custo_unitario" not in papeis and monetarias:
+        papeis["custo_unitario"] = monetarias[0]
+        usadas.add(monetarias[0])
+    if "custo_total" not in papeis and len(monetarias) > 1:
+        papeis["custo_total"] = monetarias[-1]
+        usadas.add(monetarias[-1])
+    livres = [p for p in livres if p not in usadas]
+    if "item" not in papeis:
+        textuais = [p for p in livres if estatisticas[p]["texto"] >= 0.5 and estatisticas[p]["comprimento_medio"] > 10]
+        if textuais:
+            papeis["item"] = max(textuais, key=lambda p: estatisticas[p]["comprimento_medio"])
+            usadas.add(papeis["item"])
+    if "unidade" not in papeis:
+        unidades = [p for p in livres if p not in usadas and estatisticas[p]["codigo_curto"] >= 0.8]
+        if unidades:
+            papeis["unidade"] = unidades[0]
+            usadas.add(unidades[0])
+    if "quantidade" not in papeis:
+        quantidades = [
+            p for p in livres
+            if p not in usadas and estatisticas[p]["inteiro"] >= 0.8 and estatisticas[p]["moeda"] < 0.5
+        ]
+        if quantidades:
+            papeis["quantidade"] = quantidades[0]
+
+    return df, {papel: colunas[posicao] for papel, posicao in papeis.items()}
@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Configuração do cache persistente de extração
+CACHE_DIR = os.getenv("BID_CACHE_DIR", str(Path.home() / ".cache" / "tools-bid-analyzer"))
+# Tamanho máximo do cache em MB (0 desativa o cache)
+CACHE_MAX_MB = float(os.getenv("BID_CACHE_MAX_MB", "512"))
+
+
+def calcular_hash_bytes(*partes):
+    """Calcula o SHA-256 de uma sequência de partes (bytes ou texto)"""
+    sha = hashlib.sha256()
+    for parte in partes:
+        if isinstance(parte, str):
+            parte = parte.encode("utf-8")
+        sha.update(len(parte).to_bytes(8, "little"))
+        sha.update(parte)
+    return sha.hexdigest()
+
+
+class ExtractionCache:
+    """Cache em disco (SQLite) dos resultados de extração, endereçado por conteúdo e com despejo LRU"""
+
+    def __init__(self, diretorio=None, tamanho_maximo_mb=None):
+        self.diretorio = Path(diretorio or CACHE_DIR)
+        self.tamanho_maximo = int((CACHE_MAX_MB if tamanho_maximo_mb is None else tamanho_maximo_mb) * 1024 * 1024)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.caminho = self.diretorio / "extracoes.sqlite3"
+        with self._conectar() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS extracoes (
+                    chave TEXT PRIMARY KEY,
+                    tamanho INTEGER NOT NULL,
+                    ultimo_acesso REAL NOT NULL,
+                    dados BLOB NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_ultimo_acesso ON extracoes (ultimo_acesso)")
+
+    @contextmanager
+    def _conectar(self):
+        """Conexão de uma operação: confirma (ou desfaz, em caso de erro) a transação e fecha a conexão"""
+        # Uma conexão por operação: o Streamlit executa cada sessão em uma thread diferente
+        conn = sqlite3.connect(self.caminho, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, chave):
+        """Retorna o valor armazenado para a chave, ou None se não estiver no cache"""
+        try:
+            with self._conectar() as conn:
+                linha = conn.execute("SELECT dados FROM extracoes WHERE chave = ?", (chave,)).fetchone()
+                if linha is None:
+                    return None
+                conn.execute("UPDATE extracoes SET ultimo_acesso = ? WHERE chave = ?", (time.time(), chave))
+            return pickle.loads(linha[0])
+        except Exception as e:
+            logger.warning(f"Erro ao ler cache de extração: {e}")
+            return None
+
+    def set(self, chave, valor):
+        """Armazena o valor no cache e despeja as entradas menos usadas se o limite for excedido"""
+        try:
+            dados = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+            if len(dados) > self.tamanho_maximo:
+                return
+            with self._conectar() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO extracoes (chave, tamanho, ultimo_acesso, dados) VALUES (?, ?, ?, ?)",
+                    (chave, len(dados), time.time(), dados)
+                )
+                self._despejar(conn)
+        except Exception as e:
+            logger.warning(f"Erro ao gravar cache de extração: {e}")
+
+    def _despejar(self, conn):
+        """Remove as entradas acessadas há mais tempo até o cache caber no limite"""
+        total = conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM extracoes").fetchone()[0]
+        if total <= self.tamanho_maximo:
+            return
+        removidas = []
+        for chave, tamanho in conn.execute("SELECT chave, tamanho FROM extracoes ORDER BY ultimo_acesso"):
+            if total <= self.tamanho_maximo:
+                break
+            removidas.append((chave,))
+            total -= tamanho
+        conn.executemany("DELETE FROM extracoes WHERE chave = ?", removidas)
+
+    def clear(self):
+        """Remove todas as entradas do cache"""
+        with self._conectar() as conn:
+            conn.execute("DELETE FROM extracoes")
+
+    def tamanho_total(self):
+        """Retorna o tamanho ocupado pelas entradas, em bytes"""
+        with self._conectar() as conn:
+            return conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM extracoes").fetchone()[0]
+
+
+_cache_extracao = None
+
+
+def obter_cache_extracao():
+    """Retorna o cache de extração compartilhado, ou None se estiver desativado ou indisponível"""
+    global _cache_extracao
+    if CACHE_MAX_MB <= 0:
+        return None
+    if _cache_extracao is None:
+        try:
+            _cache_extracao = ExtractionCache()
+        except Exception as e:
+            logger.warning(f"Cache de extração indisponível: {e}")
+            return None
+    return _cache_extracao
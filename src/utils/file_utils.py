@@ -1,3 +1,5 @@
+import numpy as np
+import openpyxl
 import pandas as pd
 import PyPDF2
 import json
@@ -5,8 +7,30 @@ import openai
 import os
 from dotenv import load_dotenv
 from pathlib import Path
+from collections import Counter, deque
+from difflib import SequenceMatcher
+from itertools import islice, repeat
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree import ElementTree
+import io
 import logging
+import math
 import re
+import zipfile
+from utils.extraction_cache import calcular_hash_bytes, obter_cache_extracao
+from utils.colunas import detectar_papeis_colunas
+from utils.matching import IndiceMapa, atribuicao_otima
+from utils.profiling import execucao_monitorada, incrementar, medir_etapa
+from utils.similaridade import (
+    VetoresTrigramas,
+    matriz_similaridade,
+    similaridade_limitada,
+    similaridade_par,
+    similaridades_pares,
+    usar_difflib,
+    usar_trigramas,
+)
+from utils.vocabulario import CATEGORIAS_ITENS, VOCABULARIO
 
 # Carrega variáveis de ambiente
 load_dotenv()
@@ -18,17 +42,120 @@ logger = logging.getLogger(__name__)
 # Configuração OpenAI
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-def extract_text_from_pdf_complete(file):
+# Versão do extrator: incrementar sempre que a saída de extract_to_dataframes mudar,
+# para invalidar o cache de extração em disco
+EXTRACTOR_VERSION = "10"
+
+# Configuração da extração paralela de PDF
+# Número de processos usados para extrair as páginas (0 = número de CPUs)
+PDF_WORKERS = int(os.getenv("BID_PDF_WORKERS", "0")) or (os.cpu_count() or 1)
+# Abaixo deste número de páginas a extração é serial (iniciar o pool custa mais do que economiza)
+PDF_MIN_PAGINAS_PARALELO = int(os.getenv("BID_PDF_MIN_PAGINAS_PARALELO", "16"))
+# Páginas por tarefa do pool (no máximo): com o PDF já aberto em cada processo, blocos pequenos
+# custam pouco e limitam as páginas em andamento
+PDF_PAGINAS_POR_BLOCO = 8
+# Linhas de texto do PDF estruturadas por bloco (limita a memória das linhas ainda não estruturadas)
+PDF_LINHAS_POR_BLOCO = int(os.getenv("BID_PDF_LINHAS_POR_BLOCO", "5000"))
+
+# Configuração da equalização paralela das propostas
+# Número de processos usados para equalizar as propostas (0 = número de CPUs)
+EQUALIZACAO_WORKERS = int(os.getenv("BID_EQUALIZACAO_WORKERS", "0")) or (os.cpu_count() or 1)
+# Abaixo deste total de linhas de proposta a equalização é serial (iniciar o pool custa mais do que economiza)
+EQUALIZACAO_MIN_LINHAS_PARALELO = int(os.getenv("BID_EQUALIZACAO_MIN_LINHAS_PARALELO", "1000"))
+
+# Configuração da leitura de planilhas grandes (.xlsx) em modo somente leitura, por blocos
+# Arquivos a partir deste tamanho (MB) são lidos sem carregar a planilha inteira em memória
+EXCEL_STREAMING_MB = float(os.getenv("BID_EXCEL_STREAMING_MB", "20"))
+# Linhas estruturadas por bloco na leitura por blocos
+EXCEL_LINHAS_POR_BLOCO = int(os.getenv("BID_EXCEL_LINHAS_POR_BLOCO", "5000"))
+# Linhas do topo usadas para detectar o cabeçalho e os papéis das colunas
+EXCEL_LINHAS_AMOSTRA = 200
+
+# Configuração da leitura paralela das abas de uma planilha
+# Número de processos usados para ler as abas (0 = número de CPUs)
+EXCEL_WORKERS = int(os.getenv("BID_EXCEL_WORKERS", "0")) or (os.cpu_count() or 1)
+# Abaixo deste número de abas a leitura é serial
+EXCEL_MIN_ABAS_PARALELO = int(os.getenv("BID_EXCEL_MIN_ABAS_PARALELO", "4"))
+# Namespaces XML do pacote .xlsx (usados para localizar o XML de cada aba)
+_NS_PLANILHA = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_RELACAO = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_PACOTE = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+# Entradas da tabela de textos compartilhados e células que apontam para ela
+_TEXTO_COMPARTILHADO = re.compile(rb"<si>.*?</si>|<si/>", re.DOTALL)
+_CELULA_TEXTO_COMPARTILHADO = re.compile(rb'(<c\b[^>]*\bt="s"[^>]*>\s*<v>)(\d+)(</v>)')
+
+# PDF aberto uma vez em cada processo do pool de extração das páginas
+_pdf_do_processo = None
+
+def _abrir_pdf_no_processo(pdf_bytes):
+    """Inicializador dos processos do pool: recebe os bytes e abre o PDF uma única vez por processo"""
+    global _pdf_do_processo
+    _pdf_do_processo = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+
+def _extrair_paginas_intervalo(inicio, fim):
+    """Extrai o texto das páginas [inicio, fim) do PDF aberto no processo (executada nos processos do pool)"""
+    return [_extrair_texto_pagina(_pdf_do_processo, numero) for numero in range(inicio, fim)]
+
+def _extrair_texto_pagina(reader, numero):
+    """Extrai o texto de uma única página, retornando string vazia em caso de erro"""
+    try:
+        return reader.pages[numero].extract_text() or ""
+    except Exception as e:
+        logger.error(f"Erro ao extrair texto da página {numero + 1} do PDF: {e}")
+        return ""
+
+def iter_pdf_pages(file, max_workers=None):
+    """Gera (numero_pagina, texto) para cada página do PDF, em ordem, extraindo em paralelo quando vale a pena"""
+    file.seek(0)
+    pdf_bytes = file.read()
+    reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    total_paginas = len(reader.pages)
+    workers = min(max_workers or PDF_WORKERS, total_paginas)
+
+    if workers <= 1 or total_paginas < PDF_MIN_PAGINAS_PARALELO:
+        for numero in range(total_paginas):
+            yield numero + 1, _extrair_texto_pagina(reader, numero)
+        return
+
+    # Blocos de páginas contíguas: os bytes do PDF vão uma única vez para cada processo (initializer)
+    # e as tarefas levam só o intervalo de páginas. Só mantém alguns blocos em andamento para não
+    # acumular o documento inteiro em memória.
+    tamanho_bloco = max(1, min(PDF_PAGINAS_POR_BLOCO, math.ceil(total_paginas / (workers * 4))))
+    blocos = deque(range(0, total_paginas, tamanho_bloco))
+    proxima_pagina = 0
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_abrir_pdf_no_processo, initargs=(pdf_bytes,)
+        ) as executor:
+            pendentes = deque()
+            while blocos or pendentes:
+                while blocos and len(pendentes) < workers * 2:
+                    inicio = blocos.popleft()
+                    fim = min(inicio + tamanho_bloco, total_paginas)
+                    pendentes.append(executor.submit(_extrair_paginas_intervalo, inicio, fim))
+                for texto_pagina in pendentes.popleft().result():
+                    proxima_pagina += 1
+                    yield proxima_pagina, texto_pagina
+    except Exception as e:
+        logger.warning(f"Extração paralela do PDF falhou, usando extração serial: {e}")
+        for numero in range(proxima_pagina, total_paginas):
+            yield numero + 1, _extrair_texto_pagina(reader, numero)
+
+def iter_linhas_pagina(numero, texto_pagina):
+    """Gera registros {"pagina", "linha"} com as linhas não vazias de uma página"""
+    for linha in texto_pagina.split('\n'):
+        if linha.strip():
+            yield {"pagina": numero, "linha": linha}
+
+def extract_pages_from_pdf(file, max_workers=None):
+    """Extrai o texto de cada página do PDF, preservando a ordem"""
+    return [texto_pagina for _, texto_pagina in iter_pdf_pages(file, max_workers=max_workers)]
+
+def extract_text_from_pdf_complete(file, max_workers=None):
     """Extrai TODO o texto do PDF para análise completa"""
     try:
-        file.seek(0)
-        reader = PyPDF2.PdfReader(file)
-        text = ""
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-        return text
+        paginas = extract_pages_from_pdf(file, max_workers=max_workers)
+        return "".join(page_text + "\n" for page_text in paginas if page_text)
     except Exception as e:
         logger.error(f"Erro ao extrair texto do PDF: {e}")
         return ""
@@ -50,49 +177,223 @@ def identify_supplier_from_filename(filename):
             return potential_company
         return "FORNECEDOR_NAO_IDENTIFICADO"
 
+def _blocos_de_texto(text):
+    """Normaliza a entrada dos extratores: uma string ou um iterável de blocos (ex.: páginas)"""
+    return [text] if isinstance(text, str) else text
+
+# Padrões do scanner: (palavra-chave, restante). Escritos em maiúsculas, pois o texto é
+# convertido com str.upper() antes da varredura (equivale a re.IGNORECASE, porém mais rápido)
+# Padrões de itens/equipamentos (formatos diversos encontrados nas propostas). Palavras-chave
+# isoladas (ambientes, famílias de equipamentos) vêm do vocabulário (utils.vocabulario)
+PADROES_ITENS = [
+    (r'UE-', r'\d+[A-Z]?\s*-[^-\n]+'),  # Padrão UE-01A - DESCRIÇÃO
+    (r'SPLIT', r'\s+\d+[.,]?\d*\s*BTU[/H]*'),
+    (r'CASSETE', r'\s+\d+[.,]?\d*\s*BTU[/H]*'),
+    (r'HI', r'\s*WALL\s+\d+[.,]?\d*\s*BTU[/H]*'),
+    (r'DUTO', r'\s+\d+[.,]?\d*\s*BTU[/H]*'),
+    (r'SUITE', r'\s*\d+'),
+    (r'FXEQ', r'\d+AVE'),
+    (r'FXFQ', r'\d+AVM'),
+    (r'FXSQ', r'\d+PAVE'),
+    (r'FXAQ', r'\d+AVM'),
+]
+# Padrões de valores monetários (apenas valores com vírgula e dois dígitos), por categoria.
+# O valor "simples" não tem palavra-chave; nos demais, o número vem após a palavra-chave.
+PADROES_VALORES = {
+    "rs": (r'R\$', r'\s*'),
+    "simples": ('', ''),
+    "total": (r'TOTAL', r'[:\s]*'),
+    "valor": (r'VALOR', r'[:\s]*'),
+}
+_NUMERO_VALOR = r'[\d\.]+,\d{2}'
+_NUMERO_VALOR_SIMPLES = r'\d{1,3}(?:\.\d{3})*,\d{2}'
+# Ordem das categorias de valores na saída de extract_values_from_text
+_CATEGORIAS_VALORES = tuple(PADROES_VALORES)
+
+def _compilar_scanner(incluir_itens, flags=0):
+    """Compila a alternância única usada por _acumular_tokens.
+
+    Cada alternativa consome só a palavra-chave (ou o valor simples) e confere o restante
+    por lookahead: tokens sobrepostos (ex.: "R$ 1.234,56" é valor rs e valor simples, um
+    item dentro de "UE-01 - ...") continuam sendo encontrados como nas buscas por padrão.
+    Os grupos ficam só dentro dos lookaheads: um grupo no início da alternativa impede o
+    re de pular rapidamente as posições que não começam nenhum token.
+    """
+    alternativas = [_NUMERO_VALOR_SIMPLES]
+    for categoria in ("rs", "total", "valor"):
+        palavra, separador = PADROES_VALORES[categoria]
+        alternativas.append(f'{palavra}(?={separador}(?P<{categoria}>{_NUMERO_VALOR}))')
+    if incluir_itens:
+        for i, (palavra, restante) in enumerate(PADROES_ITENS):
+            alternativas.append(f'{palavra}(?=(?P<item{i}>{restante}))')
+        alternativas.append(VOCABULARIO.expressao(CATEGORIAS_ITENS))
+    return re.compile('|'.join(alternativas), flags)
+
+_SCANNERS = {
+    (incluir_itens, flags): _compilar_scanner(incluir_itens, flags)
+    for incluir_itens in (False, True) for flags in (0, re.IGNORECASE)
+}
+
+def _valor_simples(token):
+    """Distingue o valor simples (ex.: "1.234,56") dos termos do vocabulário, as alternativas sem grupo"""
+    return token[:1].isdigit() and token[-3:-2] == ","
+
+def _preparar_varredura(texto, incluir_itens):
+    """Escolhe o scanner e o texto a varrer (em maiúsculas quando o tamanho se preserva)"""
+    texto_maiusculo = texto.upper()
+    if len(texto_maiusculo) == len(texto):
+        return _SCANNERS[(incluir_itens, 0)], texto_maiusculo
+    # Caracteres como "ß" mudam de tamanho em maiúsculas: varre o original ignorando caixa
+    return _SCANNERS[(incluir_itens, re.IGNORECASE)], texto
+
+def _acumular_tokens(texto, values_por_categoria, items=None):
+    """Varre o texto uma única vez acumulando os valores (por categoria rs/simples/total/valor) e,
+    com items (conjunto), os itens: padrões de PADROES_ITENS e termos do vocabulário"""
+    scanner, texto_varrido = _preparar_varredura(texto, items is not None)
+    fim_ultimo = {}
+    for match in scanner.finditer(texto_varrido):
+        grupo = match.lastgroup
+        if grupo is None:
+            token = match.group()
+            if _valor_simples(token):
+                # Valores só têm dígitos e pontuação: o texto varrido é igual ao original
+                values_por_categoria["simples"].append(token)
+                continue
+            # Termo do vocabulário: identificado pelo próprio termo
+            grupo = token.upper()
+            inicio, fim = match.span()
+        elif grupo in values_por_categoria:
+            values_por_categoria[grupo].append(match.group(grupo))
+            continue
+        else:
+            inicio, fim = match.start(), match.end(grupo)
+        if inicio < fim_ultimo.get(grupo, -1):
+            continue
+        fim_ultimo[grupo] = fim
+        items.add(texto[inicio:fim])
+
+def extrair_valores_e_itens(text):
+    """Extrai valores monetários e itens em uma única varredura (string ou iterável de páginas)"""
+    values_por_categoria = {categoria: [] for categoria in _CATEGORIAS_VALORES}
+    items = set()
+    for bloco in _blocos_de_texto(text):
+        _acumular_tokens(bloco, values_por_categoria, items)
+    values = [value for categoria in _CATEGORIAS_VALORES for value in values_por_categoria[categoria]]
+    return values, list(items)
+
 def extract_values_from_text(text):
-    """Extrai valores monetários do texto"""
-    # Padrões para valores monetários (apenas valores com vírgula e dois dígitos)
-    patterns = [
-        r'R\$\s*([\d\.]+,\d{2})',
-        r'(\d{1,3}(?:\.\d{3})*,\d{2})',
-        r'TOTAL[:\s]*([\d\.]+,\d{2})',
-        r'VALOR[:\s]*([\d\.]+,\d{2})'
-    ]
-    values = []
-    for pattern in patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        values.extend(matches)
-    return values
+    """Extrai valores monetários do texto (string ou iterável de páginas)"""
+    # Acumula por categoria para manter a ordem: R$, simples, TOTAL, VALOR
+    values_por_categoria = {categoria: [] for categoria in _CATEGORIAS_VALORES}
+    for bloco in _blocos_de_texto(text):
+        _acumular_tokens(bloco, values_por_categoria)
+    return [value for categoria in _CATEGORIAS_VALORES for value in values_por_categoria[categoria]]
+
+# Separador das linhas nas varreduras em lote: nenhum padrão de extração casa o caractere nulo
+# (ao contrário da quebra de linha, que casa com \s), então nenhuma ocorrência atravessa linhas
+_SEPARADOR_LINHAS = "\x00"
+
+def concatenar_linhas(linhas):
+    """Concatena as linhas para uma varredura única; retorna (texto, posição inicial de cada linha)"""
+    linhas = list(linhas)
+    inicios = np.cumsum([0] + [len(linha) + 1 for linha in linhas[:-1]]) if linhas else np.empty(0, dtype=np.int64)
+    return _SEPARADOR_LINHAS.join(linhas), inicios
+
+def _linhas_das_ocorrencias(inicios, matches):
+    """Índice da linha de cada ocorrência no texto concatenado"""
+    return np.searchsorted(inicios, [match.start() for match in matches], side="right") - 1
+
+def primeiras_ocorrencias(texto, inicios, padrao):
+    """Primeira ocorrência (match ou None) do padrão compilado em cada linha do texto concatenado"""
+    primeiras = [None] * len(inicios)
+    matches = list(padrao.finditer(texto))
+    if matches:
+        linhas = _linhas_das_ocorrencias(inicios, matches)
+        # As ocorrências vêm em ordem de posição: a primeira de cada linha é onde a linha muda
+        for k in np.flatnonzero(np.diff(linhas, prepend=-1)).tolist():
+            primeiras[linhas[k]] = matches[k]
+    return primeiras
+
+def valores_por_linha(linhas):
+    """Custo unitário e total de cada linha: primeiro e último valor, na ordem de extract_values_from_text.
+
+    As linhas são varridas de uma só vez e cada valor é atribuído à linha pela sua posição.
+    Linhas sem valor ficam com 0.0.
+    """
+    texto, inicios = concatenar_linhas(linhas)
+    unitarios = np.zeros(len(inicios))
+    totais = np.zeros(len(inicios))
+    scanner, texto_varrido = _preparar_varredura(texto, False)
+    matches = list(scanner.finditer(texto_varrido))
+    if matches:
+        ordem_categoria = {categoria: ordem for ordem, categoria in enumerate(_CATEGORIAS_VALORES)}
+        linhas_valores = _linhas_das_ocorrencias(inicios, matches)
+        categorias = [ordem_categoria[match.lastgroup or "simples"] for match in matches]
+        # Ordena por linha, categoria e posição: o primeiro e o último de cada linha ficam nas bordas dos grupos
+        ordem = np.lexsort((np.arange(len(matches)), categorias, linhas_valores))
+        linhas_ordenadas = linhas_valores[ordem]
+        mudancas = np.flatnonzero(np.diff(linhas_ordenadas, prepend=-1))
+        fins = np.append(mudancas[1:], len(ordem)) - 1
+        def converter(posicoes):
+            return [
+                float(matches[k].group(matches[k].lastgroup or 0).replace('.', '').replace(',', '.'))
+                for k in ordem[posicoes].tolist()
+            ]
+        unitarios[linhas_ordenadas[mudancas]] = converter(mudancas)
+        totais[linhas_ordenadas[mudancas]] = converter(fins)
+    return unitarios, totais
 
 def extract_items_from_text(text):
-    """Extrai itens/equipamentos do texto"""
-    # Padrões expandidos para capturar formatos diversos
-    patterns = [
-        r'UE-\d+[A-Z]?\s*-[^-\n]+',  # Padrão UE-01A - DESCRIÇÃO
-        r'SPLIT\s+\d+[.,]?\d*\s*BTU[/H]*',
-        r'CASSETE\s+\d+[.,]?\d*\s*BTU[/H]*',
-        r'HI\s*WALL\s+\d+[.,]?\d*\s*BTU[/H]*',
-        r'DUTO\s+\d+[.,]?\d*\s*BTU[/H]*',
-        r'Suite\s*\d+',
-        r'Casal',
-        r'Ginastica',
-        r'Home',
-        r'Jantar/Copa',
-        r'Escritório',
-        r'Cozinha',
-        r'Gourmet',
-        r'FXEQ\d+AVE',
-        r'FXFQ\d+AVM',
-        r'FXSQ\d+PAVE',
-        r'FXAQ\d+AVM',
-        r'Exaustor',
-    ]
-    items = []
-    for pattern in patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        items.extend(matches)
-    return list(set(items))  # Remove duplicatas
+    """Extrai itens/equipamentos do texto (string ou iterável de páginas)"""
+    return extrair_valores_e_itens(text)[1]
+
+def converter_moeda_br(valores):
+    """Converte valores monetários pt-BR em float64 de forma vetorizada.
+
+    Aceita uma Series ou lista com textos como "R$ 1.234,56", "1234.56" (já normalizado)
+    ou números. Valores que não puderem ser convertidos viram NaN.
+    """
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(list(valores), dtype=object)
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype("float64")
+    texto = serie.astype(str).str.replace(r'[R$\s]', '', regex=True)
+    # Com vírgula, o ponto é separador de milhar; sem vírgula, o texto já está normalizado
+    tem_virgula = texto.str.contains(',', regex=False)
+    texto = texto.where(~tem_virgula, texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    return pd.to_numeric(texto, errors="coerce").astype("float64")
+
+# Colunas numéricas do DataFrame estruturado e o valor usado quando não há número
+COLUNAS_NUMERICAS = {"Quantidade": 1.0, "Custo_Unitario": 0.0, "Custo_Total": 0.0}
+
+def tipar_colunas_numericas(df):
+    """Converte Quantidade, Custo_Unitario e Custo_Total do DataFrame estruturado em float64"""
+    for coluna, padrao in COLUNAS_NUMERICAS.items():
+        if coluna in df.columns:
+            df[coluna] = converter_moeda_br(df[coluna]).fillna(padrao)
+    return df
+
+# Quebras de linha e tabulações das células viram escapes: cada linha da planilha ocupa uma linha do texto
+_ESCAPES_CELULA = str.maketrans({"\t": "\\t", "\r": "\\r", "\n": "\\n"})
+
+def _textos_coluna(serie):
+    """Texto de cada célula da coluna (str do valor)"""
+    textos = serie.astype(str)
+    if serie.dtype == object:
+        textos = textos.str.translate(_ESCAPES_CELULA)
+    return textos.tolist()
+
+def texto_planilha(df, cabecalho=True):
+    """Texto plano de uma planilha para os scanners de valores e itens: uma linha por linha da planilha.
+
+    Cada célula vira str(valor), sem o índice e sem alinhamento (células separadas por dois
+    espaços), o que evita a formatação de largura fixa do DataFrame.to_string, muito lenta em
+    planilhas largas. Com cabecalho=False a linha com os nomes das colunas é omitida.
+    """
+    linhas = ["  ".join(str(coluna).translate(_ESCAPES_CELULA) for coluna in df.columns)] if cabecalho else []
+    if df.shape[1] and len(df):
+        colunas = [_textos_coluna(df.iloc[:, j]) for j in range(df.shape[1])]
+        linhas.extend("  ".join(celulas) for celulas in zip(*colunas))
+    return "\n".join(linhas)
 
 def extract_structured_data_real(files):
     """Extrai dados REAIS e estruturados dos arquivos"""
@@ -112,12 +413,14 @@ def extract_structured_data_real(files):
             try:
                 file.seek(0)
                 df = pd.read_excel(file)
+                texto = texto_planilha(df)
+                valores, itens = extrair_valores_e_itens(texto)
                 content = {
                     "tipo": "excel",
                     "dataframe": df,
-                    "texto": df.to_string(),
-                    "valores": extract_values_from_text(df.to_string()),
-                    "itens": extract_items_from_text(df.to_string())
+                    "texto": texto,
+                    "valores": valores,
+                    "itens": itens
                 }
             except Exception as e:
                 logger.error(f"Erro ao processar Excel {file.name}: {e}")
@@ -125,11 +428,12 @@ def extract_structured_data_real(files):
         else:
             # Para PDF, extrai texto completo
             full_text = extract_text_from_pdf_complete(file)
+            valores, itens = extrair_valores_e_itens(full_text)
             content = {
                 "tipo": "pdf",
                 "texto_completo": full_text,
-                "valores": extract_values_from_text(full_text),
-                "itens": extract_items_from_text(full_text)
+                "valores": valores,
+                "itens": itens
             }
         
         if supplier == "MAPA_CONCORRENCIA":
@@ -215,10 +519,353 @@ DADOS DOS DOCUMENTOS REAIS:
         logger.error(f"Erro na análise OpenAI: {exc}")
         return {"erro": f"Erro ao processar análise com IA: {str(exc)}"}
 
+class ArquivoEmMemoria(io.BytesIO):
+    """Arquivo em memória com nome e tamanho, compatível com os arquivos enviados pelo Streamlit"""
+
+    def __init__(self, conteudo, name):
+        super().__init__(conteudo)
+        self.name = name
+        self.size = len(conteudo)
+
+def abrir_arquivo_local(caminho):
+    """Lê um arquivo do disco como ArquivoEmMemoria (o nome é só o nome do arquivo, sem diretórios)"""
+    caminho = Path(caminho)
+    return ArquivoEmMemoria(caminho.read_bytes(), caminho.name)
+
+def calcular_hash_arquivo(file):
+    """Calcula o SHA-256 do conteúdo de um arquivo enviado"""
+    file.seek(0)
+    conteudo = file.read()
+    file.seek(0)
+    return calcular_hash_bytes(conteudo)
+
+def chave_cache_arquivo(file):
+    """Chave do cache de extração: conteúdo do arquivo, nome (usado nas colunas), versão do extrator e vocabulário"""
+    return calcular_hash_bytes(EXTRACTOR_VERSION, VOCABULARIO.assinatura, file.name, calcular_hash_arquivo(file))
+
 def extract_data_from_excel(file, max_rows=50):
     pass  # Função placeholder
-def extract_to_dataframes(files):
-    """Extrai dados dos arquivos e organiza em DataFrames estruturados separados"""
+def tamanho_arquivo(file):
+    """Tamanho em bytes de um arquivo enviado"""
+    tamanho = getattr(file, "size", None)
+    if tamanho is None:
+        posicao = file.tell()
+        tamanho = file.seek(0, io.SEEK_END)
+        file.seek(posicao)
+    return tamanho
+
+def _cabecalho_excel(linha, largura):
+    """Nomes das colunas como o pandas: células vazias viram "Unnamed: i" e nomes repetidos ganham sufixo"""
+    nomes = []
+    vistos = {}
+    for j in range(largura):
+        valor = linha[j] if j < len(linha) else None
+        nome = valor if valor is not None else f"Unnamed: {j}"
+        if nome in vistos:
+            vistos[nome] += 1
+            nome = f"{nome}.{vistos[nome]}"
+        else:
+            vistos[nome] = 0
+        nomes.append(nome)
+    return nomes
+
+def _ajustar_largura(linha, largura):
+    return tuple(linha[:largura]) + (None,) * (largura - len(linha))
+
+def _linhas_da_aba(planilha):
+    """Gera as linhas (tuplas de valores) de uma aba aberta em modo somente leitura.
+
+    Linhas vazias no meio da planilha são mantidas; as do final são descartadas (como no pd.read_excel).
+    """
+    vazias = 0
+    for linha in planilha.iter_rows(values_only=True):
+        if all(valor is None for valor in linha):
+            vazias += 1
+            continue
+        for _ in range(vazias):
+            yield (None,) * len(linha)
+        vazias = 0
+        yield linha
+
+def iter_abas_excel(file):
+    """Gera (nome_aba, linhas) para cada aba de um .xlsx, abrindo a planilha uma única vez em modo somente leitura"""
+    file.seek(0)
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        for planilha in workbook.worksheets:
+            yield planilha.title, _linhas_da_aba(planilha)
+    finally:
+        workbook.close()
+
+def iter_blocos_excel(linhas, linhas_por_bloco=None):
+    """Gera (papeis, DataFrame) com blocos das linhas de uma aba, sem materializar a aba inteira.
+
+    O cabeçalho e os papéis das colunas são detectados uma única vez, na amostra do topo.
+    """
+    linhas_por_bloco = linhas_por_bloco or EXCEL_LINHAS_POR_BLOCO
+    linhas = iter(linhas)
+    topo = list(islice(linhas, EXCEL_LINHAS_AMOSTRA + 1))
+    if not topo:
+        return
+    largura = max(len(linha) for linha in topo)
+    df_topo = pd.DataFrame(
+        [_ajustar_largura(linha, largura) for linha in topo[1:]],
+        columns=_cabecalho_excel(topo[0], largura)
+    )
+    df_topo, papeis = detectar_papeis_colunas(df_topo)
+    colunas = list(df_topo.columns)
+    if len(df_topo):
+        yield papeis, df_topo
+
+    bloco = []
+    for linha in linhas:
+        bloco.append(_ajustar_largura(linha, largura))
+        if len(bloco) >= linhas_por_bloco:
+            yield papeis, pd.DataFrame(bloco, columns=colunas)
+            bloco = []
+    if bloco:
+        yield papeis, pd.DataFrame(bloco, columns=colunas)
+
+def marcar_aba(df_estruturado, aba):
+    """Inclui a coluna Aba_Planilha (após Empresa_Participante) no DataFrame estruturado de uma aba"""
+    df_estruturado.insert(COLUNAS_ESTRUTURADAS.index("Empresa_Participante") + 1, "Aba_Planilha", aba)
+    return df_estruturado
+
+def _extrair_excel_por_blocos(file, supplier):
+    """Extrai um .xlsx grande bloco a bloco: memória limitada ao bloco atual e ao DataFrame estruturado"""
+    estruturados = []
+
+    def textos_dos_blocos():
+        # Estrutura cada bloco à medida que o scanner de valores/itens consome o seu texto
+        for aba, linhas in iter_abas_excel(file):
+            for numero, (papeis, bloco) in enumerate(iter_blocos_excel(linhas)):
+                df_bloco = criar_dataframe_estruturado(bloco, supplier, file.name, "excel", papeis)
+                estruturados.append(marcar_aba(df_bloco, aba))
+                yield texto_planilha(bloco, cabecalho=numero == 0)
+
+    valores, itens = extrair_valores_e_itens(textos_dos_blocos())
+    df_estruturado = (
+        pd.concat(estruturados, ignore_index=True) if estruturados
+        else marcar_aba(pd.DataFrame(columns=COLUNAS_ESTRUTURADAS), None)
+    )
+    return {
+        "tipo": "excel",
+        # Planilha original e texto completo não são mantidos na leitura por blocos
+        "dataframe_original": None,
+        "dataframe_estruturado": df_estruturado,
+        "texto": None,
+        "valores": valores,
+        "itens": itens
+    }
+
+def _resolver_textos_compartilhados(xml_aba, textos):
+    """Troca os índices da tabela de textos compartilhados (células t="s") pelo próprio texto no XML da aba"""
+    def texto_da_celula(match):
+        indice = int(match.group(2))
+        return match.group(1) + (textos[indice] if indice < len(textos) else match.group(2)) + match.group(3)
+    return _CELULA_TEXTO_COMPARTILHADO.sub(texto_da_celula, xml_aba)
+
+def hashes_abas_xlsx(conteudo):
+    """Hash do conteúdo de cada aba de um .xlsx: XML da aba com os textos compartilhados resolvidos e os estilos.
+
+    Alterar uma aba não muda o hash das outras, mesmo que a tabela de textos compartilhados seja
+    reescrita. Retorna {nome_aba: hash}, ou {} se o arquivo não tiver a estrutura esperada.
+    """
+    try:
+        with zipfile.ZipFile(io.BytesIO(conteudo)) as pacote:
+            partes = set(pacote.namelist())
+            workbook = ElementTree.fromstring(pacote.read("xl/workbook.xml"))
+            propriedades = workbook.find(f"{_NS_PLANILHA}workbookPr")
+            hash_compartilhado = calcular_hash_bytes(
+                propriedades.get("date1904", "") if propriedades is not None else "",
+                pacote.read("xl/styles.xml") if "xl/styles.xml" in partes else b""
+            )
+            textos = (
+                _TEXTO_COMPARTILHADO.findall(pacote.read("xl/sharedStrings.xml"))
+                if "xl/sharedStrings.xml" in partes else []
+            )
+            relacoes = ElementTree.fromstring(pacote.read("xl/_rels/workbook.xml.rels"))
+            alvos = {relacao.get("Id"): relacao.get("Target") for relacao in relacoes.iter(f"{_NS_PACOTE}Relationship")}
+            hashes = {}
+            for aba in workbook.iter(f"{_NS_PLANILHA}sheet"):
+                alvo = alvos[aba.get(f"{_NS_RELACAO}id")]
+                caminho = alvo.lstrip("/") if alvo.startswith("/") else f"xl/{alvo}"
+                xml_aba = _resolver_textos_compartilhados(pacote.read(caminho), textos)
+                hashes[aba.get("name")] = calcular_hash_bytes(xml_aba, hash_compartilhado)
+            return hashes
+    except Exception as e:
+        logger.warning(f"Não foi possível calcular o hash das abas da planilha: {e}")
+        return {}
+
+def chaves_cache_abas(file, conteudo):
+    """Chaves do cache de extração por aba ({nome_aba: chave}); vazio para .xls"""
+    if Path(file.name).suffix.lower() != ".xlsx":
+        return {}
+    return {
+        aba: calcular_hash_bytes(EXTRACTOR_VERSION, VOCABULARIO.assinatura, "aba", file.name, aba, hash_aba)
+        for aba, hash_aba in hashes_abas_xlsx(conteudo).items()
+    }
+
+def _extrair_aba_excel(planilha, aba, nome_arquivo, supplier):
+    """Lê e estrutura uma aba de um pd.ExcelFile; as linhas estruturadas recebem o nome da aba"""
+    with medir_etapa("leitura_excel", f"{nome_arquivo} [{aba}]"):
+        df_original = planilha.parse(aba)
+        texto = texto_planilha(df_original)
+    with medir_etapa("estruturacao", f"{nome_arquivo} [{aba}]"):
+        df_estruturado = marcar_aba(
+            criar_dataframe_estruturado(df_original, supplier, nome_arquivo, "excel"), aba
+        )
+    return {"dataframe_original": df_original, "dataframe_estruturado": df_estruturado, "texto": texto}
+
+# Planilha aberta uma vez em cada processo do pool de leitura das abas
+_planilha_do_processo = None
+
+def _abrir_planilha_no_processo(conteudo):
+    """Inicializador dos processos do pool: abre a planilha uma única vez por processo"""
+    global _planilha_do_processo
+    _planilha_do_processo = pd.ExcelFile(io.BytesIO(conteudo))
+
+def _extrair_aba_no_processo(aba, nome_arquivo, supplier):
+    """Extrai uma aba da planilha aberta no processo (executada nos processos do pool)"""
+    return _extrair_aba_excel(_planilha_do_processo, aba, nome_arquivo, supplier)
+
+def _ler_abas_excel(planilha, conteudo, abas, nome_arquivo, supplier, max_workers=None):
+    """Extrai as abas indicadas, em um pool de processos quando há abas suficientes. Retorna {aba: resultado}"""
+    workers = min(max_workers or EXCEL_WORKERS, len(abas))
+    if workers > 1 and len(abas) >= EXCEL_MIN_ABAS_PARALELO:
+        try:
+            with medir_etapa("leitura_excel_abas", nome_arquivo):
+                with ProcessPoolExecutor(
+                    max_workers=workers, initializer=_abrir_planilha_no_processo, initargs=(conteudo,)
+                ) as executor:
+                    resultados = executor.map(_extrair_aba_no_processo, abas, repeat(nome_arquivo), repeat(supplier))
+                    return dict(zip(abas, resultados))
+        except Exception as e:
+            logger.warning(f"Leitura paralela das abas falhou, usando leitura serial: {e}")
+    return {aba: _extrair_aba_excel(planilha, aba, nome_arquivo, supplier) for aba in abas}
+
+def _extrair_excel_abas(file, supplier, cache=None, max_workers=None):
+    """Extrai todas as abas de uma planilha, com a coluna Aba_Planilha no DataFrame estruturado.
+
+    Com cache, cada aba é reaproveitada pelo hash do seu conteúdo, então só as abas alteradas
+    são lidas de novo. Com uma única aba, dataframe_original e texto são os da própria aba.
+    """
+    file.seek(0)
+    conteudo = file.read()
+    with pd.ExcelFile(io.BytesIO(conteudo)) as planilha:
+        abas = list(planilha.sheet_names)
+        chaves = chaves_cache_abas(file, conteudo) if cache is not None else {}
+        resultados = {}
+        for aba in abas:
+            if aba in chaves:
+                resultado = cache.get(chaves[aba])
+                incrementar("cache_abas_acertos" if resultado is not None else "cache_abas_faltas")
+                if resultado is not None:
+                    resultados[aba] = resultado
+        lidas = _ler_abas_excel(
+            planilha, conteudo, [aba for aba in abas if aba not in resultados], file.name, supplier, max_workers
+        )
+    for aba, resultado in lidas.items():
+        if aba in chaves and not resultado["dataframe_estruturado"].empty:
+            cache.set(chaves[aba], resultado)
+    resultados.update(lidas)
+
+    # Abas vazias só entram quando nenhuma aba tem dados
+    abas = [aba for aba in abas if not resultados[aba]["dataframe_original"].empty] or abas[:1]
+    textos = [resultados[aba]["texto"] for aba in abas]
+    with medir_etapa("estruturacao", file.name):
+        valores, itens = extrair_valores_e_itens(textos)
+    if len(abas) == 1:
+        df_original = resultados[abas[0]]["dataframe_original"]
+        texto = textos[0]
+    else:
+        df_original = pd.concat(
+            {aba: resultados[aba]["dataframe_original"] for aba in abas}, names=["Aba_Planilha", None]
+        )
+        texto = "\n\n".join(f"[Aba: {aba}]\n{texto_aba}" for aba, texto_aba in zip(abas, textos))
+    return {
+        "tipo": "excel",
+        "dataframe_original": df_original,
+        "dataframe_estruturado": pd.concat(
+            [resultados[aba]["dataframe_estruturado"] for aba in abas], ignore_index=True
+        ),
+        "texto": texto,
+        "valores": valores,
+        "itens": itens
+    }
+
+def _extrair_pdf_por_paginas(file, supplier):
+    """Extrai um PDF página a página: memória limitada às páginas em extração e ao bloco de linhas atual.
+
+    Valores e itens são acumulados a cada página e as linhas são estruturadas em blocos de
+    PDF_LINHAS_POR_BLOCO; o texto de cada página é descartado em seguida (o texto completo não é guardado).
+    """
+    values_por_categoria = {categoria: [] for categoria in _CATEGORIAS_VALORES}
+    items = set()
+    estruturados = []
+    bloco = []
+    def estruturar_bloco():
+        with medir_etapa("estruturacao", file.name):
+            estruturados.append(criar_dataframe_de_texto(bloco, supplier, file.name, "pdf"))
+        bloco.clear()
+
+    with medir_etapa("leitura_pdf", file.name):
+        try:
+            for numero, texto_pagina in iter_pdf_pages(file):
+                if not texto_pagina:
+                    continue
+                _acumular_tokens(texto_pagina, values_por_categoria, items)
+                bloco.extend(iter_linhas_pagina(numero, texto_pagina))
+                if len(bloco) >= PDF_LINHAS_POR_BLOCO:
+                    estruturar_bloco()
+        except Exception as e:
+            logger.error(f"Erro ao extrair texto do PDF: {e}")
+    if bloco or not estruturados:
+        estruturar_bloco()
+
+    return {
+        "tipo": "pdf",
+        "dataframe_estruturado": (
+            estruturados[0] if len(estruturados) == 1 else pd.concat(estruturados, ignore_index=True)
+        ),
+        "valores": [value for categoria in _CATEGORIAS_VALORES for value in values_por_categoria[categoria]],
+        "itens": list(items)
+    }
+
+def _extrair_conteudo_arquivo(file, supplier, cache=None):
+    """Extrai o conteúdo (DataFrames, texto, valores e itens) de um único arquivo.
+
+    O cache, quando informado, é usado para reaproveitar as abas inalteradas de planilhas.
+    """
+    ext = Path(file.name).suffix.lower()
+    
+    # Extrai dados básicos do arquivo
+    if ext == ".xlsx" and tamanho_arquivo(file) >= EXCEL_STREAMING_MB * 1024 * 1024:
+        try:
+            with medir_etapa("leitura_excel_blocos", file.name):
+                content = _extrair_excel_por_blocos(file, supplier)
+        except Exception as e:
+            logger.error(f"Erro ao processar Excel {file.name}: {e}")
+            content = {"tipo": "excel", "erro": str(e)}
+    elif ext in [".xlsx", ".xls"]:
+        try:
+            content = _extrair_excel_abas(file, supplier, cache)
+        except Exception as e:
+            logger.error(f"Erro ao processar Excel {file.name}: {e}")
+            content = {"tipo": "excel", "erro": str(e)}
+    else:
+        content = _extrair_pdf_por_paginas(file, supplier)
+    
+    return content
+
+def extract_to_dataframes(files, usar_cache=True):
+    """Extrai dados dos arquivos e organiza em DataFrames estruturados separados.
+
+    Com usar_cache=True, o resultado de cada arquivo é reaproveitado do cache em disco
+    quando o mesmo conteúdo (SHA-256 dos bytes + nome + versão do extrator) já foi processado.
+    Planilhas têm todas as abas lidas (em paralelo quando há abas suficientes) e, em planilhas
+    alteradas, as abas inalteradas também vêm do cache.
+    """
     data = {
         "mapa_concorrencia": None,
         "propostas": [],
@@ -227,48 +874,21 @@ def extract_to_dataframes(files):
             "propostas_dfs": []
         }
     }
+    cache = obter_cache_extracao() if usar_cache else None
     
     for file in files:
         supplier = identify_supplier_from_filename(file.name)
-        ext = Path(file.name).suffix.lower()
         
-        # Extrai dados básicos do arquivo
-        if ext in [".xlsx", ".xls"]:
-            try:
-                file.seek(0)
-                df_original = pd.read_excel(file)
-                texto = df_original.to_string()
-                
-                # Cria DataFrame estruturado
-                df_estruturado = criar_dataframe_estruturado(
-                    df_original, supplier, file.name, "excel"
-                )
-                
-                content = {
-                    "tipo": "excel",
-                    "dataframe_original": df_original,
-                    "dataframe_estruturado": df_estruturado,
-                    "texto": texto,
-                    "valores": extract_values_from_text(texto),
-                    "itens": extract_items_from_text(texto)
-                }
-            except Exception as e:
-                logger.error(f"Erro ao processar Excel {file.name}: {e}")
-                content = {"tipo": "excel", "erro": str(e)}
-        else:
-            # Para PDF
-            full_text = extract_text_from_pdf_complete(file)
-            df_estruturado = criar_dataframe_de_texto(
-                full_text, supplier, file.name, "pdf"
-            )
-            
-            content = {
-                "tipo": "pdf",
-                "dataframe_estruturado": df_estruturado,
-                "texto_completo": full_text,
-                "valores": extract_values_from_text(full_text),
-                "itens": extract_items_from_text(full_text)
-            }
+        content = None
+        if cache is not None:
+            chave = chave_cache_arquivo(file)
+            content = cache.get(chave)
+            incrementar("cache_extracao_acertos" if content is not None else "cache_extracao_faltas")
+        if content is None:
+            content = _extrair_conteudo_arquivo(file, supplier, cache)
+            df_estruturado = content.get("dataframe_estruturado")
+            if cache is not None and df_estruturado is not None and not df_estruturado.empty:
+                cache.set(chave, content)
         
         # Organiza por tipo (mapa ou proposta)
         if supplier == "MAPA_CONCORRENCIA":
@@ -289,221 +909,232 @@ def extract_to_dataframes(files):
     
     return data
 
-def criar_dataframe_estruturado(df_original, fornecedor, nome_arquivo, tipo_arquivo):
-    """Cria um DataFrame estruturado com todas as colunas obrigatórias"""
+# Colunas do DataFrame estruturado, na ordem de exibição
+COLUNAS_ESTRUTURADAS = [
+    'Nome_Proposta', 'Numero_Proposta', 'Empresa_Participante', 
+    'Modelo_Produto', 'Item', 'Quantidade', 'Unidade', 
+    'Custo_Unitario', 'Custo_Total', 'Status_Equalizacao'
+]
+# Padrões de modelo de produto, em ordem de prioridade
+PADROES_MODELO = [
+    r'(FXEQ\d+[A-Z]+)', r'(FXFQ\d+[A-Z]+)', r'(FXSQ\d+[A-Z]+)',
+    r'(SPLIT\s+\d+[.,]?\d*)', r'(CASSETE\s+\d+[.,]?\d*)'
+]
+# Padrões do número da proposta ("PROP123", "Proposta 456", números com 3+ dígitos), em ordem de prioridade
+PADROES_NUMERO_PROPOSTA = [r'PROP\s*(\d+)', r'PROPOSTA\s*(\d+)', r'(\d{3,})']
+# Quantidade em uma linha de texto: o primeiro número
+_QUANTIDADE_TEXTO = r'\b(\d+[.,]?\d*)\b'
+
+def criar_dataframe_estruturado(df_original, fornecedor, nome_arquivo, tipo_arquivo, papeis=None):
+    """Cria um DataFrame estruturado com todas as colunas obrigatórias.
+
+    papeis mapeia cada campo ("item", "modelo", "quantidade", "unidade", "custo_unitario",
+    "custo_total") para a coluna da planilha que o contém; sem papeis, as colunas são detectadas
+    pelos cabeçalhos e pelo conteúdo (detectar_papeis_colunas). Campos com coluna conhecida são
+    lidos diretamente; os demais (ou células vazias) usam as heurísticas por linha, processadas
+    por colunas: cada linha é serializada uma única vez como texto ("coluna valor" por célula).
+    """
     try:
-        # Define colunas padrão obrigatórias
-        colunas_obrigatorias = [
-            'Nome_Proposta', 'Numero_Proposta', 'Empresa_Participante', 
-            'Modelo_Produto', 'Item', 'Quantidade', 'Unidade', 
-            'Custo_Unitario', 'Custo_Total', 'Status_Equalizacao'
-        ]
-        
-        # Cria DataFrame estruturado
-        dados_estruturados = []
-        
-        # Extrai dados do DataFrame original
-        for idx, row in df_original.iterrows():
-            linha_estruturada = {
-                'Nome_Proposta': nome_arquivo,
-                'Numero_Proposta': extrair_numero_proposta(nome_arquivo, str(row.iloc[0]) if len(row) > 0 else ""),
-                'Empresa_Participante': fornecedor,
-                'Modelo_Produto': extrair_modelo(row),
-                'Item': extrair_item_descricao(row),
-                'Quantidade': extrair_quantidade(row),
-                'Unidade': extrair_unidade(row),
-                'Custo_Unitario': extrair_custo_unitario(row),
-                'Custo_Total': extrair_custo_total(row),
-                'Status_Equalizacao': 'Pendente'
-            }
-            dados_estruturados.append(linha_estruturada)
+        if papeis is None:
+            df_original, papeis = detectar_papeis_colunas(df_original)
+        total_linhas = len(df_original)
+
+        # Mesmos valores por célula que iterrows (tipos das colunas unificados por linha)
+        valores = df_original.to_numpy(dtype=object) if df_original.shape[1] else np.empty((total_linhas, 0), dtype=object)
+        colunas = [pd.Series(valores[:, j], dtype=object) for j in range(valores.shape[1])]
+        textos_colunas = [coluna.astype(str) for coluna in colunas]
+        primeira_coluna = textos_colunas[0] if textos_colunas else pd.Series([""] * total_linhas, dtype=object)
+
+        # Calculados só se algum campo precisar das heurísticas
+        heuristicas = {}
+        def texto_linhas():
+            if "texto" not in heuristicas:
+                heuristicas["texto"] = serializar_linhas(df_original.columns, textos_colunas, total_linhas)
+            return heuristicas["texto"]
+        def valores_monetarios():
+            if "valores" not in heuristicas:
+                heuristicas["valores"] = texto_linhas().map(extract_values_from_text)
+            return heuristicas["valores"]
+
+        df = pd.DataFrame({
+            'Nome_Proposta': nome_arquivo,
+            'Numero_Proposta': extrair_numero_proposta_vetorizado(nome_arquivo, primeira_coluna),
+            'Empresa_Participante': fornecedor,
+            'Modelo_Produto': _campo_por_papel(
+                df_original, papeis.get("modelo"), _texto_da_coluna,
+                lambda: extrair_primeiro_padrao(texto_linhas(), PADROES_MODELO)
+            ),
+            'Item': _campo_por_papel(
+                df_original, papeis.get("item"), _texto_da_coluna,
+                lambda: extrair_item_descricao_vetorizado(colunas)
+            ),
+            'Quantidade': _campo_por_papel(
+                df_original, papeis.get("quantidade"), converter_moeda_br,
+                lambda: extrair_quantidade_vetorizado(textos_colunas, total_linhas)
+            ),
+            'Unidade': _campo_por_papel(
+                df_original, papeis.get("unidade"), lambda serie: _texto_da_coluna(serie).str.upper(),
+                lambda: extrair_unidade_vetorizado(texto_linhas())
+            ),
+            'Custo_Unitario': _campo_por_papel(
+                df_original, papeis.get("custo_unitario"), converter_moeda_br,
+                lambda: valores_monetarios().map(lambda v: v[0].replace('.', '').replace(',', '.') if v else "0.00")
+            ),
+            'Custo_Total': _campo_por_papel(
+                df_original, papeis.get("custo_total"), converter_moeda_br,
+                lambda: valores_monetarios().map(lambda v: v[-1].replace('.', '').replace(',', '.') if v else "0.00")
+            ),
+            'Status_Equalizacao': 'Pendente'
+        }, index=pd.RangeIndex(total_linhas), columns=COLUNAS_ESTRUTURADAS)
         
-        return pd.DataFrame(dados_estruturados)
+        return tipar_colunas_numericas(df)
         
     except Exception as e:
         logger.error(f"Erro ao criar DataFrame estruturado: {e}")
         # Retorna DataFrame vazio com as colunas obrigatórias
-        return pd.DataFrame(columns=[
-            'Nome_Proposta', 'Numero_Proposta', 'Empresa_Participante', 
-            'Modelo_Produto', 'Item', 'Quantidade', 'Unidade', 
-            'Custo_Unitario', 'Custo_Total', 'Status_Equalizacao'
-        ])
+        return pd.DataFrame(columns=COLUNAS_ESTRUTURADAS)
+
+def _texto_da_coluna(serie):
+    """Valores de texto de uma coluna (sem espaços nas bordas); células vazias viram NaN"""
+    texto = serie.astype(object).where(serie.notna()).map(lambda v: str(v).strip(), na_action="ignore")
+    return texto.where(texto != "")
+
+def _campo_por_papel(df, coluna, converter, heuristica):
+    """Lê um campo da coluna com o papel correspondente; sem coluna (ou em células vazias), usa a heurística"""
+    if coluna is None or coluna not in df.columns:
+        return pd.Series(heuristica(), index=pd.RangeIndex(len(df)), dtype=object)
+    serie = df[coluna]
+    if isinstance(serie, pd.DataFrame):  # cabeçalhos repetidos: usa a primeira coluna
+        serie = serie.iloc[:, 0]
+    valores = converter(serie.reset_index(drop=True))
+    if valores.notna().all():
+        return valores
+    return valores.astype(object).where(valores.notna(), pd.Series(heuristica(), index=valores.index, dtype=object))
+
+def serializar_linhas(nomes_colunas, textos_colunas, total_linhas):
+    """Texto de cada linha da planilha, com uma linha "coluna valor" por célula"""
+    texto = None
+    for nome, textos in zip(nomes_colunas, textos_colunas):
+        parte = f"{nome} " + textos
+        texto = parte if texto is None else texto + "\n" + parte
+    return texto if texto is not None else pd.Series([""] * total_linhas, dtype=object)
+
+def extrair_primeiro_padrao(textos, padroes, padrao="N/A"):
+    """Para cada texto, o grupo do primeiro padrão (na ordem da lista) que ocorre nele.
+
+    Os padrões são escritos em maiúsculas e valem sem diferenciar maiúsculas: os textos são
+    concatenados e convertidos uma única vez, e cada padrão é procurado em uma só varredura.
+    """
+    texto, inicios = concatenar_linhas(textos)
+    texto_maiusculo = texto.upper()
+    if len(texto_maiusculo) == len(texto):
+        texto_varrido, flags = texto_maiusculo, 0
+    else:
+        # Caracteres como "ß" mudam de tamanho em maiúsculas: varre o original ignorando caixa
+        texto_varrido, flags = texto, re.IGNORECASE
+    resultado = [None] * len(inicios)
+    for expressao in padroes:
+        for i, match in enumerate(primeiras_ocorrencias(texto_varrido, inicios, re.compile(expressao, flags))):
+            if resultado[i] is None and match is not None:
+                # O grupo é lido do texto original, com as maiúsculas e minúsculas preservadas
+                resultado[i] = texto[match.start(1):match.end(1)]
+    return pd.Series(resultado, index=textos.index, dtype=object).fillna(padrao)
+
+def extrair_numero_proposta_vetorizado(nome_arquivo, conteudos):
+    """Versão vetorizada de extrair_numero_proposta para uma coluna de conteúdos"""
+    textos = f"{nome_arquivo} " + conteudos
+    return extrair_primeiro_padrao(textos, PADROES_NUMERO_PROPOSTA)
+
+def _primeira_coluna_verdadeira(mascara):
+    """Índice da primeira coluna verdadeira de cada linha da máscara (-1 quando nenhuma)"""
+    if mascara.shape[1] == 0:
+        return np.full(mascara.shape[0], -1)
+    return np.where(mascara.any(axis=1), mascara.argmax(axis=1), -1)
+
+def extrair_item_descricao_vetorizado(colunas):
+    """Descrição do item: primeira célula de texto com mais de 10 caracteres de cada linha"""
+    total_linhas = len(colunas[0]) if colunas else 0
+    mascara = np.column_stack(
+        [[isinstance(v, str) and len(v) > 10 for v in coluna] for coluna in colunas]
+    ) if colunas and total_linhas else np.zeros((total_linhas, 0), dtype=bool)
+    escolhida = _primeira_coluna_verdadeira(mascara)
+    return [
+        colunas[j].iat[i].strip() if j >= 0 else "N/A"
+        for i, j in enumerate(escolhida)
+    ]
+
+_SEM_SEPARADORES = str.maketrans("", "", ".,")
+
+def extrair_quantidade_vetorizado(textos_colunas, total_linhas):
+    """Quantidade: primeira célula numérica de cada linha (1.0 quando não há ou não converte)"""
+    mascara = np.column_stack([
+        textos.str.translate(_SEM_SEPARADORES).str.isdigit().to_numpy(dtype=bool)
+        for textos in textos_colunas
+    ]) if textos_colunas and total_linhas else np.zeros((total_linhas, 0), dtype=bool)
+    escolhida = _primeira_coluna_verdadeira(mascara)
+    quantidades = []
+    for i, j in enumerate(escolhida):
+        try:
+            quantidades.append(float(textos_colunas[j].iat[i].replace(',', '.')) if j >= 0 else 1.0)
+        except ValueError:
+            quantidades.append(1.0)
+    return quantidades
+
+def extrair_unidade_vetorizado(textos):
+    """Unidade: a de maior prioridade no vocabulário entre as encontradas no texto de cada linha"""
+    return [VOCABULARIO.primeiro_da_categoria(texto, "unidade", "UN") for texto in textos]
 
 def criar_dataframe_de_texto(texto, fornecedor, nome_arquivo, tipo_arquivo):
-    """Cria DataFrame estruturado a partir de texto extraído de PDF"""
+    """Cria DataFrame estruturado a partir de texto extraído de PDF.
+
+    Aceita o texto completo ou um iterável de linhas/registros {"pagina", "linha"}
+    (ex.: iter_linhas_pagina). As linhas não vazias são carregadas uma única vez em uma Series
+    e as colunas são derivadas linha a linha por operações vetorizadas.
+    """
     try:
-        # Divide o texto em linhas e processa cada uma
-        linhas = texto.split('\n')
-        dados_estruturados = []
-        
-        for linha in linhas:
-            if linha.strip():  # Ignora linhas vazias
-                linha_estruturada = {
-                    'Nome_Proposta': nome_arquivo,
-                    'Numero_Proposta': extrair_numero_proposta(nome_arquivo, linha),
-                    'Empresa_Participante': fornecedor,
-                    'Modelo_Produto': extrair_modelo_de_texto(linha),
-                    'Item': extrair_item_de_texto(linha),
-                    'Quantidade': extrair_quantidade_de_texto(linha),
-                    'Unidade': extrair_unidade_de_texto(linha),
-                    'Custo_Unitario': extrair_custo_unitario_de_texto(linha),
-                    'Custo_Total': extrair_custo_total_de_texto(linha),
-                    'Status_Equalizacao': 'Pendente'
-                }
-                dados_estruturados.append(linha_estruturada)
-        
-        return pd.DataFrame(dados_estruturados)
+        linhas = texto.split('\n') if isinstance(texto, str) else texto
+        linhas = pd.Series([
+            linha for linha in (
+                registro.get("linha", "") if isinstance(registro, dict) else registro for registro in linhas
+            ) if linha.strip()  # Ignora linhas vazias
+        ], dtype=object)
+        sem_bordas = linhas.str.strip()
+        # Primeiro número da linha (busca por linha: ocorre em quase todas, então cada busca para cedo)
+        quantidades = linhas.str.extract(_QUANTIDADE_TEXTO, expand=False).str.replace(',', '.', regex=False)
+        custos_unitarios, custos_totais = valores_por_linha(linhas)
+
+        df = pd.DataFrame({
+            'Nome_Proposta': nome_arquivo,
+            'Numero_Proposta': extrair_numero_proposta_vetorizado(nome_arquivo, linhas),
+            'Empresa_Participante': fornecedor,
+            'Modelo_Produto': extrair_primeiro_padrao(linhas, PADROES_MODELO),
+            # Limita para não ficar muito longo
+            'Item': sem_bordas.str.slice(0, 100).where(sem_bordas.str.len() > 10, "N/A"),
+            'Quantidade': quantidades.astype("float64"),
+            'Unidade': extrair_unidade_vetorizado(linhas),
+            'Custo_Unitario': custos_unitarios,
+            'Custo_Total': custos_totais,
+            'Status_Equalizacao': 'Pendente'
+        }, index=linhas.index, columns=COLUNAS_ESTRUTURADAS)
+
+        return tipar_colunas_numericas(df)
         
     except Exception as e:
         logger.error(f"Erro ao criar DataFrame de texto: {e}")
-        return pd.DataFrame(columns=[
-            'Nome_Proposta', 'Numero_Proposta', 'Empresa_Participante', 
-            'Modelo_Produto', 'Item', 'Quantidade', 'Unidade', 
-            'Custo_Unitario', 'Custo_Total', 'Status_Equalizacao'
-        ])
+        return pd.DataFrame(columns=COLUNAS_ESTRUTURADAS)
 
 # Funções auxiliares para extração de dados específicos
 def extrair_numero_proposta(nome_arquivo, conteudo):
     """Extrai número da proposta do nome do arquivo ou conteúdo"""
     # Procura por padrões como "PROP123", "Proposta 456", números no nome do arquivo
-    patterns = [r'PROP\s*(\d+)', r'Proposta\s*(\d+)', r'(\d{3,})']
     texto_busca = f"{nome_arquivo} {conteudo}"
     
-    for pattern in patterns:
+    for pattern in PADROES_NUMERO_PROPOSTA:
         match = re.search(pattern, texto_busca, re.IGNORECASE)
         if match:
             return match.group(1)
     return "N/A"
 
-def extrair_modelo(row):
-    """Extrai modelo do produto de uma linha do DataFrame"""
-    try:
-        row_str = str(row.to_string())
-        modelos_patterns = [
-            r'(FXEQ\d+[A-Z]+)', r'(FXFQ\d+[A-Z]+)', r'(FXSQ\d+[A-Z]+)',
-            r'(SPLIT\s+\d+[.,]?\d*)', r'(CASSETE\s+\d+[.,]?\d*)'
-        ]
-        
-        for pattern in modelos_patterns:
-            match = re.search(pattern, row_str, re.IGNORECASE)
-            if match:
-                return match.group(1)
-        return "N/A"
-    except:
-        return "N/A"
-
-def extrair_item_descricao(row):
-    """Extrai descrição do item"""
-    try:
-        # Procura pela coluna que contém a descrição
-        for value in row:
-            if pd.notna(value) and isinstance(value, str) and len(value) > 10:
-                return value.strip()
-        return "N/A"
-    except:
-        return "N/A"
-
-def extrair_quantidade(row):
-    """Extrai quantidade da linha"""
-    try:
-        for value in row:
-            if pd.notna(value) and str(value).replace('.', '').replace(',', '').isdigit():
-                return float(str(value).replace(',', '.'))
-        return 1.0
-    except:
-        return 1.0
-
-def extrair_unidade(row):
-    """Extrai unidade de medida"""
-    try:
-        unidades = ['UN', 'UNID', 'PÇ', 'PC', 'PEÇA', 'M2', 'M²', 'ML', 'KG']
-        row_str = str(row.to_string()).upper()
-        
-        for unidade in unidades:
-            if unidade in row_str:
-                return unidade
-        return "UN"
-    except:
-        return "UN"
-
-def extrair_custo_unitario(row):
-    """Extrai custo unitário"""
-    try:
-        valores = extract_values_from_text(str(row.to_string()))
-        if valores:
-            return valores[0].replace('.', '').replace(',', '.')
-        return "0.00"
-    except:
-        return "0.00"
-
-def extrair_custo_total(row):
-    """Extrai custo total"""
-    try:
-        valores = extract_values_from_text(str(row.to_string()))
-        if len(valores) > 1:
-            return valores[-1].replace('.', '').replace(',', '.')
-        elif valores:
-            return valores[0].replace('.', '').replace(',', '.')
-        return "0.00"
-    except:
-        return "0.00"
-
-# Funções equivalentes para texto (PDF)
-def extrair_modelo_de_texto(linha):
-    """Extrai modelo do produto de uma linha de texto"""
-    modelos_patterns = [
-        r'(FXEQ\d+[A-Z]+)', r'(FXFQ\d+[A-Z]+)', r'(FXSQ\d+[A-Z]+)',
-        r'(SPLIT\s+\d+[.,]?\d*)', r'(CASSETE\s+\d+[.,]?\d*)'
-    ]
-    
-    for pattern in modelos_patterns:
-        match = re.search(pattern, linha, re.IGNORECASE)
-        if match:
-            return match.group(1)
-    return "N/A"
-
-def extrair_item_de_texto(linha):
-    """Extrai descrição do item de uma linha de texto"""
-    if len(linha.strip()) > 10:
-        return linha.strip()[:100]  # Limita para não ficar muito longo
-    return "N/A"
-
-def extrair_quantidade_de_texto(linha):
-    """Extrai quantidade de uma linha de texto"""
-    try:
-        numeros = re.findall(r'\b\d+[.,]?\d*\b', linha)
-        if numeros:
-            return float(numeros[0].replace(',', '.'))
-        return 1.0
-    except:
-        return 1.0
-
-def extrair_unidade_de_texto(linha):
-    """Extrai unidade de uma linha de texto"""
-    unidades = ['UN', 'UNID', 'PÇ', 'PC', 'PEÇA', 'M2', 'M²', 'ML', 'KG']
-    linha_upper = linha.upper()
-    
-    for unidade in unidades:
-        if unidade in linha_upper:
-            return unidade
-    return "UN"
-
-def extrair_custo_unitario_de_texto(linha):
-    """Extrai custo unitário de uma linha de texto"""
-    valores = extract_values_from_text(linha)
-    if valores:
-        return valores[0].replace('.', '').replace(',', '.')
-    return "0.00"
-
-def extrair_custo_total_de_texto(linha):
-    """Extrai custo total de uma linha de texto"""
-    valores = extract_values_from_text(linha)
-    if len(valores) > 1:
-        return valores[-1].replace('.', '').replace(',', '.')
-    elif valores:
-        return valores[0].replace('.', '').replace(',', '.')
-    return "0.00"
-
 def extract_structured_data(files):
     """Extrai dados e organiza em DataFrames separados para mapa e propostas"""
     return extract_to_dataframes(files)
@@ -555,23 +1186,37 @@ def comparar_dataframes_estruturados(mapa_df, propostas_dfs, data_original):
             }
         }
         
+        # Índice de candidatos do mapa, construído uma única vez para todas as propostas
+        with medir_etapa("indice_mapa"):
+            indice_mapa = IndiceMapa(mapa_df)
+        
         # Processa cada proposta
+        propostas_validas = []
+        propostas_info = []
         for idx, proposta_df in enumerate(propostas_dfs):
             if proposta_df is not None and not proposta_df.empty:
-                proposta_info = data_original["propostas"][idx] if idx < len(data_original["propostas"]) else {}
-                
-                # Realiza equalização item por item
-                proposta_equalizada = equalizar_proposta(mapa_df, proposta_df, proposta_info)
-                resultado["propostas_analisadas"].append(proposta_equalizada)
+                propostas_validas.append(proposta_df)
+                propostas_info.append(data_original["propostas"][idx] if idx < len(data_original["propostas"]) else {})
+        
+        # Realiza equalização item por item (em paralelo entre propostas quando compensa)
+        resultado["propostas_analisadas"] = equalizar_propostas(mapa_df, propostas_validas, propostas_info, indice_mapa)
+        
+        # Tabela de correspondências de todas as propostas, reaproveitada pela comparação e pelo mix
+        resultado["correspondencias"] = tabela_correspondencias(resultado["propostas_analisadas"])
         
         # Gera comparação lado a lado
-        resultado["comparacao_lado_a_lado"] = gerar_comparacao_lado_a_lado(
-            resultado["mapa_concorrencia"], 
-            resultado["propostas_analisadas"]
-        )
+        with medir_etapa("comparacao_lado_a_lado"):
+            resultado["comparacao_lado_a_lado"] = gerar_comparacao_lado_a_lado(
+                resultado["mapa_concorrencia"], 
+                resultado["propostas_analisadas"],
+                resultado["correspondencias"]
+            )
         
         # Gera mix de melhor preço
-        resultado["mix_melhor_preco"] = gerar_mix_melhor_preco(resultado["propostas_analisadas"])
+        with medir_etapa("mix_melhor_preco"):
+            resultado["mix_melhor_preco"] = gerar_mix_melhor_preco(
+                resultado["propostas_analisadas"], resultado["correspondencias"]
+            )
         
         # Atualiza resumo
         for proposta in resultado["propostas_analisadas"]:
@@ -594,9 +1239,63 @@ def comparar_dataframes_estruturados(mapa_df, propostas_dfs, data_original):
             "mensagem": f"Erro na comparação: {str(e)}"
         }
 
-def equalizar_proposta(mapa_df, proposta_df, proposta_info):
+# Índice do mapa recebido uma vez em cada processo do pool de equalização
+_indice_do_processo = None
+
+def _receber_indice_no_processo(indice_mapa):
+    """Inicializador dos processos do pool: guarda o índice do mapa (serializado uma vez por processo)"""
+    global _indice_do_processo
+    _indice_do_processo = indice_mapa
+
+def _equalizar_no_processo(proposta_df, proposta_info):
+    """Equaliza uma proposta com o índice do processo (executada nos processos do pool).
+
+    Retorna (resultado, contadores da equalização); dataframe_original não volta ao processo
+    principal, que já tem a proposta.
+    """
+    with execucao_monitorada(proposta_info.get("nome_arquivo", "equalizacao"), rastrear_memoria=False) as registro:
+        resultado = equalizar_proposta(_indice_do_processo.mapa_df, proposta_df, proposta_info, _indice_do_processo)
+    resultado.pop("dataframe_original", None)
+    return resultado, dict(registro.contadores)
+
+def equalizar_propostas(mapa_df, propostas_dfs, propostas_info, indice_mapa=None, max_workers=None):
+    """Equaliza as propostas contra o mapa, em um pool de processos quando há linhas suficientes.
+
+    Cada processo recebe o índice do mapa uma única vez; os resultados voltam na ordem das propostas.
+    """
+    if indice_mapa is None:
+        indice_mapa = IndiceMapa(mapa_df)
+    workers = min(max_workers or EQUALIZACAO_WORKERS, len(propostas_dfs))
+    total_linhas = sum(len(proposta_df) for proposta_df in propostas_dfs)
+    if workers > 1 and total_linhas >= EQUALIZACAO_MIN_LINHAS_PARALELO:
+        try:
+            with medir_etapa("equalizacao", f"{len(propostas_dfs)} propostas em paralelo"):
+                with ProcessPoolExecutor(
+                    max_workers=workers, initializer=_receber_indice_no_processo, initargs=(indice_mapa,)
+                ) as executor:
+                    resultados = list(executor.map(_equalizar_no_processo, propostas_dfs, propostas_info))
+            propostas_equalizadas = []
+            for proposta_df, (proposta_equalizada, contadores) in zip(propostas_dfs, resultados):
+                for nome, valor in contadores.items():
+                    incrementar(nome, valor)
+                if not proposta_equalizada.get("erro"):
+                    proposta_equalizada["dataframe_original"] = proposta_df
+                propostas_equalizadas.append(proposta_equalizada)
+            return propostas_equalizadas
+        except Exception as e:
+            logger.warning(f"Equalização paralela falhou, usando equalização serial: {e}")
+    propostas_equalizadas = []
+    for proposta_df, proposta_info in zip(propostas_dfs, propostas_info):
+        with medir_etapa("equalizacao", proposta_info.get("nome_arquivo")):
+            propostas_equalizadas.append(equalizar_proposta(mapa_df, proposta_df, proposta_info, indice_mapa))
+    return propostas_equalizadas
+
+def equalizar_proposta(mapa_df, proposta_df, proposta_info, indice_mapa=None):
     """Equaliza uma proposta específica contra o mapa de concorrência"""
     try:
+        if indice_mapa is None:
+            indice_mapa = IndiceMapa(mapa_df)
+        
         resultado_proposta = {
             "nome_arquivo": proposta_info.get("nome_arquivo", ""),
             "fornecedor": proposta_info.get("fornecedor", ""),
@@ -607,11 +1306,23 @@ def equalizar_proposta(mapa_df, proposta_df, proposta_info):
             "observacoes": []
         }
         
-        # Para cada item da proposta, verifica equalização
-        for idx, item_proposta in proposta_df.iterrows():
-            status_equalizacao = verificar_equalizacao_item(item_proposta, mapa_df)
+        # Atribuição um-para-um das linhas da proposta aos itens do mapa
+        correspondencias = correspondencias_proposta(proposta_df, indice_mapa)
+        resultado_proposta["correspondencias"] = correspondencias
+        
+        # Para cada item da proposta, verifica equalização com o item do mapa atribuído
+        status_linhas = []
+        for (idx, item_proposta), pos_mapa in zip(proposta_df.iterrows(), correspondencias["Linha_Mapa"]):
+            if pos_mapa >= 0:
+                status_equalizacao = verificar_criterios_equalizacao(item_proposta, mapa_df.iloc[pos_mapa])
+            else:
+                status_equalizacao = {
+                    "status": "Não Equalizado",
+                    "motivo": "Item não encontrado no mapa de concorrência"
+                }
             
             resultado_proposta["dataframe_equalizado"].at[idx, "Status_Equalizacao"] = status_equalizacao["status"]
+            status_linhas.append(status_equalizacao["status"])
             
             if status_equalizacao["status"] == "Equalizado":
                 resultado_proposta["itens_equalizados"] += 1
@@ -621,6 +1332,7 @@ def equalizar_proposta(mapa_df, proposta_df, proposta_info):
                     "item": item_proposta.get("Item", "N/A"),
                     "motivo": status_equalizacao["motivo"]
                 })
+        correspondencias["Status_Equalizacao"] = status_linhas
         
         return resultado_proposta
         
@@ -631,34 +1343,102 @@ def equalizar_proposta(mapa_df, proposta_df, proposta_info):
             "mensagem": f"Erro: {str(e)}"
         }
 
-def verificar_equalizacao_item(item_proposta, mapa_df):
-    """Verifica se um item específico está equalizado com o mapa"""
-    try:
-        item_desc = str(item_proposta.get("Item", "")).lower()
-        modelo_proposta = str(item_proposta.get("Modelo_Produto", "")).lower()
-        
-        # Procura item similar no mapa
-        for idx, item_mapa in mapa_df.iterrows():
-            item_mapa_desc = str(item_mapa.get("Item", "")).lower()
-            modelo_mapa = str(item_mapa.get("Modelo_Produto", "")).lower()
-            
-            # Verifica similaridade (pode ser melhorada com algoritmos mais sofisticados)
-            if (similaridade_texto(item_desc, item_mapa_desc) > 0.7 or 
-                similaridade_texto(modelo_proposta, modelo_mapa) > 0.8):
-                
-                # Verifica critérios de equalização
-                return verificar_criterios_equalizacao(item_proposta, item_mapa)
-        
-        return {
-            "status": "Não Equalizado",
-            "motivo": "Item não encontrado no mapa de concorrência"
-        }
-        
-    except Exception as e:
-        return {
-            "status": "Erro",
-            "motivo": f"Erro na verificação: {str(e)}"
-        }
+def _modelo_informado(modelo):
+    """Indica se o modelo (em minúsculas) foi extraído; "n/a" de dois lados não é semelhança de modelo"""
+    return modelo not in ("", "n/a", "nan", "none")
+
+# Bônus de desempate do peso de um par quando a quantidade e a unidade também coincidem
+DESEMPATE_QUANTIDADE_UNIDADE = 0.001
+
+def correspondencias_proposta(proposta_df, indice_mapa):
+    """Tabela de correspondências um-para-um entre as linhas da proposta e os itens do mapa.
+
+    Cada linha só é comparada com seus candidatos: os itens do mapa com o mesmo código de modelo
+    ou, sem código conhecido, os recuperados pelos índices de n-gramas. Os pares com descrição
+    parecida (> 0.7) ou modelo parecido (> 0.8) formam um grafo esparso, e a atribuição de maior
+    similaridade total (atribuicao_otima) impede que duas linhas fiquem com o mesmo item do mapa.
+    Retorna um DataFrame com Linha_Proposta, Linha_Mapa (posição no mapa, -1 sem par) e Pontuacao
+    (similaridade do par, mais 1 quando o código de modelo é o mesmo). As similaridades dos pares
+    candidatos são calculadas de uma vez; com BID_SIMILARIDADE=trigramas, só esses pares da matriz
+    de cossenos de trigramas (similaridades_pares).
+    """
+    total_linhas = len(proposta_df)
+    def coluna(df, nome, padrao=""):
+        return df[nome].tolist() if nome in df.columns else [padrao] * len(df)
+    mapa_df = indice_mapa.mapa_df
+    quantidades_mapa = coluna(mapa_df, "Quantidade", None)
+    unidades_mapa = [str(unidade).upper() for unidade in coluna(mapa_df, "Unidade")]
+    itens_proposta = [str(item).lower() for item in coluna(proposta_df, "Item")]
+    modelos_proposta = [str(modelo).lower() for modelo in coluna(proposta_df, "Modelo_Produto")]
+    # 1) Candidatos de cada linha: mesmo código de modelo ou recuperados pelos índices de n-gramas
+    candidatos_linhas = []
+    for item_desc, modelo_proposta in zip(itens_proposta, modelos_proposta):
+        posicoes_exatas = indice_mapa.candidatos_do_codigo(item_desc, modelo_proposta)
+        incrementar("modelo_exato_acertos" if posicoes_exatas else "modelo_exato_faltas")
+        if posicoes_exatas:
+            candidatos_linhas.append((posicoes_exatas, True))
+        else:
+            candidatos_linhas.append((indice_mapa.candidatos(item_desc, modelo_proposta), False))
+
+    # 2) Similaridades de todos os pares candidatos de uma vez (com trigramas, só esses pares da matriz)
+    if usar_trigramas():
+        def similaridades(textos_proposta, textos_mapa, pares):
+            if not pares:
+                return []
+            linhas, posicoes, _ = zip(*pares)
+            return similaridades_pares(textos_proposta, textos_mapa, linhas, posicoes).tolist()
+    else:
+        # Descrições repetidas (mesmo item em vários ambientes) são comparadas uma única vez
+        cache = {}
+        def similaridades(textos_proposta, textos_mapa, pares):
+            resultado = []
+            for linha, pos, corte in pares:
+                chave = (textos_proposta[linha], textos_mapa[pos], corte)
+                if chave not in cache:
+                    cache[chave] = similaridade_texto(*chave)
+                resultado.append(cache[chave])
+            return resultado
+    pares_item = [
+        (linha, pos, 0.0 if exato else 0.7)
+        for linha, (posicoes, exato) in enumerate(candidatos_linhas) for pos in posicoes
+    ]
+    pesos_item = similaridades(itens_proposta, indice_mapa.itens, pares_item)
+    # Modelo parecido (> 0.8) só é consultado nos pares sem código e com descrição abaixo de 0.7
+    pares_modelo = [
+        (linha, pos, 0.8)
+        for (linha, pos, corte), peso in zip(pares_item, pesos_item)
+        if corte and peso <= 0.7
+        and _modelo_informado(modelos_proposta[linha]) and _modelo_informado(indice_mapa.modelos[pos])
+    ]
+    pesos_modelo = dict(zip(
+        ((linha, pos) for linha, pos, _ in pares_modelo),
+        similaridades(modelos_proposta, indice_mapa.modelos, pares_modelo)
+    ))
+
+    # 3) Grafo esparso: código igual pesa 1 + similaridade da descrição, que desempata entre itens
+    # do mapa com o mesmo código (ex.: mesmo modelo em vários ambientes); quantidade e unidade iguais
+    # desempatam pares de mesmo peso
+    quantidades_proposta = coluna(proposta_df, "Quantidade", None)
+    unidades_proposta = [str(unidade).upper() for unidade in coluna(proposta_df, "Unidade")]
+    arestas = [[] for _ in range(total_linhas)]
+    for (linha, pos, corte), peso in zip(pares_item, pesos_item):
+        if not corte:
+            peso += 1.0
+        elif peso <= 0.7:
+            peso = pesos_modelo.get((linha, pos), 0.0)
+            if peso <= 0.8:
+                continue
+        arestas[linha].append((pos, peso + DESEMPATE_QUANTIDADE_UNIDADE * (
+            (quantidades_proposta[linha] == quantidades_mapa[pos]) + (unidades_proposta[linha] == unidades_mapa[pos])
+        )))
+
+    with medir_etapa("atribuicao_itens"):
+        posicoes = atribuicao_otima(arestas)
+    return pd.DataFrame({
+        "Linha_Proposta": np.arange(total_linhas),
+        "Linha_Mapa": np.array(posicoes, dtype=np.int64),
+        "Pontuacao": [dict(candidatas).get(pos, 0.0) for candidatas, pos in zip(arestas, posicoes)],
+    })
 
 def verificar_criterios_equalizacao(item_proposta, item_mapa):
     """Verifica critérios específicos de equalização entre dois itens"""
@@ -670,12 +1450,12 @@ def verificar_criterios_equalizacao(item_proposta, item_mapa):
         modelo_mapa = str(item_mapa.get("Modelo_Produto", "")).upper()
         
         if modelo_prop != "N/A" and modelo_mapa != "N/A":
-            if similaridade_texto(modelo_prop, modelo_mapa) < 0.8:
+            if similaridade_texto(modelo_prop, modelo_mapa, 0.8) < 0.8:
                 motivos.append("Modelo diferente do especificado")
         
         # Verifica quantidade
-        qtd_prop = float(str(item_proposta.get("Quantidade", 0)).replace(',', '.'))
-        qtd_mapa = float(str(item_mapa.get("Quantidade", 0)).replace(',', '.'))
+        qtd_prop = float(item_proposta.get("Quantidade", 0))
+        qtd_mapa = float(item_mapa.get("Quantidade", 0))
         
         if abs(qtd_prop - qtd_mapa) > 0.1:
             motivos.append("Quantidade divergente")
@@ -704,16 +1484,72 @@ def verificar_criterios_equalizacao(item_proposta, item_mapa):
             "motivo": f"Erro na verificação de critérios: {str(e)}"
         }
 
-def similaridade_texto(texto1, texto2):
-    """Calcula similaridade entre dois textos (0.0 a 1.0)"""
+def similaridade_texto(texto1, texto2, score_cutoff=0.0):
+    """Calcula similaridade entre dois textos (0.0 a 1.0) no motor configurado (BID_SIMILARIDADE).
+
+    Com score_cutoff, pares que não alcançam o corte podem voltar como 0.0 sem o cálculo completo.
+    """
     try:
-        from difflib import SequenceMatcher
-        return SequenceMatcher(None, texto1, texto2).ratio()
+        return similaridade_par(texto1, texto2, score_cutoff)
     except:
         return 0.0
 
-def gerar_comparacao_lado_a_lado(mapa_info, propostas_analisadas):
-    """Gera comparação visual lado a lado das propostas"""
+# Colunas da tabela de correspondências (uma linha por linha de proposta equalizada)
+COLUNAS_CORRESPONDENCIAS = [
+    "Proposta", "Fornecedor", "Linha_Proposta", "Linha_Mapa", "Pontuacao", "Status_Equalizacao"
+]
+
+def tabela_correspondencias(propostas_analisadas):
+    """Junta as correspondências de todas as propostas equalizadas em uma única tabela.
+
+    Proposta é a posição da proposta em propostas_analisadas, Linha_Proposta a posição da linha
+    no dataframe_equalizado e Linha_Mapa a posição do item atribuído no mapa (-1 sem par).
+    """
+    tabelas = []
+    for numero, proposta in enumerate(propostas_analisadas):
+        correspondencias = proposta.get("correspondencias")
+        if correspondencias is not None:
+            tabelas.append(correspondencias.assign(Proposta=numero, Fornecedor=proposta.get("fornecedor", "N/A")))
+    if not tabelas:
+        return pd.DataFrame(columns=COLUNAS_CORRESPONDENCIAS)
+    return pd.concat(tabelas, ignore_index=True)[COLUNAS_CORRESPONDENCIAS]
+
+def _itens_correspondidos(propostas_analisadas, correspondencias):
+    """Pares (linha da proposta, item do mapa) da tabela de correspondências com os campos da linha da proposta"""
+    if correspondencias is None:
+        correspondencias = tabela_correspondencias(propostas_analisadas)
+    itens = []
+    for numero, proposta in enumerate(propostas_analisadas):
+        df_prop = proposta.get("dataframe_equalizado")
+        if df_prop is not None:
+            itens.append(pd.DataFrame({
+                "Proposta": numero,
+                "Linha_Proposta": np.arange(len(df_prop)),
+                "Item": df_prop["Item"].to_numpy() if "Item" in df_prop.columns else "",
+                "Modelo_Produto": df_prop["Modelo_Produto"].to_numpy() if "Modelo_Produto" in df_prop.columns else "N/A",
+                "Custo_Total": df_prop["Custo_Total"].astype(float).to_numpy() if "Custo_Total" in df_prop.columns else 0.0,
+            }))
+    pares = correspondencias[correspondencias["Linha_Mapa"] >= 0]
+    if not itens or pares.empty:
+        return pd.DataFrame(columns=COLUNAS_CORRESPONDENCIAS + ["Item", "Modelo_Produto", "Custo_Total"])
+    pares = pares.astype({"Proposta": np.int64, "Linha_Proposta": np.int64, "Linha_Mapa": np.int64})
+    # Ordem estável: item do mapa, proposta e linha da proposta (no empate de preço vence a primeira proposta)
+    return pares.merge(pd.concat(itens, ignore_index=True), on=["Proposta", "Linha_Proposta"]).sort_values(
+        ["Linha_Mapa", "Proposta", "Linha_Proposta"], kind="stable", ignore_index=True
+    )
+
+def _menor_custo_por_item(pares):
+    """Par de menor Custo_Total de cada item do mapa (linhas sem custo não concorrem)"""
+    pares = pares[pares["Custo_Total"].notna()]
+    return pares.loc[pares.groupby("Linha_Mapa", sort=True)["Custo_Total"].idxmin()]
+
+def gerar_comparacao_lado_a_lado(mapa_info, propostas_analisadas, correspondencias=None):
+    """Gera comparação visual lado a lado das propostas.
+
+    Reaproveita as correspondências da equalização (tabela_correspondencias): cada linha de
+    proposta aparece no item do mapa que lhe foi atribuído, sem recalcular similaridades, e o
+    melhor preço de cada item sai de um agrupamento da tabela por item do mapa.
+    """
     try:
         comparacao = {
             "colunas": ["Item", "Mapa", "Propostas", "Status", "Melhor_Preco"],
@@ -724,47 +1560,34 @@ def gerar_comparacao_lado_a_lado(mapa_info, propostas_analisadas):
         if mapa_df is None or mapa_df.empty:
             return comparacao
         
-        # Para cada item do mapa, compara com todas as propostas
-        for idx_mapa, item_mapa in mapa_df.iterrows():
-            linha_comparacao = {
-                "item_mapa": item_mapa.get("Item", "N/A"),
-                "modelo_mapa": item_mapa.get("Modelo_Produto", "N/A"),
-                "custo_mapa": item_mapa.get("Custo_Total", "0.00"),
-                "propostas_comparacao": []
-            }
-            
-            melhor_preco = float('inf')
-            melhor_fornecedor = ""
-            
-            # Compara com cada proposta
-            for proposta in propostas_analisadas:
-                if "dataframe_equalizado" in proposta and proposta["dataframe_equalizado"] is not None:
-                    df_prop = proposta["dataframe_equalizado"]
-                    
-                    # Procura item equivalente na proposta
-                    for idx_prop, item_prop in df_prop.iterrows():
-                        if (similaridade_texto(
-                            str(item_mapa.get("Item", "")).lower(),
-                            str(item_prop.get("Item", "")).lower()
-                        ) > 0.7):
-                            
-                            custo_prop = float(str(item_prop.get("Custo_Total", "0")).replace(',', '.'))
-                            
-                            linha_comparacao["propostas_comparacao"].append({
-                                "fornecedor": proposta.get("fornecedor", "N/A"),
-                                "modelo": item_prop.get("Modelo_Produto", "N/A"),
-                                "custo": custo_prop,
-                                "status": item_prop.get("Status_Equalizacao", "Pendente")
-                            })
-                            
-                            if custo_prop < melhor_preco:
-                                melhor_preco = custo_prop
-                                melhor_fornecedor = proposta.get("fornecedor", "N/A")
-            
-            linha_comparacao["melhor_preco"] = melhor_preco if melhor_preco != float('inf') else 0
-            linha_comparacao["melhor_fornecedor"] = melhor_fornecedor
-            
-            comparacao["dados"].append(linha_comparacao)
+        pares = _itens_correspondidos(propostas_analisadas, correspondencias)
+        propostas_por_item = {}
+        registros = pd.DataFrame({
+            "fornecedor": pares["Fornecedor"],
+            "modelo": pares["Modelo_Produto"],
+            "custo": pares["Custo_Total"],
+            "status": pares["Status_Equalizacao"],
+        }).to_dict("records")
+        for pos_mapa, registro in zip(pares["Linha_Mapa"].tolist(), registros):
+            propostas_por_item.setdefault(pos_mapa, []).append(registro)
+        melhores = _menor_custo_por_item(pares).set_index("Linha_Mapa")
+        melhor_preco = melhores["Custo_Total"].to_dict()
+        melhor_fornecedor = melhores["Fornecedor"].to_dict()
+        
+        def coluna(nome, padrao):
+            return mapa_df[nome].tolist() if nome in mapa_df.columns else [padrao] * len(mapa_df)
+        
+        for pos_mapa, (item, modelo, custo) in enumerate(zip(
+            coluna("Item", "N/A"), coluna("Modelo_Produto", "N/A"), coluna("Custo_Total", 0.0)
+        )):
+            comparacao["dados"].append({
+                "item_mapa": item,
+                "modelo_mapa": modelo,
+                "custo_mapa": custo,
+                "propostas_comparacao": propostas_por_item.get(pos_mapa, []),
+                "melhor_preco": melhor_preco.get(pos_mapa, 0),
+                "melhor_fornecedor": melhor_fornecedor.get(pos_mapa, "")
+            })
         
         return comparacao
         
@@ -772,8 +1595,12 @@ def gerar_comparacao_lado_a_lado(mapa_info, propostas_analisadas):
         logger.error(f"Erro na comparação lado a lado: {e}")
         return {"erro": str(e)}
 
-def gerar_mix_melhor_preco(propostas_analisadas):
-    """Gera o mix de melhor preço considerando todas as propostas"""
+def gerar_mix_melhor_preco(propostas_analisadas, correspondencias=None):
+    """Gera o mix de melhor preço considerando todas as propostas.
+
+    Para cada item do mapa, escolhe entre as linhas equalizadas atribuídas a ele (tabela de
+    correspondências) a de menor custo total.
+    """
     try:
         mix = {
             "itens": [],
@@ -781,38 +1608,19 @@ def gerar_mix_melhor_preco(propostas_analisadas):
             "economia": 0.0
         }
         
-        # Agrupa todos os itens por categoria/descrição similar
-        itens_agrupados = {}
+        pares = _itens_correspondidos(propostas_analisadas, correspondencias)
+        pares = pares[pares["Status_Equalizacao"] == "Equalizado"]
         
-        for proposta in propostas_analisadas:
-            if "dataframe_equalizado" in proposta and proposta["dataframe_equalizado"] is not None:
-                df_prop = proposta["dataframe_equalizado"]
-                
-                for idx, item in df_prop.iterrows():
-                    if item.get("Status_Equalizacao") == "Equalizado":
-                        item_key = str(item.get("Item", "")).lower()
-                        custo = float(str(item.get("Custo_Total", "0")).replace(',', '.'))
-                        
-                        if item_key not in itens_agrupados:
-                            itens_agrupados[item_key] = []
-                        
-                        itens_agrupados[item_key].append({
-                            "fornecedor": proposta.get("fornecedor", "N/A"),
-                            "custo": custo,
-                            "item_completo": item
-                        })
-        
-        # Seleciona melhor preço para cada item
-        for item_key, opcoes in itens_agrupados.items():
-            if opcoes:
-                melhor_opcao = min(opcoes, key=lambda x: x["custo"])
-                mix["itens"].append({
-                    "item": item_key.title(),
-                    "fornecedor_selecionado": melhor_opcao["fornecedor"],
-                    "custo": melhor_opcao["custo"],
-                    "detalhes": melhor_opcao["item_completo"]
-                })
-                mix["total"] += melhor_opcao["custo"]
+        # Seleciona melhor preço para cada item do mapa
+        for melhor_opcao in _menor_custo_por_item(pares).itertuples(index=False):
+            df_prop = propostas_analisadas[melhor_opcao.Proposta]["dataframe_equalizado"]
+            mix["itens"].append({
+                "item": str(melhor_opcao.Item).lower().title(),
+                "fornecedor_selecionado": melhor_opcao.Fornecedor,
+                "custo": melhor_opcao.Custo_Total,
+                "detalhes": df_prop.iloc[melhor_opcao.Linha_Proposta]
+            })
+            mix["total"] += melhor_opcao.Custo_Total
         
         return mix
         
@@ -820,11 +1628,77 @@ def gerar_mix_melhor_preco(propostas_analisadas):
         logger.error(f"Erro na geração do mix de melhor preço: {e}")
         return {"erro": str(e)}
 
+_ESPACOS = re.compile(r"\s+")
+
+def normalizar_item_comparacao(texto):
+    """Item como comparado em comparar_propostas: sem espaços e em minúsculas"""
+    return _ESPACOS.sub("", texto).lower()
+
+class PropostaPreparada:
+    """Itens e valores de uma proposta preparados uma única vez para comparar_propostas.
+
+    Guarda os itens normalizados com seus tamanhos e histogramas de caracteres (limites superiores
+    da similaridade), um SequenceMatcher por item com o item já indexado (motor difflib) ou os
+    vetores de trigramas (motor trigramas), e os valores já convertidos para número.
+    """
+
+    def __init__(self, proposta):
+        self.fornecedor = proposta.get("fornecedor", proposta.get("nome_arquivo", "Proposta"))
+        self.valores = proposta.get("valores", [])
+        self.valores_numericos = converter_moeda_br(self.valores).to_numpy()
+        self.itens = [normalizar_item_comparacao(item) for item in proposta.get("itens", [])]
+        self.tamanhos = [len(item) for item in self.itens]
+        self.histogramas = [Counter(item) for item in self.itens]
+        self.comparadores = [SequenceMatcher(None, "", item) for item in self.itens] if usar_difflib() else None
+        self.vetores = VetoresTrigramas(self.itens) if usar_trigramas() else None
+
+    def melhor_item(self, item_norm, histograma=None, similaridades=None):
+        """Posição do item da proposta correspondente a um item do mapa (normalizado), ou None.
+
+        Concorrem os itens que contêm o item do mapa ou com similaridade > 0.7; fica o de maior
+        similaridade (o primeiro, no empate). Com similaridades (linha da matriz de trigramas), usa os
+        valores dados; senão descarta pelos limites de tamanho e histograma os itens que não superam
+        o melhor até aqui.
+        """
+        histograma = Counter(item_norm) if histograma is None else histograma
+        melhor_score = 0
+        melhor_idx = None
+        for idx, item_prop in enumerate(self.itens):
+            contido = item_norm in item_prop
+            corte = melhor_score if contido else max(0.7, melhor_score)
+            if similaridades is not None:
+                score = similaridades[idx]
+            else:
+                total = len(item_norm) + self.tamanhos[idx]
+                if total and 2.0 * min(len(item_norm), self.tamanhos[idx]) / total < corte:
+                    continue
+                if self.comparadores is None:
+                    score = similaridade_texto(item_norm, item_prop, corte)
+                else:
+                    if total and 2.0 * sum((histograma & self.histogramas[idx]).values()) / total < corte:
+                        continue
+                    # A similaridade de edição (maior subsequência comum) também limita o ratio() por cima
+                    if corte and similaridade_limitada(item_norm, item_prop, corte) < corte:
+                        continue
+                    comparador = self.comparadores[idx]
+                    comparador.set_seq1(item_norm)
+                    score = comparador.ratio()
+            if (contido or score > 0.7) and score > melhor_score:
+                melhor_score = score
+                melhor_idx = idx
+        return melhor_idx
+
+    def valor(self, idx):
+        """Valor do item na posição idx (número, ou o texto original se não convertido), ou None"""
+        if idx is None or idx >= len(self.valores):
+            return None
+        valor = float(self.valores_numericos[idx])
+        return self.valores[idx] if np.isnan(valor) else valor
+
 # Função global para importação
 def comparar_propostas(mapa, propostas):
 
     """Compara propostas, gera estrutura para relatório colorido, painel horizontal e mix de melhor preço"""
-    import difflib
     import pandas as pd
     if not mapa or not mapa.get("itens"):
         return [{
@@ -835,36 +1709,26 @@ def comparar_propostas(mapa, propostas):
     resultado = []
     painel = []
     mix = []
-    def normaliza(texto):
-        return re.sub(r"\s+", "", texto).lower()
-
     fornecedores_lista = [p.get("fornecedor", p.get("nome_arquivo", "Proposta")) for p in propostas]
+    # Itens normalizados, valores convertidos e estruturas de comparação de cada proposta, uma única vez
+    preparadas = [PropostaPreparada(p) for p in propostas]
+    itens_mapa_norm = [normalizar_item_comparacao(item) for item in itens_mapa]
+    # Com BID_SIMILARIDADE=trigramas, as similaridades de cada proposta (itens do mapa x itens da proposta)
+    # são calculadas em uma matriz
+    matrizes_similaridade = [None] * len(propostas)
+    if usar_trigramas():
+        vetores_mapa = VetoresTrigramas(itens_mapa_norm)
+        matrizes_similaridade = [matriz_similaridade(vetores_mapa, preparada.vetores) for preparada in preparadas]
 
-    for item_nome in itens_mapa:
+    for pos_item, (item_nome, item_norm) in enumerate(zip(itens_mapa, itens_mapa_norm)):
         fornecedores = {}
         linha_painel = {"item": item_nome}
-        item_norm = normaliza(item_nome)
+        histograma = Counter(item_norm)
         valores_item = []
-        for proposta in propostas:
-            nome_forn = proposta.get("fornecedor", proposta.get("nome_arquivo", "Proposta"))
-            valores = proposta.get("valores", [])
-            itens = proposta.get("itens", [])
-            valor = None
-            melhor_score = 0
-            melhor_idx = None
-            for idx, item_prop in enumerate(itens):
-                item_prop_norm = normaliza(item_prop)
-                score = difflib.SequenceMatcher(None, item_norm, item_prop_norm).ratio()
-                if item_norm in item_prop_norm or score > 0.7:
-                    if score > melhor_score:
-                        melhor_score = score
-                        melhor_idx = idx
-            if melhor_idx is not None and melhor_idx < len(valores):
-                try:
-                    valor_str = valores[melhor_idx]
-                    valor = float(str(valor_str).replace(".","").replace(",","."))
-                except:
-                    valor = valor_str
+        for preparada, matriz in zip(preparadas, matrizes_similaridade):
+            nome_forn = preparada.fornecedor
+            melhor_idx = preparada.melhor_item(item_norm, histograma, matriz[pos_item] if matriz is not None else None)
+            valor = preparada.valor(melhor_idx)
             fornecedores[nome_forn] = {"valor": valor if valor is not None else "-", "especificacao": item_nome}
             linha_painel[nome_forn] = valor if valor is not None else "-"
             valores_item.append(valor if valor is not None else float('inf'))
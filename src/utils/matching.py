@@ -0,0 +1,223 @@
+import heapq
+import math
+import os
+import re
+from collections import defaultdict
+
+# Tamanho dos n-gramas de caracteres usados na recuperação de candidatos
+TAMANHO_NGRAMA = 3
+# Número de candidatos (por campo) que passam para o cálculo exato de similaridade
+CANDIDATOS_POR_LINHA = int(os.getenv("BID_CANDIDATOS_POR_LINHA", "20"))
+# N-gramas presentes em mais do que esta fração das linhas não discriminam e são ignorados
+FRACAO_MAXIMA_NGRAMA = 0.2
+# Códigos de modelo (ex.: "FXEQ25AVE", "MSY-GN12"): comparados em maiúsculas e sem espaços/separadores;
+# só valem como código textos com letras e dígitos
+_SEPARADORES_CODIGO = re.compile(r"[\s\-./_]+")
+_CODIGO_MODELO = re.compile(r"(?=[A-Z0-9]*\d)(?=[A-Z0-9]*[A-Z])[A-Z0-9]{4,}")
+
+
+def normalizar_codigo_modelo(modelo):
+    """Código do modelo normalizado (maiúsculas, sem espaços e separadores), ou None se não parece um código"""
+    codigo = _SEPARADORES_CODIGO.sub("", str(modelo).upper())
+    return codigo if _CODIGO_MODELO.fullmatch(codigo) else None
+
+
+def ngramas(texto, n=TAMANHO_NGRAMA):
+    """Retorna o conjunto de n-gramas de caracteres do texto (com espaço nas bordas)"""
+    texto = f" {texto} "
+    if len(texto) <= n:
+        return {texto}
+    return {texto[i:i + n] for i in range(len(texto) - n + 1)}
+
+
+class IndiceNGramas:
+    """Índice invertido de n-gramas de caracteres para recuperar os textos mais parecidos com uma consulta"""
+
+    def __init__(self, textos, n=TAMANHO_NGRAMA):
+        self.n = n
+        self.tamanhos = []
+        self.primeira_posicao = {}
+        postings = defaultdict(list)
+        for posicao, texto in enumerate(textos):
+            self.primeira_posicao.setdefault(texto, posicao)
+            gramas = ngramas(texto, n)
+            self.tamanhos.append(len(gramas))
+            for grama in gramas:
+                postings[grama].append(posicao)
+        limite = max(50, int(len(self.tamanhos) * FRACAO_MAXIMA_NGRAMA))
+        self.postings = {grama: posicoes for grama, posicoes in postings.items() if len(posicoes) <= limite}
+
+    def candidatos(self, texto, k=CANDIDATOS_POR_LINHA, entre=None):
+        """Retorna as posições dos k textos com maior coeficiente de Dice de n-gramas com a consulta.
+
+        Com entre (conjunto de posições), só essas posições concorrem.
+        """
+        gramas = ngramas(texto, self.n)
+        contagem = defaultdict(int)
+        for grama in gramas:
+            for posicao in self.postings.get(grama, ()):
+                contagem[posicao] += 1
+        if entre is not None:
+            contagem = {posicao: total for posicao, total in contagem.items() if posicao in entre}
+        total = len(gramas)
+        melhores = heapq.nlargest(k, contagem, key=lambda p: contagem[p] / (total + self.tamanhos[p]))
+        # Textos idênticos sempre entram, mesmo formados só por n-gramas muito frequentes (ex.: "n/a")
+        identico = self.primeira_posicao.get(texto)
+        if identico is not None and identico not in melhores and (entre is None or identico in entre):
+            melhores.append(identico)
+        return melhores
+
+    def coeficientes(self, texto, outros):
+        """Coeficiente de Dice de n-gramas entre a consulta e cada um dos outros textos, na mesma escala de candidatos()"""
+        gramas = ngramas(texto, self.n)
+        total = len(gramas)
+        # Como em candidatos(), n-gramas muito frequentes (fora do índice) não contam como comuns
+        gramas = {grama for grama in gramas if grama in self.postings}
+        resultado = []
+        for outro in outros:
+            gramas_outro = ngramas(outro, self.n)
+            resultado.append(len(gramas & gramas_outro) / (total + len(gramas_outro)))
+        return resultado
+
+
+class IndiceMapa:
+    """Índices sobre as colunas Item e Modelo_Produto do mapa de concorrência.
+
+    Linhas cujo código de modelo está no mapa são resolvidas pelo índice exato de códigos
+    (posicoes_do_codigo); as demais recuperam candidatos pelos índices de n-gramas.
+    """
+
+    def __init__(self, mapa_df):
+        self.mapa_df = mapa_df
+        self.itens = [str(valor).lower() for valor in mapa_df.get("Item", [""] * len(mapa_df))]
+        self.modelos = [str(valor).lower() for valor in mapa_df.get("Modelo_Produto", [""] * len(mapa_df))]
+        self.indice_itens = IndiceNGramas(self.itens)
+        self.indice_modelos = IndiceNGramas(self.modelos)
+        # Código de modelo normalizado -> posições do mapa com esse código, na ordem do mapa
+        self.posicoes_por_codigo = defaultdict(list)
+        for posicao, modelo in enumerate(self.modelos):
+            codigo = normalizar_codigo_modelo(modelo)
+            if codigo:
+                self.posicoes_por_codigo[codigo].append(posicao)
+        # Código -> descrições distintas dos itens com esse código e quantas posições cada uma tem
+        self._descricoes_por_codigo = {}
+
+    def posicoes_do_codigo(self, modelo):
+        """Posições do mapa com o mesmo código de modelo (vazio se o modelo não é um código ou não está no mapa)"""
+        codigo = normalizar_codigo_modelo(modelo)
+        return self.posicoes_por_codigo.get(codigo, []) if codigo else []
+
+    def candidatos_do_codigo(self, item_desc, modelo, k=CANDIDATOS_POR_LINHA):
+        """Posições do mapa com o mesmo código de modelo, na ordem original do mapa.
+
+        Se forem mais de k (mesmo modelo em muitos ambientes), ficam as das descrições mais
+        parecidas pelos n-gramas até cobrir k posições (com as empatadas com a última), incluindo
+        todas as repetições dessas descrições. Só as descrições distintas do código são comparadas.
+        """
+        codigo = normalizar_codigo_modelo(modelo)
+        posicoes = self.posicoes_por_codigo.get(codigo, []) if codigo else []
+        if len(posicoes) <= k:
+            return posicoes
+        if codigo not in self._descricoes_por_codigo:
+            contagem = defaultdict(int)
+            for posicao in posicoes:
+                contagem[self.itens[posicao]] += 1
+            self._descricoes_por_codigo[codigo] = contagem
+        contagem = self._descricoes_por_codigo[codigo]
+        coeficientes = self.indice_itens.coeficientes(item_desc, contagem)
+        # Maior coeficiente primeiro, até cobrir k posições; descrições empatadas com a última entram todas
+        ordem = sorted(
+            ((coeficiente, descricao) for coeficiente, descricao in zip(coeficientes, contagem) if coeficiente > 0),
+            key=lambda par: -par[0]
+        )
+        descricoes = set()
+        cobertas = 0
+        for coeficiente, descricao in ordem:
+            if cobertas >= k and coeficiente < ultimo:
+                break
+            descricoes.add(descricao)
+            cobertas += contagem[descricao]
+            ultimo = coeficiente
+        # Descrição idêntica sempre entra
+        if item_desc in contagem:
+            descricoes.add(item_desc)
+        if not descricoes:
+            return posicoes[:k]
+        return [posicao for posicao in posicoes if self.itens[posicao] in descricoes]
+
+    def candidatos(self, item_desc, modelo, k=CANDIDATOS_POR_LINHA):
+        """Posições candidatas do mapa para uma linha da proposta, na ordem original do mapa"""
+        posicoes = set(self.indice_itens.candidatos(item_desc, k))
+        posicoes.update(self.indice_modelos.candidatos(modelo, k))
+        return sorted(posicoes)
+
+
+def atribuicao_otima(arestas):
+    """Atribuição um-para-um de peso total máximo em um grafo bipartido esparso (linhas x posições).
+
+    arestas[linha] lista os pares (posicao, peso) da linha, com peso > 0; ficar sem par vale 0.
+    Cada linha recebe no máximo uma posição e cada posição no máximo uma linha. Usa caminhos
+    aumentantes mínimos com potenciais (algoritmo húngaro com Dijkstra sobre as arestas
+    existentes): a busca de cada linha para na primeira posição livre, então linhas sem disputa
+    custam só a ordenação das próprias arestas. Retorna a posição de cada linha (-1 sem par).
+    """
+    # Custo = -peso. Cada linha tem ainda uma coluna própria de custo 0 ("sem par"), de chave -1 - linha
+    custos = [[(posicao, -peso) for posicao, peso in candidatas] + [(-1 - linha, 0.0)] for linha, candidatas in enumerate(arestas)]
+    coluna_da_linha = [None] * len(arestas)
+    dono = {}
+    u = [0.0] * len(arestas)
+    v = defaultdict(float)
+
+    for origem, custos_origem in enumerate(custos):
+        if len(custos_origem) == 1:
+            coluna_da_linha[origem] = -1 - origem
+            continue
+        # Potencial inicial da linha: custos reduzidos (custo - u - v) não negativos
+        u[origem] = min(custo - v[coluna] for coluna, custo in custos_origem)
+        distancia = {}
+        anterior = {}
+        heap = []
+        for coluna, custo in custos_origem:
+            distancia[coluna] = custo - u[origem] - v[coluna]
+            anterior[coluna] = origem
+            heap.append((distancia[coluna], coluna))
+        heapq.heapify(heap)
+        fixadas = {}
+        while True:
+            d, coluna = heapq.heappop(heap)
+            if coluna in fixadas or d > distancia[coluna]:
+                continue
+            fixadas[coluna] = d
+            linha = dono.get(coluna)
+            if linha is None:
+                destino, total = coluna, d
+                break
+            # Posição ocupada: o caminho continua pelas arestas da linha que a ocupa
+            for proxima, custo in custos[linha]:
+                if proxima in fixadas:
+                    continue
+                nova = d + custo - u[linha] - v[proxima]
+                if nova < distancia.get(proxima, math.inf):
+                    distancia[proxima] = nova
+                    anterior[proxima] = linha
+                    heapq.heappush(heap, (nova, proxima))
+
+        # Atualiza os potenciais (custos reduzidos continuam não negativos e zero nos pares atuais)
+        u[origem] += total
+        for coluna, d in fixadas.items():
+            v[coluna] += d - total
+            linha = dono.get(coluna)
+            if linha is not None:
+                u[linha] += total - d
+        # Inverte o caminho aumentante, da posição livre até a linha de origem
+        coluna = destino
+        while True:
+            linha = anterior[coluna]
+            coluna_anterior = coluna_da_linha[linha]
+            dono[coluna] = linha
+            coluna_da_linha[linha] = coluna
+            if linha == origem:
+                break
+            coluna = coluna_anterior
+
+    return [coluna if coluna is not None and coluna >= 0 else -1 for coluna in coluna_da_linha]
@@ -0,0 +1,258 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Mede o pico de memória alocada por etapa com tracemalloc. Desligado por padrão: deixa todas as
+# alocações do Python (pandas, regex) mais lentas; tempo de parede e CPU são sempre medidos
+RASTREAR_MEMORIA = os.getenv("BID_PERFIL_MEMORIA", "0") == "1"
+
+# Execução monitorada atual e pilha de etapas abertas (por thread/sessão do Streamlit)
+_execucao_atual = contextvars.ContextVar("execucao_atual", default=None)
+_etapas_abertas = contextvars.ContextVar("etapas_abertas", default=())
+
+# tracemalloc é do processo inteiro (start/stop/reset_peak valem para todas as threads): a memória
+# só é medida pela execução que está sozinha no processo. Guardam o número de execuções em
+# andamento e a execução dona do tracemalloc
+_memoria_lock = threading.Lock()
+_execucoes_ativas = 0
+_dona_memoria = None
+
+# Totais acumulados no processo, expostos como métricas Prometheus
+_totais_lock = threading.Lock()
+_totais_etapas = defaultdict(lambda: {"execucoes": 0, "segundos": 0.0, "cpu_segundos": 0.0, "pico_memoria_bytes": 0})
+_totais_contadores = defaultdict(float)
+
+
+class RegistroExecucao:
+    """Medições (tempo de parede, CPU e pico de memória) das etapas de uma execução do pipeline"""
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.inicio = datetime.now()
+        self.etapas = []
+        self.contadores = defaultdict(float)
+        self.segundos = 0.0
+        # Falso quando a memória não foi medida (desativada, ou outra execução simultânea no processo)
+        self.memoria_medida = False
+
+    def registrar_etapa(self, etapa):
+        self.etapas.append(etapa)
+
+    def incrementar(self, nome, valor=1):
+        self.contadores[nome] += valor
+
+    def taxas_acerto(self):
+        """Taxa de acerto de cada par de contadores <nome>_acertos/<nome>_faltas (ex.: cache, modelo exato)"""
+        taxas = {}
+        for nome, acertos in self.contadores.items():
+            if nome.endswith("_acertos"):
+                base = nome[:-len("_acertos")]
+                total = acertos + self.contadores.get(f"{base}_faltas", 0)
+                if total:
+                    taxas[base] = acertos / total
+        return taxas
+
+    def resumo(self):
+        """Totais por etapa (soma de tempos, maior pico de memória)"""
+        resumo = {}
+        for etapa in self.etapas:
+            total = resumo.setdefault(etapa["etapa"], {
+                "etapa": etapa["etapa"], "execucoes": 0, "segundos": 0.0, "cpu_segundos": 0.0, "pico_memoria_bytes": 0
+            })
+            total["execucoes"] += 1
+            total["segundos"] += etapa["segundos"]
+            total["cpu_segundos"] += etapa["cpu_segundos"]
+            total["pico_memoria_bytes"] = max(total["pico_memoria_bytes"], etapa["pico_memoria_bytes"] or 0)
+        return list(resumo.values())
+
+    def to_dict(self):
+        return {
+            "execucao": self.nome,
+            "inicio": self.inicio.isoformat(timespec="seconds"),
+            "segundos": self.segundos,
+            "memoria_medida": self.memoria_medida,
+            "etapas": self.etapas,
+            "resumo": self.resumo(),
+            "contadores": dict(self.contadores),
+            "taxas_acerto": self.taxas_acerto(),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+
+class _EtapaAberta:
+    """Estado de uma etapa em andamento, usado para combinar picos de memória de etapas aninhadas"""
+
+    def __init__(self):
+        self.memoria_inicial = 0
+        self.pico = 0
+
+
+def _abrir_execucao(registro, rastrear_memoria):
+    """Conta a execução como ativa e decide se ela mede memória. Retorna True se iniciou o tracemalloc"""
+    global _execucoes_ativas, _dona_memoria
+    with _memoria_lock:
+        _execucoes_ativas += 1
+        if _dona_memoria is not None:
+            # Outra execução começou: os picos da dona passariam a incluir as alocações desta
+            _dona_memoria.memoria_medida = False
+        if not rastrear_memoria or _execucoes_ativas > 1:
+            return False
+        _dona_memoria = registro
+        registro.memoria_medida = True
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start()
+        return True
+
+
+def _fechar_execucao(registro, iniciou_tracemalloc):
+    global _execucoes_ativas, _dona_memoria
+    with _memoria_lock:
+        _execucoes_ativas -= 1
+        if _dona_memoria is registro:
+            _dona_memoria = None
+        if iniciou_tracemalloc:
+            tracemalloc.stop()
+
+
+def _medindo_memoria(registro):
+    """Indica se a execução é a dona do tracemalloc e continua sozinha no processo"""
+    return registro.memoria_medida and _dona_memoria is registro and tracemalloc.is_tracing()
+
+
+@contextmanager
+def execucao_monitorada(nome, rastrear_memoria=None):
+    """Abre uma execução monitorada: as etapas medidas dentro do bloco são registradas no RegistroExecucao.
+
+    Tempo, CPU e contadores são separados por execução (contextvars). A memória não: com outra
+    execução em andamento no processo (ex.: duas sessões do Streamlit), nenhuma das duas mede
+    memória a partir daí, e o registro fica com memoria_medida=False.
+    """
+    rastrear_memoria = RASTREAR_MEMORIA if rastrear_memoria is None else rastrear_memoria
+    registro = RegistroExecucao(nome)
+    iniciou_tracemalloc = _abrir_execucao(registro, rastrear_memoria)
+    token = _execucao_atual.set(registro)
+    token_etapas = _etapas_abertas.set(())
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        registro.segundos = time.perf_counter() - inicio
+        _etapas_abertas.reset(token_etapas)
+        _execucao_atual.reset(token)
+        _fechar_execucao(registro, iniciou_tracemalloc)
+        _acumular_totais(registro)
+        logger.info(f"Execução '{nome}' concluída em {registro.segundos:.2f}s")
+
+
+@contextmanager
+def medir_etapa(nome, arquivo=None):
+    """Mede uma etapa do pipeline (tempo de parede, CPU e pico de memória) na execução monitorada atual.
+
+    Fora de uma execução monitorada não faz nada. Etapas podem ser aninhadas: o pico de memória
+    de uma etapa inclui o das etapas internas. Sem medição de memória na execução (ver
+    execucao_monitorada), o pico fica None.
+    """
+    registro = _execucao_atual.get()
+    if registro is None:
+        yield
+        return
+
+    abertas = _etapas_abertas.get()
+    atual = _EtapaAberta()
+    rastreando = _medindo_memoria(registro)
+    if rastreando:
+        memoria, pico = tracemalloc.get_traced_memory()
+        # O pico global é zerado para medir esta etapa; a etapa externa guarda o pico visto até aqui
+        if abertas:
+            abertas[-1].pico = max(abertas[-1].pico, pico)
+        tracemalloc.reset_peak()
+        atual.memoria_inicial = memoria
+    token = _etapas_abertas.set(abertas + (atual,))
+    inicio = time.perf_counter()
+    inicio_cpu = time.process_time()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        cpu_segundos = time.process_time() - inicio_cpu
+        _etapas_abertas.reset(token)
+        pico_memoria = None
+        if rastreando and _medindo_memoria(registro):
+            atual.pico = max(atual.pico, tracemalloc.get_traced_memory()[1])
+            pico_memoria = max(0, atual.pico - atual.memoria_inicial)
+            if abertas:
+                abertas[-1].pico = max(abertas[-1].pico, atual.pico)
+        registro.registrar_etapa({
+            "etapa": nome,
+            "arquivo": arquivo,
+            "nivel": len(abertas),
+            "segundos": segundos,
+            "cpu_segundos": cpu_segundos,
+            "pico_memoria_bytes": pico_memoria,
+        })
+        logger.info(f"Etapa {nome}{f' ({arquivo})' if arquivo else ''} concluída em {segundos:.2f}s")
+
+
+def incrementar(nome, valor=1):
+    """Incrementa um contador da execução monitorada atual (ex.: acertos do cache)"""
+    registro = _execucao_atual.get()
+    if registro is not None:
+        registro.incrementar(nome, valor)
+
+
+def _acumular_totais(registro):
+    with _totais_lock:
+        for etapa in registro.resumo():
+            total = _totais_etapas[etapa["etapa"]]
+            total["execucoes"] += etapa["execucoes"]
+            total["segundos"] += etapa["segundos"]
+            total["cpu_segundos"] += etapa["cpu_segundos"]
+            total["pico_memoria_bytes"] = max(total["pico_memoria_bytes"], etapa["pico_memoria_bytes"])
+        for nome, valor in registro.contadores.items():
+            _totais_contadores[nome] += valor
+
+
+def _escapar_rotulo(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def metricas_prometheus(registro=None):
+    """Métricas no formato texto do Prometheus: de um registro, ou os totais acumulados no processo"""
+    if registro is not None:
+        etapas = {etapa["etapa"]: etapa for etapa in registro.resumo()}
+        contadores = dict(registro.contadores)
+    else:
+        with _totais_lock:
+            etapas = {nome: dict(total) for nome, total in _totais_etapas.items()}
+            contadores = dict(_totais_contadores)
+
+    metricas = [
+        ("bid_etapa_execucoes_total", "counter", "Número de execuções da etapa", "execucoes"),
+        ("bid_etapa_segundos_total", "counter", "Tempo de parede acumulado da etapa em segundos", "segundos"),
+        ("bid_etapa_cpu_segundos_total", "counter", "Tempo de CPU acumulado da etapa em segundos", "cpu_segundos"),
+        ("bid_etapa_pico_memoria_bytes", "gauge", "Maior pico de memória alocada pela etapa", "pico_memoria_bytes"),
+    ]
+    linhas = []
+    for nome_metrica, tipo, ajuda, campo in metricas:
+        linhas.append(f"# HELP {nome_metrica} {ajuda}")
+        linhas.append(f"# TYPE {nome_metrica} {tipo}")
+        for nome_etapa, valores in sorted(etapas.items()):
+            linhas.append(f'{nome_metrica}{{etapa="{_escapar_rotulo(nome_etapa)}"}} {valores[campo]}')
+    if contadores:
+        linhas.append("# HELP bid_contador_total Contadores do pipeline (cache, equalização, etc.)")
+        linhas.append("# TYPE bid_contador_total counter")
+        for nome, valor in sorted(contadores.items()):
+            linhas.append(f'bid_contador_total{{nome="{_escapar_rotulo(nome)}"}} {valor}')
+    return "\n".join(linhas) + "\n"
@@ -13,6 +13,10 @@ import xlsxwriter
 import io
 import re
 import json
+try:
+    from fpdf import FPDF
+except ImportError:
+    FPDF = None
 
 
 class BIDReportGenerator:
@@ -42,6 +46,60 @@ class BIDReportGenerator:
             st.error(f"Erro ao extrair dados da análise: {e}")
             return self._get_sample_data()
     
+    def extract_data_from_comparison(self, comparacao, equalizacao=None):
+        """Monta os dados do relatório a partir de comparar_propostas e da análise de equalização"""
+        resultado = comparacao.get("resultado", [])
+        totais = {}
+        itens_cotados = {}
+        for item in resultado:
+            for fornecedor, dados in item.get("fornecedores", {}).items():
+                totais.setdefault(fornecedor, 0.0)
+                itens_cotados.setdefault(fornecedor, 0)
+                if isinstance(dados.get("valor"), (int, float)):
+                    totais[fornecedor] += dados["valor"]
+                    itens_cotados[fornecedor] += 1
+
+        # Score: percentual de itens equalizados de cada proposta (ou de itens cotados, sem equalização)
+        scores = {}
+        for proposta in (equalizacao or {}).get("propostas_analisadas", []):
+            df_eq = proposta.get("dataframe_equalizado")
+            if df_eq is not None and len(df_eq):
+                equalizados = (df_eq["Status_Equalizacao"] == "Equalizado").sum()
+                scores[proposta.get("fornecedor", "N/A")] = round(100 * equalizados / len(df_eq))
+        fornecedores = [
+            {
+                "nome": nome,
+                "total_itens": itens_cotados[nome],
+                "valor_total": total,
+                "score": scores.get(nome, round(100 * itens_cotados[nome] / len(resultado)) if resultado else 0)
+            }
+            for nome, total in totais.items()
+        ]
+
+        itens = [
+            {
+                "item": mix_item["item"],
+                "quantidade": item.get("quantidade", "-"),
+                "melhor_preco": mix_item["melhor_valor"],
+                "melhor_fornecedor": mix_item["melhor_fornecedor"]
+            }
+            for item, mix_item in zip(resultado, comparacao.get("mix_melhor_preco", []))
+            if mix_item.get("melhor_fornecedor")
+        ]
+        valores_totais = [f["valor_total"] for f in fornecedores]
+        return {
+            "resumo": {
+                "total_fornecedores": len(fornecedores),
+                "total_itens": len(resultado),
+                "menor_valor_total": min(valores_totais, default=0),
+                "maior_valor_total": max(valores_totais, default=0),
+                "data_analise": datetime.now().strftime("%d/%m/%Y %H:%M")
+            },
+            "fornecedores": fornecedores,
+            "itens": itens,
+            "recomendacoes": [item["recomendacao"] for item in resultado if item.get("melhor_preco")]
+        }
+
     def _extract_number(self, text, pattern):
         """Extrai números do texto usando regex"""
         import re
@@ -360,4 +418,33 @@ class BIDReportGenerator:
             
         except Exception as e:
             st.error(f"Erro ao gerar PDF: {e}")
-            return None
\ No newline at end of file
+            return None
+
+
+def exportar_comparativo_excel(df_result):
+    """Gera o Excel do relatório comparativo e retorna o conteúdo do arquivo em bytes"""
+    output = io.BytesIO()
+    df_result.to_excel(output, index=False)
+    return output.getvalue()
+
+
+def exportar_comparativo_pdf(df_result):
+    """Gera o PDF simples do relatório comparativo em bytes (None se a biblioteca fpdf não estiver instalada)"""
+    if FPDF is None:
+        return None
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, txt="Relatório Comparativo de Propostas", ln=True, align='C')
+    pdf.ln(10)
+    # Cabeçalho
+    colunas = df_result.columns.tolist()
+    for col in colunas:
+        pdf.cell(40, 10, col, border=1)
+    pdf.ln()
+    # Dados
+    for row in df_result.itertuples(index=False):
+        for valor in row:
+            pdf.cell(40, 10, str(valor), border=1)
+        pdf.ln()
+    return pdf.output(dest='S').encode('latin1')
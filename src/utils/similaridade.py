@@ -0,0 +1,264 @@
+import math
+import os
+from collections import Counter
+from difflib import SequenceMatcher
+
+import numpy as np
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+# Motor de similaridade de textos da equalização e da comparação de propostas: "difflib"
+# (SequenceMatcher, par a par), "levenshtein" (distância de edição limitada, similaridade_limitada)
+# ou "trigramas" (cosseno de trigramas em blocos)
+MOTOR_SIMILARIDADE = os.getenv("BID_SIMILARIDADE", "difflib")
+# Linhas da consulta por bloco na matriz de similaridades (limita a memória: bloco x textos da base)
+LINHAS_POR_BLOCO = int(os.getenv("BID_SIMILARIDADE_BLOCO", "256"))
+# Pares por bloco nas similaridades de pares de textos (similaridades_pares)
+PARES_POR_BLOCO = 65536
+# Colunas do espaço de hashing dos trigramas (colisões ficam desprezíveis para textos curtos)
+DIMENSAO_HASH = 1 << 20
+TAMANHO_TRIGRAMA = 3
+# Hash multiplicativo (Fibonacci) dos trigramas, sobre os três códigos Unicode de 21 bits:
+# estável entre processos, ao contrário de hash() do Python
+_BITS_CARACTERE = 21
+_MULTIPLICADOR_HASH = np.uint64(11400714819323198485)
+_BITS_HASH = DIMENSAO_HASH.bit_length() - 1
+
+# Curva de calibração do cosseno para a escala do SequenceMatcher.ratio(): pares (cosseno, ratio)
+# medidos em descrições e modelos de BIDs sintéticos (benchmarks/calibrar_similaridade.py).
+# Com ela os limiares 0.7 (descrição) e 0.8 (modelo) mantêm o significado nos dois motores
+CALIBRACAO_COSSENO = np.array([0.0, 0.014, 0.035, 0.064, 0.08, 0.197, 0.323, 0.488, 0.586, 0.704, 0.759, 0.826, 0.865, 1.0])
+CALIBRACAO_RATIO = np.array([0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 1.0])
+
+
+def usar_difflib():
+    """Indica se o motor de similaridade configurado é o SequenceMatcher (difflib)"""
+    return MOTOR_SIMILARIDADE == "difflib"
+
+
+def usar_trigramas():
+    """Indica se o motor de similaridade configurado é o de trigramas"""
+    return MOTOR_SIMILARIDADE == "trigramas"
+
+
+def calibrar(cossenos):
+    """Converte cossenos de trigramas para a escala do SequenceMatcher.ratio()"""
+    return np.interp(cossenos, CALIBRACAO_COSSENO, CALIBRACAO_RATIO)
+
+
+class VetoresTrigramas:
+    """Textos codificados como vetores esparsos de contagem de trigramas de caracteres (hash), com norma 1.
+
+    Guarda a matriz em CSR (indptr, colunas, valores) e, com scipy instalado, também como
+    scipy.sparse.csr_matrix.
+    """
+
+    def __init__(self, textos):
+        textos = [f" {texto} " for texto in textos]
+        self.total = len(textos)
+        tamanhos = np.fromiter((len(texto) for texto in textos), dtype=np.int64, count=self.total)
+        codigos = np.frombuffer("".join(textos).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        inicios = np.cumsum(tamanhos) - tamanhos
+        # Trigramas de cada texto; textos com menos de 3 caracteres (com as bordas) viram um único termo
+        por_texto = np.maximum(tamanhos - TAMANHO_TRIGRAMA + 1, 1)
+        linhas = np.repeat(np.arange(self.total, dtype=np.int64), por_texto)
+        posicoes = np.arange(len(linhas), dtype=np.int64) - np.repeat(np.cumsum(por_texto) - por_texto, por_texto)
+        posicoes += np.repeat(inicios, por_texto)
+        trigramas = np.zeros(len(linhas), dtype=np.uint64)
+        fins = np.repeat(inicios + tamanhos, por_texto)
+        for deslocamento in range(TAMANHO_TRIGRAMA):
+            dentro = posicoes + deslocamento < fins
+            trigramas[dentro] |= codigos[posicoes[dentro] + deslocamento] << np.uint64(_BITS_CARACTERE * deslocamento)
+        colunas = ((trigramas * _MULTIPLICADOR_HASH) >> np.uint64(64 - _BITS_HASH)).astype(np.int64)
+
+        chaves, contagens = np.unique(linhas * DIMENSAO_HASH + colunas, return_counts=True)
+        linhas = chaves // DIMENSAO_HASH
+        self.colunas = chaves % DIMENSAO_HASH
+        normas = np.sqrt(np.bincount(linhas, weights=contagens.astype(np.float64) ** 2, minlength=self.total))
+        self.valores = contagens / normas[linhas]
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(linhas, minlength=self.total))))
+        self.matriz = None
+        if sparse is not None:
+            self.matriz = sparse.csr_matrix(
+                (self.valores, self.colunas, self.indptr), shape=(self.total, DIMENSAO_HASH)
+            )
+        # Transposta (CSC) usada pelo produto em NumPy: entradas ordenadas por coluna
+        ordem = np.argsort(self.colunas, kind="stable")
+        self._colunas_ordenadas = self.colunas[ordem]
+        self._linhas_ordenadas = linhas[ordem]
+        self._valores_ordenados = self.valores[ordem]
+
+    def produto(self, outros, inicio, fim):
+        """Produtos escalares (cossenos) das linhas inicio:fim de outros com todos os textos deste conjunto"""
+        if self.matriz is not None and outros.matriz is not None:
+            return (outros.matriz[inicio:fim] @ self.matriz.T).toarray()
+        # Sem scipy: cada termo da consulta encontra as entradas da mesma coluna por busca binária,
+        # e os produtos são somados por (linha da consulta, texto) com bincount
+        de, ate = outros.indptr[inicio], outros.indptr[fim]
+        colunas = outros.colunas[de:ate]
+        linhas = np.repeat(np.arange(fim - inicio), np.diff(outros.indptr[inicio:fim + 1]))
+        primeiros = np.searchsorted(self._colunas_ordenadas, colunas, side="left")
+        quantidades = np.searchsorted(self._colunas_ordenadas, colunas, side="right") - primeiros
+        indices = np.arange(quantidades.sum()) + np.repeat(primeiros - (np.cumsum(quantidades) - quantidades), quantidades)
+        chaves = np.repeat(linhas, quantidades) * self.total + self._linhas_ordenadas[indices]
+        pesos = np.repeat(outros.valores[de:ate], quantidades) * self._valores_ordenados[indices]
+        return np.bincount(chaves, weights=pesos, minlength=(fim - inicio) * self.total).reshape(fim - inicio, self.total)
+
+    def produto_pares(self, outros, linhas_outros, linhas):
+        """Produtos escalares (cossenos) de cada par (outros[linhas_outros[i]], self[linhas[i]])"""
+        if self.matriz is not None and outros.matriz is not None:
+            return np.asarray(outros.matriz[linhas_outros].multiply(self.matriz[linhas]).sum(axis=1)).ravel()
+        # Sem scipy: as entradas de cada par ficam com chave (par, coluna), ordenadas nos dois lados
+        # (colunas ordenadas dentro de cada linha); termos comuns são achados por busca binária
+        def entradas(vetores, posicoes):
+            quantidades = np.diff(vetores.indptr)[posicoes]
+            indices = np.arange(quantidades.sum()) + np.repeat(vetores.indptr[posicoes] - (np.cumsum(quantidades) - quantidades), quantidades)
+            pares = np.repeat(np.arange(len(posicoes)), quantidades)
+            return pares, pares * DIMENSAO_HASH + vetores.colunas[indices], vetores.valores[indices]
+        pares, chaves_outros, valores_outros = entradas(outros, linhas_outros)
+        _, chaves, valores = entradas(self, linhas)
+        encontradas = np.minimum(np.searchsorted(chaves, chaves_outros), max(len(chaves) - 1, 0))
+        comuns = chaves[encontradas] == chaves_outros if len(chaves) else np.zeros(len(chaves_outros), dtype=bool)
+        pesos = valores_outros[comuns] * valores[encontradas[comuns]]
+        return np.bincount(pares[comuns], weights=pesos, minlength=len(linhas))
+
+
+def _similaridades_calibradas(base, consultas, inicio, fim):
+    # Arredondamentos podem levar o cosseno de textos iguais um pouco acima de 1
+    return calibrar(np.minimum(base.produto(consultas, inicio, fim), 1.0))
+
+
+def blocos_similaridade(consultas, base, linhas_por_bloco=None):
+    """Gera (inicio, bloco) com as similaridades calibradas das consultas contra todos os textos da base.
+
+    Cada bloco é uma matriz (linhas do bloco x textos da base); só um bloco fica em memória por vez.
+    """
+    linhas_por_bloco = linhas_por_bloco or LINHAS_POR_BLOCO
+    if not isinstance(consultas, VetoresTrigramas):
+        consultas = VetoresTrigramas(consultas)
+    if not isinstance(base, VetoresTrigramas):
+        base = VetoresTrigramas(base)
+    for inicio in range(0, consultas.total, linhas_por_bloco):
+        fim = min(inicio + linhas_por_bloco, consultas.total)
+        yield inicio, _similaridades_calibradas(base, consultas, inicio, fim)
+
+
+def matriz_similaridade(consultas, base, linhas_por_bloco=None):
+    """Matriz completa de similaridades calibradas (consultas x base), montada bloco a bloco"""
+    total = len(consultas) if not isinstance(consultas, VetoresTrigramas) else consultas.total
+    total_base = len(base) if not isinstance(base, VetoresTrigramas) else base.total
+    matriz = np.zeros((total, total_base))
+    for inicio, bloco in blocos_similaridade(consultas, base, linhas_por_bloco):
+        matriz[inicio:inicio + len(bloco)] = bloco
+    return matriz
+
+
+def similaridades_pares(consultas, base, linhas, colunas):
+    """Similaridades calibradas de cada par (consultas[linhas[i]], base[colunas[i]]), sem calcular a matriz inteira.
+
+    Textos repetidos são codificados uma única vez e pares de textos repetidos são calculados uma
+    única vez; os pares distintos são processados em blocos de PARES_POR_BLOCO.
+    """
+    if not len(linhas):
+        return np.zeros(0)
+    def distintos(textos, posicoes):
+        codigo_texto = {}
+        codigos = np.fromiter((codigo_texto.setdefault(texto, len(codigo_texto)) for texto in textos), dtype=np.int64, count=len(textos))
+        return list(codigo_texto), codigos[np.asarray(posicoes, dtype=np.int64)]
+    textos_consultas, linhas = distintos(consultas, linhas)
+    textos_base, colunas = distintos(base, colunas)
+    pares, inverso = np.unique(linhas * len(textos_base) + colunas, return_inverse=True)
+    vetores_consultas, vetores_base = VetoresTrigramas(textos_consultas), VetoresTrigramas(textos_base)
+    cossenos = np.empty(len(pares))
+    for inicio in range(0, len(pares), PARES_POR_BLOCO):
+        bloco = pares[inicio:inicio + PARES_POR_BLOCO]
+        cossenos[inicio:inicio + len(bloco)] = vetores_base.produto_pares(
+            vetores_consultas, bloco // len(textos_base), bloco % len(textos_base)
+        )
+    # Arredondamentos podem levar o cosseno de textos iguais um pouco acima de 1
+    return calibrar(np.minimum(cossenos, 1.0))[inverso]
+
+
+def limite_superior(texto1, texto2, score_cutoff=0.0):
+    """Limite superior barato de 2 * (caracteres em comum) / (tamanho total) para um par de textos.
+
+    Vale para o SequenceMatcher.ratio() e para similaridade_limitada: primeiro pela diferença
+    de tamanhos e, se ela não bastar para ficar abaixo de score_cutoff, pelos histogramas de
+    caracteres (o mesmo de SequenceMatcher.quick_ratio()).
+    """
+    total = len(texto1) + len(texto2)
+    if not total:
+        return 1.0
+    limite = 2.0 * min(len(texto1), len(texto2)) / total
+    if limite < score_cutoff:
+        return limite
+    return 2.0 * sum((Counter(texto1) & Counter(texto2)).values()) / total
+
+
+def _maior_subsequencia_comum(texto1, texto2, minimo=0):
+    """Tamanho da maior subsequência comum, com vetores de bits (Hyyrö): uma operação inteira por caractere.
+
+    Para quando nem casando todos os caracteres restantes de texto1 o resultado chega a minimo
+    (devolve então um valor abaixo de minimo).
+    """
+    mascaras = {}
+    for posicao, caractere in enumerate(texto2):
+        mascaras[caractere] = mascaras.get(caractere, 0) | (1 << posicao)
+    todos = (1 << len(texto2)) - 1
+    linha = todos
+    restantes = len(texto1)
+    for caractere in texto1:
+        casados = linha & mascaras.get(caractere, 0)
+        linha = ((linha + casados) | (linha - casados)) & todos
+        restantes -= 1
+        # Cada bit zerado é um caractere da subsequência comum; verificado a cada 8 caracteres
+        if minimo and restantes % 8 == 0 and len(texto2) - bin(linha).count("1") + restantes < minimo:
+            return len(texto2) - bin(linha).count("1")
+    return len(texto2) - bin(linha).count("1")
+
+
+def similaridade_limitada(texto1, texto2, score_cutoff=0.0):
+    """Similaridade de edição normalizada (0.0 a 1.0): 1 - distância de Levenshtein só com inserções e
+    remoções / tamanho total, ou seja, 2 * (maior subsequência comum) / (tamanho total).
+
+    Pares abaixo de score_cutoff devolvem 0.0 e, quando possível, são descartados antes do cálculo
+    (pela diferença de tamanhos) ou no meio dele, quando a distância já passou do máximo permitido
+    pelo corte.
+    """
+    total = len(texto1) + len(texto2)
+    if not total:
+        return 1.0
+    # Só o limite de tamanho: o de histogramas custa mais que a própria subsequência por vetores de bits
+    if 2.0 * min(len(texto1), len(texto2)) / total < score_cutoff:
+        return 0.0
+    # O texto menor é percorrido caractere a caractere; o maior vira vetor de bits
+    if len(texto1) > len(texto2):
+        texto1, texto2 = texto2, texto1
+    minimo = math.ceil(score_cutoff * total / 2 - 1e-9) if score_cutoff else 0
+    similaridade = 2.0 * _maior_subsequencia_comum(texto1, texto2, minimo) / total
+    return similaridade if similaridade >= score_cutoff else 0.0
+
+
+def similaridade_par(texto1, texto2, score_cutoff=0.0):
+    """Similaridade de um par de textos (0.0 a 1.0) no motor configurado.
+
+    Com score_cutoff, resultados abaixo do corte podem voltar como 0.0; no motor difflib, os pares
+    que não alcançam o corte pelo limite_superior ou pela similaridade_limitada (ambos limites
+    superiores do ratio()) nem chegam ao SequenceMatcher.
+    """
+    if MOTOR_SIMILARIDADE == "levenshtein":
+        return similaridade_limitada(texto1, texto2, score_cutoff)
+    if usar_trigramas():
+        similaridade = float(matriz_similaridade([texto1], [texto2])[0, 0])
+    elif score_cutoff and (
+        limite_superior(texto1, texto2, score_cutoff) < score_cutoff
+        # A similaridade de edição (maior subsequência comum) também limita o ratio() por cima
+        or similaridade_limitada(texto1, texto2, score_cutoff) < score_cutoff
+    ):
+        return 0.0
+    else:
+        similaridade = SequenceMatcher(None, texto1, texto2).ratio()
+    return similaridade if similaridade >= score_cutoff else 0.0
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# Arquivo JSON opcional com termos adicionais por categoria, ex.: {"unidade": ["CJ"], "ambiente": ["LAVANDERIA"]}
+ARQUIVO_VOCABULARIO = os.getenv("BID_VOCABULARIO", "")
+
+# Termos reconhecidos por categoria; em cada categoria a ordem é a prioridade (ex.: unidade da linha)
+VOCABULARIO_PADRAO = {
+    "unidade": ["UN", "UNID", "PÇ", "PC", "PEÇA", "M2", "M²", "ML", "KG"],
+    "ambiente": ["CASAL", "GINASTICA", "HOME", "JANTAR/COPA", "ESCRITÓRIO", "COZINHA", "GOURMET"],
+    "equipamento": ["EXAUSTOR"],
+}
+# Categorias cujos termos são extraídos como itens (extract_items_from_text)
+CATEGORIAS_ITENS = ("ambiente", "equipamento")
+
+# Um termo não pode estar colado a outras letras ("UN" não casa em "UNIDADE" nem em "FUNDO");
+# números colados são aceitos ("10UN"). A verificação anterior fica depois do primeiro caractere
+# de cada ramo, para a expressão continuar começando por literais (o re pula rapidamente as
+# posições que não começam nenhum termo)
+_SEM_LETRA_ANTES = r"(?<![^\W\d_].)"
+_SEM_LETRA_DEPOIS = r"(?![^\W\d_])"
+
+
+def carregar_vocabulario(caminho=None):
+    """Vocabulário padrão acrescido dos termos do arquivo JSON (BID_VOCABULARIO), em maiúsculas e sem repetições"""
+    vocabulario = {categoria: list(termos) for categoria, termos in VOCABULARIO_PADRAO.items()}
+    caminho = ARQUIVO_VOCABULARIO if caminho is None else caminho
+    if caminho:
+        try:
+            with open(caminho, encoding="utf-8") as f:
+                extras = json.load(f)
+            for categoria, termos in extras.items():
+                vocabulario.setdefault(categoria, []).extend(termos)
+        except Exception as e:
+            logger.error(f"Erro ao carregar o vocabulário {caminho}: {e}")
+    return {
+        categoria: list(dict.fromkeys(str(termo).strip().upper() for termo in termos if str(termo).strip()))
+        for categoria, termos in vocabulario.items()
+    }
+
+
+def padrao_trie(termos):
+    """Expressão regular que casa qualquer um dos termos, fatorada por prefixos comuns (trie).
+
+    O custo por posição do texto depende do comprimento dos termos, não da quantidade: cada nó
+    só testa os próximos caracteres possíveis. Entre prefixos de um mesmo termo vence o mais longo.
+    """
+    trie = {}
+    for termo in termos:
+        no = trie
+        for caractere in termo:
+            no = no.setdefault(caractere, {})
+        no[""] = {}
+
+    def montar(no, raiz=False):
+        ramos = []
+        for caractere, filho in sorted(no.items()):
+            if caractere:
+                ramos.append(re.escape(caractere) + (_SEM_LETRA_ANTES if raiz else "") + montar(filho))
+        if not ramos:
+            return ""
+        corpo = ramos[0] if len(ramos) == 1 else "(?:" + "|".join(ramos) + ")"
+        # Termo que termina neste nó: o restante é opcional
+        return f"(?:{corpo})?" if "" in no else corpo
+
+    return montar(trie, raiz=True)
+
+
+class Vocabulario:
+    """Dicionários de termos (unidades, ambientes, famílias de equipamentos) reconhecidos em uma única varredura"""
+
+    def __init__(self, termos_por_categoria):
+        self.categoria = {}
+        self.prioridade = {}
+        for categoria, termos in termos_por_categoria.items():
+            for posicao, termo in enumerate(termos):
+                # Um termo repetido em mais de uma categoria fica na primeira
+                if termo not in self.categoria:
+                    self.categoria[termo] = categoria
+                    self.prioridade[termo] = posicao
+        self._padroes = {
+            flags: re.compile(self.expressao(), flags) for flags in (0, re.IGNORECASE)
+        }
+        # Identifica os termos carregados (categoria e prioridade) nas chaves do cache de extração
+        self.assinatura = hashlib.sha256(
+            json.dumps(sorted((t, c, self.prioridade[t]) for t, c in self.categoria.items())).encode("utf-8")
+        ).hexdigest()
+
+    def expressao(self, categorias=None):
+        """Expressão regular (texto) que casa os termos das categorias indicadas (todas, sem categorias)"""
+        termos = [t for t, c in self.categoria.items() if categorias is None or c in categorias]
+        if not termos:
+            return r"(?!)"
+        return padrao_trie(termos) + _SEM_LETRA_DEPOIS
+
+    def encontrar(self, texto):
+        """Gera (termo, categoria, inicio, fim) para cada termo encontrado no texto, sem diferenciar maiúsculas"""
+        texto_maiusculo = texto.upper()
+        if len(texto_maiusculo) == len(texto):
+            padrao, texto_varrido = self._padroes[0], texto_maiusculo
+        else:
+            # Caracteres como "ß" mudam de tamanho em maiúsculas: varre o original ignorando caixa
+            padrao, texto_varrido = self._padroes[re.IGNORECASE], texto
+        for match in padrao.finditer(texto_varrido):
+            termo = match.group().upper()
+            if termo in self.categoria:
+                yield termo, self.categoria[termo], match.start(), match.end()
+
+    def primeiro_da_categoria(self, texto, categoria, padrao=None):
+        """Termo de maior prioridade da categoria presente no texto (ex.: a unidade de uma linha)"""
+        melhor = None
+        for termo, categoria_termo, _, _ in self.encontrar(texto):
+            if categoria_termo == categoria and (melhor is None or self.prioridade[termo] < self.prioridade[melhor]):
+                melhor = termo
+        return melhor if melhor is not None else padrao
+
+
+VOCABULARIO = Vocabulario(carregar_vocabulario())
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Os módulos da aplicação são importados a partir de src/, como em src/app.py
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
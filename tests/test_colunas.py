@@ -0,0 +1,45 @@
+import pandas as pd
+
+from utils.colunas import detectar_papeis_colunas
+
+
+def test_planilha_sem_cabecalho_mantem_todas_as_linhas():
+    # Sem cabeçalho: a primeira linha de dados vira o nome das colunas na leitura
+    df = pd.DataFrame(
+        [
+            ["Equipamento cassete 12000 btu", 1, "UN", "R$ 2.000,00"],
+            ["CONDENSADORA 18000 BTU", 2, "PC", "R$ 3.500,00"],
+        ],
+        columns=["EVAPORADORA HI WALL 9000 BTU CASAL", 4, "PC", "R$ 999,00"],
+    )
+    resultado, _ = detectar_papeis_colunas(df)
+    assert len(resultado) == 2
+    assert resultado.iloc[0, 0] == "Equipamento cassete 12000 btu"
+
+
+def test_linha_de_dados_com_sinonimos_fracos_nao_e_cabecalho():
+    df = pd.DataFrame(
+        [
+            [None, None, None, None],
+            ["Equipamento cassete 12000 btu", 1, "UN", "R$ 2.000,00"],
+        ],
+        columns=["Unnamed: 0", "Unnamed: 1", "Unnamed: 2", "Unnamed: 3"],
+    )
+    resultado, _ = detectar_papeis_colunas(df)
+    assert len(resultado) == 2
+
+
+def test_cabecalho_abaixo_do_titulo_e_reposicionado():
+    df = pd.DataFrame(
+        [
+            ["Fornecedor: Clima Ltda", None, None, None],
+            ["Descrição", "Qtd", "Un", "Valor Unitário (R$)"],
+            ["EVAPORADORA HI WALL 9000 BTU", 4, "PC", "R$ 999,00"],
+        ],
+        columns=["PROPOSTA COMERCIAL", "Unnamed: 1", "Unnamed: 2", "Unnamed: 3"],
+    )
+    resultado, papeis = detectar_papeis_colunas(df)
+    assert len(resultado) == 1
+    assert papeis["item"] == "Descrição"
+    assert papeis["quantidade"] == "Qtd"
+    assert papeis["custo_unitario"] == "Valor Unitário (R$)"
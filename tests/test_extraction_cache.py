@@ -0,0 +1,73 @@
+import io
+import itertools
+import pickle
+
+import pandas as pd
+import pytest
+
+from utils import extraction_cache, file_utils
+from utils.extraction_cache import ExtractionCache
+from utils.profiling import execucao_monitorada
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    """Relógio que avança a cada leitura: a ordem de acesso do LRU não depende da resolução do time.time()"""
+    instantes = itertools.count(1)
+    monkeypatch.setattr(extraction_cache.time, "time", lambda: float(next(instantes)))
+
+
+def tamanho_de(valor):
+    return len(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def test_falta_e_acerto(tmp_path):
+    cache = ExtractionCache(tmp_path, tamanho_maximo_mb=1)
+    assert cache.get("chave") is None
+    cache.set("chave", {"valores": ["1.234,56"]})
+    assert cache.get("chave") == {"valores": ["1.234,56"]}
+
+
+def test_despeja_a_entrada_acessada_ha_mais_tempo(tmp_path, relogio):
+    valor = "x" * 1000
+    cache = ExtractionCache(tmp_path, tamanho_maximo_mb=2.5 * tamanho_de(valor) / (1024 * 1024))
+    cache.set("a", valor)
+    cache.set("b", valor)
+    assert cache.get("a") == valor  # "a" passa a ser a mais recente
+    cache.set("c", valor)
+    assert cache.get("b") is None
+    assert cache.get("a") == valor
+    assert cache.get("c") == valor
+    assert cache.tamanho_total() <= cache.tamanho_maximo
+
+
+def test_valor_maior_que_o_limite_nao_e_gravado(tmp_path):
+    cache = ExtractionCache(tmp_path, tamanho_maximo_mb=0.001)
+    cache.set("grande", "x" * 10000)
+    assert cache.get("grande") is None
+    assert cache.tamanho_total() == 0
+
+
+def test_extracao_reaproveitada_do_cache(tmp_path, monkeypatch):
+    cache = ExtractionCache(tmp_path, tamanho_maximo_mb=64)
+    monkeypatch.setattr(file_utils, "obter_cache_extracao", lambda: cache)
+    buffer = io.BytesIO()
+    pd.DataFrame({
+        "Descrição": ["SPLIT 9000 BTU/H CASAL", "SPLIT 12000 BTU/H HOME"],
+        "Qtd": [2, 1],
+        "Un": ["UN", "UN"],
+        "Valor Unitário": [1234.56, 2345.67],
+    }).to_excel(buffer, index=False)
+    arquivo = io.BytesIO(buffer.getvalue())
+    arquivo.name = "fornecedor.xlsx"
+
+    with execucao_monitorada("primeira", rastrear_memoria=False) as primeira:
+        resultado = file_utils.extract_to_dataframes([arquivo])
+    with execucao_monitorada("segunda", rastrear_memoria=False) as segunda:
+        repetido = file_utils.extract_to_dataframes([arquivo])
+
+    assert primeira.contadores.get("cache_extracao_faltas") == 1
+    assert segunda.contadores.get("cache_extracao_acertos") == 1
+    esperado = resultado["dataframes"]["propostas_dfs"][0]
+    assert len(esperado) == 2
+    assert repetido["dataframes"]["propostas_dfs"][0].equals(esperado)
@@ -0,0 +1,44 @@
+import itertools
+import random
+
+from utils.matching import atribuicao_otima
+
+
+def melhor_total_por_forca_bruta(arestas):
+    """Maior peso total entre todas as atribuições um-para-um (cada linha com uma posição ou sem par)"""
+    pesos = [dict(candidatas) for candidatas in arestas]
+    melhor = 0.0
+    for escolha in itertools.product(*[[None] + list(p) for p in pesos]):
+        usadas = [pos for pos in escolha if pos is not None]
+        if len(usadas) == len(set(usadas)):
+            melhor = max(melhor, sum(pesos[linha][pos] for linha, pos in enumerate(escolha) if pos is not None))
+    return melhor
+
+
+def grafo_aleatorio(rng, linhas, posicoes):
+    return [
+        [(pos, round(rng.uniform(0.01, 2.0), 3)) for pos in rng.sample(range(posicoes), rng.randint(0, posicoes))]
+        for _ in range(linhas)
+    ]
+
+
+def test_atribuicao_um_para_um_de_peso_maximo():
+    rng = random.Random(20)
+    for _ in range(300):
+        arestas = grafo_aleatorio(rng, rng.randint(1, 5), rng.randint(1, 4))
+        resultado = atribuicao_otima(arestas)
+        usadas = [pos for pos in resultado if pos >= 0]
+        assert len(usadas) == len(set(usadas))
+        pesos = [dict(candidatas) for candidatas in arestas]
+        assert all(pos == -1 or pos in pesos[linha] for linha, pos in enumerate(resultado))
+        total = sum(pesos[linha][pos] for linha, pos in enumerate(resultado) if pos >= 0)
+        assert abs(total - melhor_total_por_forca_bruta(arestas)) < 1e-9
+
+
+def test_disputa_cede_o_item_para_quem_perde_mais():
+    # A linha 0 prefere o item 0, mas ceder o item 0 à linha 1 (que não tem alternativa) vale mais
+    assert atribuicao_otima([[(0, 1.0), (1, 0.9)], [(0, 0.8)]]) == [1, 0]
+
+
+def test_linhas_sem_candidatos_ficam_sem_par():
+    assert atribuicao_otima([[], [(3, 0.5)], []]) == [-1, 3, -1]
@@ -0,0 +1,95 @@
+import io
+from concurrent.futures import Future
+
+import pytest
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from utils import file_utils
+
+
+class ArquivoEmMemoria(io.BytesIO):
+    def __init__(self, conteudo, name):
+        super().__init__(conteudo)
+        self.name = name
+
+
+def gerar_pdf(paginas):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    for numero in range(1, paginas + 1):
+        pdf.drawString(30, 800, f"Pagina {numero}")
+        pdf.showPage()
+    pdf.save()
+    return ArquivoEmMemoria(buffer.getvalue(), "proposta.pdf")
+
+
+def numeros_das_paginas(paginas):
+    return [(numero, texto.strip()) for numero, texto in paginas]
+
+
+@pytest.fixture
+def pdf_paralelo(monkeypatch):
+    monkeypatch.setattr(file_utils, "PDF_MIN_PAGINAS_PARALELO", 2)
+    monkeypatch.setattr(file_utils, "PDF_PAGINAS_POR_BLOCO", 3)
+    monkeypatch.setattr(file_utils, "_pdf_do_processo", None)
+    return gerar_pdf(20)
+
+
+def test_paginas_em_ordem_com_pool(pdf_paralelo):
+    paginas = numeros_das_paginas(file_utils.iter_pdf_pages(pdf_paralelo, max_workers=2))
+    assert paginas == [(n, f"Pagina {n}") for n in range(1, 21)]
+
+
+def test_pool_que_falha_no_meio_continua_em_serie(pdf_paralelo, monkeypatch):
+    class ExecutorQueFalha:
+        """Executa as duas primeiras tarefas no próprio processo; as seguintes falham ao buscar o resultado"""
+
+        def __init__(self, max_workers, initializer, initargs):
+            initializer(*initargs)
+            self.tarefas = 0
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *excecao):
+            return False
+
+        def submit(self, funcao, *args):
+            self.tarefas += 1
+            futuro = Future()
+            if self.tarefas > 2:
+                futuro.set_exception(RuntimeError("pool quebrado"))
+            else:
+                futuro.set_result(funcao(*args))
+            return futuro
+
+    monkeypatch.setattr(file_utils, "ProcessPoolExecutor", ExecutorQueFalha)
+    paginas = numeros_das_paginas(file_utils.iter_pdf_pages(pdf_paralelo, max_workers=2))
+    assert paginas == [(n, f"Pagina {n}") for n in range(1, 21)]
+
+
+def test_texto_completo_em_serie():
+    texto = file_utils.extract_text_from_pdf_complete(gerar_pdf(3), max_workers=1)
+    assert [linha.strip() for linha in texto.splitlines() if linha.strip()] == ["Pagina 1", "Pagina 2", "Pagina 3"]
+
+
+def test_estruturacao_por_blocos_de_linhas_igual_a_bloco_unico(monkeypatch):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    for pagina in range(3):
+        for n in range(5):
+            pdf.drawString(30, 800 - n * 17, f"SPLIT 9000 BTU/H SALA {pagina}{n}  2 UN  R$ 1.234,56  R$ 2.469,12")
+        pdf.showPage()
+    pdf.save()
+    arquivo = ArquivoEmMemoria(buffer.getvalue(), "fornecedor.pdf")
+
+    inteiro = file_utils._extrair_conteudo_arquivo(arquivo, "FORNECEDOR")
+    monkeypatch.setattr(file_utils, "PDF_LINHAS_POR_BLOCO", 2)
+    em_blocos = file_utils._extrair_conteudo_arquivo(arquivo, "FORNECEDOR")
+
+    assert len(inteiro["dataframe_estruturado"]) == 15
+    assert em_blocos["dataframe_estruturado"].equals(inteiro["dataframe_estruturado"])
+    assert em_blocos["valores"] == inteiro["valores"]
+    assert sorted(em_blocos["itens"]) == sorted(inteiro["itens"])
+    assert inteiro["dataframe_estruturado"]["Custo_Unitario"].tolist() == [1234.56] * 15
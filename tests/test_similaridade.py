@@ -0,0 +1,77 @@
+import random
+from difflib import SequenceMatcher
+
+import pytest
+
+from utils import similaridade
+from utils.similaridade import limite_superior, similaridade_limitada, similaridade_par
+
+
+def maior_subsequencia_comum(a, b):
+    """Programação dinâmica clássica, usada como referência"""
+    anterior = [0] * (len(b) + 1)
+    for caractere in a:
+        atual = [0]
+        for j, outro in enumerate(b):
+            atual.append(anterior[j] + 1 if caractere == outro else max(anterior[j + 1], atual[j]))
+        anterior = atual
+    return anterior[-1]
+
+
+def pares_aleatorios(quantidade=400, seed=23):
+    rng = random.Random(seed)
+    alfabeto = "abcde 0123"
+    for _ in range(quantidade):
+        a = "".join(rng.choice(alfabeto) for _ in range(rng.randint(0, 90)))
+        # Metade dos pares parecidos: o segundo texto é o primeiro com algumas edições
+        if rng.random() < 0.5:
+            b = list(a)
+            for _ in range(rng.randint(0, 10)):
+                if b and rng.random() < 0.5:
+                    del b[rng.randrange(len(b))]
+                else:
+                    b.insert(rng.randint(0, len(b)), rng.choice(alfabeto))
+            b = "".join(b)
+        else:
+            b = "".join(rng.choice(alfabeto) for _ in range(rng.randint(0, 90)))
+        yield a, b
+
+
+def similaridade_referencia(a, b):
+    return 1.0 if not a and not b else 2.0 * maior_subsequencia_comum(a, b) / (len(a) + len(b))
+
+
+def test_similaridade_sem_corte_e_a_da_maior_subsequencia_comum():
+    for a, b in pares_aleatorios():
+        assert similaridade_limitada(a, b) == pytest.approx(similaridade_referencia(a, b)), (a, b)
+
+
+@pytest.mark.parametrize("corte", [0.3, 0.7, 0.8, 0.95])
+def test_corte_devolve_o_valor_exato_ou_zero(corte):
+    for a, b in pares_aleatorios(seed=int(corte * 100)):
+        esperado = similaridade_referencia(a, b)
+        obtido = similaridade_limitada(a, b, corte)
+        if esperado >= corte:
+            assert obtido == pytest.approx(esperado), (a, b)
+        else:
+            assert obtido == 0.0, (a, b)
+
+
+def test_limite_superior_nunca_fica_abaixo_da_similaridade():
+    for a, b in pares_aleatorios():
+        assert limite_superior(a, b) >= similaridade_referencia(a, b) - 1e-12, (a, b)
+
+
+def test_subsequencia_comum_limita_o_ratio_do_difflib():
+    for a, b in pares_aleatorios(seed=24):
+        ratio = SequenceMatcher(None, a, b).ratio()
+        assert similaridade_limitada(a, b) >= ratio - 1e-12, (a, b)
+        assert limite_superior(a, b) >= ratio - 1e-12, (a, b)
+
+
+@pytest.mark.parametrize("corte", [0.0, 0.5, 0.8])
+def test_motor_difflib_so_descarta_pares_abaixo_do_corte(monkeypatch, corte):
+    monkeypatch.setattr(similaridade, "MOTOR_SIMILARIDADE", "difflib")
+    for a, b in pares_aleatorios(seed=240 + int(corte * 10)):
+        ratio = SequenceMatcher(None, a, b).ratio()
+        assert similaridade_par(a, b, corte) == pytest.approx(ratio if ratio >= corte else 0.0), (a, b)
@@ -0,0 +1,71 @@
+import random
+import re
+
+from utils.file_utils import extract_values_from_text, extrair_valores_e_itens
+
+# Buscas por padrão anteriores à varredura única, usadas como referência
+PADROES_VALORES_REFERENCIA = [
+    r'R\$\s*([\d\.]+,\d{2})',
+    r'(\d{1,3}(?:\.\d{3})*,\d{2})',
+    r'TOTAL[:\s]*([\d\.]+,\d{2})',
+    r'VALOR[:\s]*([\d\.]+,\d{2})',
+]
+PADROES_ITENS_REFERENCIA = [
+    r'UE-\d+[A-Z]?\s*-[^-\n]+',
+    r'SPLIT\s+\d+[.,]?\d*\s*BTU[/H]*',
+    r'CASSETE\s+\d+[.,]?\d*\s*BTU[/H]*',
+    r'HI\s*WALL\s+\d+[.,]?\d*\s*BTU[/H]*',
+    r'DUTO\s+\d+[.,]?\d*\s*BTU[/H]*',
+    r'Suite\s*\d+',
+    r'Casal', r'Ginastica', r'Home', r'Jantar/Copa', r'Escritório', r'Cozinha', r'Gourmet',
+    r'FXEQ\d+AVE', r'FXFQ\d+AVM', r'FXSQ\d+PAVE', r'FXAQ\d+AVM',
+    r'Exaustor',
+]
+
+FRAGMENTOS = [
+    "R$ 1.234,56", "R$1.234,56", "12.345,67", "0,99", "TOTAL: 9.999,00", "Valor 150,00", "total 2,5",
+    "UE-01A - EVAPORADORA HI WALL", "UE-12 - CONDENSADORA", "SPLIT 9000 BTU/H", "split 12.000 btu",
+    "CASSETE 18000 BTU", "HI WALL 7000 BTU/H", "hiwall 9000 BTU", "DUTO 24000 BTU/H", "Suite 3",
+    "suite2", "Casal", "HOME", "Jantar/Copa", "Escritório", "COZINHA", "gourmet", "Exaustor",
+    "FXEQ25AVE", "fxfq40avm", "FXSQ32PAVE", "FXAQ20AVM", "2 UN", "PC", "-", "\n", "  ", "R$",
+    "Proposta 123", "Straße", "1.234,5", "12,345",
+]
+
+
+def textos_aleatorios(quantidade=300, seed=7):
+    rng = random.Random(seed)
+    for _ in range(quantidade):
+        yield " ".join(rng.choice(FRAGMENTOS) for _ in range(rng.randint(1, 25)))
+
+
+def valores_referencia(texto):
+    return [valor for padrao in PADROES_VALORES_REFERENCIA for valor in re.findall(padrao, texto, re.IGNORECASE)]
+
+
+def itens_referencia(texto):
+    return {item for padrao in PADROES_ITENS_REFERENCIA for item in re.findall(padrao, texto, re.IGNORECASE)}
+
+
+def test_valores_iguais_as_buscas_por_padrao():
+    for texto in textos_aleatorios():
+        assert extract_values_from_text(texto) == valores_referencia(texto), texto
+
+
+def test_valores_e_itens_em_uma_varredura():
+    # Os fragmentos só têm termos do vocabulário isolados: o limite de palavra não muda o resultado
+    for texto in textos_aleatorios():
+        valores, itens = extrair_valores_e_itens(texto)
+        assert valores == valores_referencia(texto), texto
+        assert set(itens) == itens_referencia(texto), texto
+
+
+def test_varias_paginas_somam_as_ocorrencias():
+    paginas = list(textos_aleatorios(20, seed=3))
+    valores, itens = extrair_valores_e_itens(paginas)
+    assert valores == [
+        valor
+        for padrao in PADROES_VALORES_REFERENCIA
+        for pagina in paginas
+        for valor in re.findall(padrao, pagina, re.IGNORECASE)
+    ]
+    assert set(itens) == set().union(*(itens_referencia(pagina) for pagina in paginas))
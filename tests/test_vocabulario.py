@@ -0,0 +1,37 @@
+import io
+
+from utils import file_utils
+from utils.vocabulario import Vocabulario, carregar_vocabulario
+
+
+def test_termo_colado_a_numero_casa_e_dentro_de_palavra_nao():
+    vocabulario = Vocabulario(carregar_vocabulario(""))
+    assert vocabulario.primeiro_da_categoria("10UN", "unidade") == "UN"
+    assert vocabulario.primeiro_da_categoria("FUNDO DE VALE", "unidade") is None
+    assert vocabulario.primeiro_da_categoria("2 UNIDADE", "unidade") is None
+    assert vocabulario.primeiro_da_categoria("Suíte casal", "ambiente") == "CASAL"
+
+
+def test_prioridade_da_categoria():
+    vocabulario = Vocabulario(carregar_vocabulario(""))
+    assert vocabulario.primeiro_da_categoria("4 PC 1 UN", "unidade") == "UN"
+
+
+def test_arquivo_de_vocabulario_muda_a_assinatura(tmp_path):
+    arquivo = tmp_path / "vocabulario.json"
+    arquivo.write_text('{"unidade": ["CJ"]}', encoding="utf-8")
+    padrao = Vocabulario(carregar_vocabulario(""))
+    estendido = Vocabulario(carregar_vocabulario(str(arquivo)))
+    assert estendido.primeiro_da_categoria("3CJ", "unidade") == "CJ"
+    assert padrao.assinatura == Vocabulario(carregar_vocabulario("")).assinatura
+    assert padrao.assinatura != estendido.assinatura
+
+
+def test_chave_do_cache_depende_do_vocabulario(tmp_path, monkeypatch):
+    arquivo = io.BytesIO(b"conteudo")
+    arquivo.name = "proposta.pdf"
+    chave = file_utils.chave_cache_arquivo(arquivo)
+    extras = tmp_path / "vocabulario.json"
+    extras.write_text('{"ambiente": ["LAVANDERIA"]}', encoding="utf-8")
+    monkeypatch.setattr(file_utils, "VOCABULARIO", Vocabulario(carregar_vocabulario(str(extras))))
+    assert file_utils.chave_cache_arquivo(arquivo) != chave